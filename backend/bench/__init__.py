@@ -0,0 +1,4 @@
+"""
+Micro-benchmarks reproducibles de las optimizaciones del backend
+No forman parte de la app; se ejecutan a mano con python -m backend.bench.<módulo>
+"""
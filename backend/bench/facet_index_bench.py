@@ -0,0 +1,145 @@
+"""
+Benchmark del índice facetado (FacetIndex) sobre un catálogo sintético
+Mide la carga, consultas con facetas y una escritura, las compara con un
+filtrado por list comprehension y verifica cada resultado contra la fuerza bruta
+
+Uso:
+    python -m backend.bench.facet_index_bench --products 100000
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from backend.config import config
+from backend.utils.facet_index import DESCENDING_SORTS, FacetIndex
+
+SCENARIOS = [
+    ("sin filtros + facetas, newest", {"sort": "newest"}),
+    ("categoría + en stock, price_asc", {"category_ids": [7], "in_stock": True, "sort": "price_asc"}),
+    ("2 marcas + rango de precio, name", {"brands": ["Marca 3", "Marca 11"], "min_price": 80.0,
+                                          "max_price": 450.0, "sort": "name"}),
+]
+
+def make_products(count: int, brands: int, categories: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Productos con la forma de ProductService._format_product"""
+    rng = random.Random(seed)
+    products = []
+    for i in range(1, count + 1):
+        stock = rng.choice((0, 0, rng.randint(1, 200)))
+        products.append({
+            "id": i,
+            "Sku": f"SKU-{i:07d}",
+            "name": f"Producto {rng.randint(0, 10 ** 6):07d}",
+            "brand": f"Marca {rng.randrange(brands)}",
+            "category_id": rng.randrange(categories),
+            "price": round(rng.uniform(1, 1500), 2),
+            "current_stock": stock,
+            "available_stock": stock,
+            "is_active": True,
+            "created_at": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00",
+        })
+    return products
+
+def brute_force(products: Sequence[Dict[str, Any]], brands: Optional[Sequence[str]] = None,
+                category_ids: Optional[Sequence[Any]] = None, min_price: Optional[float] = None,
+                max_price: Optional[float] = None, in_stock: Optional[bool] = None,
+                sort: str = "newest") -> List[Dict[str, Any]]:
+    """Filtro y orden de referencia, producto por producto"""
+    rows = [
+        p for p in products
+        if p["is_active"]
+        and (not brands or p["brand"] in brands)
+        and (not category_ids or p["category_id"] in category_ids)
+        and (min_price is None or p["price"] >= min_price)
+        and (max_price is None or p["price"] <= max_price)
+        and (not in_stock or p["available_stock"] > 0)
+    ]
+    if sort in ("price_asc", "price_desc"):
+        key = lambda p: p["price"]
+    elif sort == "name":
+        key = lambda p: p["name"].lower()
+    else:
+        key = lambda p: (p["created_at"], p["id"])
+    return sorted(rows, key=key, reverse=sort in DESCENDING_SORTS)
+
+def _timed(fn, repeat: int) -> float:
+    """Mejor tiempo en milisegundos de repeat ejecuciones"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def _check(index: FacetIndex, products: Sequence[Dict[str, Any]], filters: Dict[str, Any], limit: int):
+    """Compara total, facetas de marca y página del índice con la fuerza bruta"""
+    result = index.query(limit=limit, **filters)
+    expected = brute_force(products, **filters)
+    if result["total"] != len(expected):
+        raise AssertionError(f"{filters}: total {result['total']} != {len(expected)}")
+    brand_counts: Dict[str, int] = {}
+    for p in brute_force(products, **dict(filters, brands=None)):
+        brand_counts[p["brand"]] = brand_counts.get(p["brand"], 0) + 1
+    if result["facets"]["brand"] != brand_counts:
+        raise AssertionError(f"{filters}: las facetas de marca no coinciden")
+    got = [p["id"] for p in result["items"]]
+    sort = filters.get("sort", "newest")
+    if sort == "newest":
+        want = [p["id"] for p in expected[:limit]]
+        if got != want:
+            raise AssertionError(f"{filters}: la página no coincide")
+    else:
+        # Con empates (mismo precio o nombre) el orden entre iguales puede variar
+        field = "price" if sort != "name" else "name"
+        if [p[field] for p in result["items"]] != [p[field] for p in expected[:limit]]:
+            raise AssertionError(f"{filters}: la página no coincide")
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Lee los argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Benchmark del índice facetado del catálogo")
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--brands", type=int, default=40)
+    parser.add_argument("--categories", type=int, default=25)
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por medición (se toma la mejor)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Ejecuta el benchmark e imprime los tiempos"""
+    args = parse_args(argv)
+    limit = 24
+    products = make_products(args.products, args.brands, args.categories)
+    index = FacetIndex(config.CATALOG_PRICE_BUCKETS)
+
+    print(f"{args.products} productos, {args.brands} marcas, {args.categories} categorías")
+    print(f"  carga:                               {_timed(lambda: index.load(products), 1):8.1f} ms")
+
+    for label, filters in SCENARIOS:
+        index.query(limit=limit, **filters)  # calcula el orden precalculado
+        elapsed = _timed(lambda: index.query(limit=limit, **filters), args.repeat)
+        print(f"  {label:<36} {elapsed:8.2f} ms")
+        _check(index, products, filters, limit)
+
+    updated = dict(products[len(products) // 2], price=123.45, available_stock=0, current_stock=0)
+    print(f"  upsert de un producto:               {_timed(lambda: index.upsert(updated), args.repeat):8.2f} ms")
+    products[len(products) // 2] = updated
+
+    baseline = [p for p in products if p["category_id"] == 7 and p["available_stock"] > 0]
+    elapsed = _timed(lambda: [p for p in products if p["category_id"] == 7 and p["available_stock"] > 0],
+                     args.repeat)
+    print(f"  list comprehension (sin facetas):    {elapsed:8.2f} ms ({len(baseline)} filas)")
+
+    rng = random.Random(7)
+    for _ in range(50):
+        filters = {
+            "brands": rng.sample([f"Marca {b}" for b in range(args.brands)], rng.randint(0, 3)) or None,
+            "category_ids": rng.sample(range(args.categories), rng.randint(0, 2)) or None,
+            "min_price": rng.choice((None, round(rng.uniform(0, 700), 2))),
+            "max_price": rng.choice((None, round(rng.uniform(700, 1500), 2))),
+            "in_stock": rng.choice((None, True)),
+            "sort": rng.choice(("newest", "price_asc", "price_desc", "name")),
+        }
+        _check(index, products, filters, limit)
+    print("  resultados verificados contra la fuerza bruta")
+
+if __name__ == "__main__":
+    main()
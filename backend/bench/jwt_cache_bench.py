@@ -0,0 +1,73 @@
+"""
+Benchmark de la caché de tokens verificados (jwt_utils.verify_token)
+Mide AuthMiddleware.get_current_user con el mismo token repetido, con y sin
+caché; la consulta del perfil se sustituye por un stub para aislar la verificación
+
+Uso:
+    python -m backend.bench.jwt_cache_bench --calls 20000
+"""
+import argparse
+import asyncio
+import time
+from fastapi.security import HTTPAuthorizationCredentials
+from backend.config import config
+from backend.middlewares.auth_middleware import AuthMiddleware
+from backend.services.auth_service import AuthService
+from backend.utils.jwt_utils import clear_token_cache, create_access_token
+
+class _StubAuthService(AuthService):
+    """AuthService sin clientes de Supabase: el perfil sale de memoria"""
+
+    def __init__(self):
+        pass
+
+    async def _get_user_profile(self, user_id: str, with_claims: bool = False):
+        return {"id": user_id, "role_id": 3}
+
+class _BenchAuthMiddleware(AuthMiddleware):
+    _service = _StubAuthService()
+
+    @property
+    def auth_service(self) -> AuthService:
+        return self._service
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Lee los argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Benchmark de la caché de verificación JWT")
+    parser.add_argument("--calls", type=int, default=20000, help="Llamadas por escenario")
+    return parser.parse_args(argv)
+
+async def _run(middleware: AuthMiddleware, credentials: HTTPAuthorizationCredentials, calls: int) -> float:
+    """Microsegundos por llamada a get_current_user"""
+    start = time.perf_counter()
+    for _ in range(calls):
+        await middleware.get_current_user(credentials)
+    return (time.perf_counter() - start) / calls * 1e6
+
+def main(argv=None):
+    """Ejecuta los dos escenarios e imprime el resultado"""
+    args = parse_args(argv)
+    config.STATELESS_AUTH = False
+    token = create_access_token({"sub": "bench-user", "email": "bench@example.com", "role_id": 3})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    middleware = _BenchAuthMiddleware()
+    cache_size = config.JWT_CACHE_MAX_SIZE
+
+    try:
+        config.JWT_CACHE_MAX_SIZE = 0
+        clear_token_cache()
+        uncached = asyncio.run(_run(middleware, credentials, args.calls))
+
+        config.JWT_CACHE_MAX_SIZE = max(cache_size, 1)
+        clear_token_cache()
+        cached = asyncio.run(_run(middleware, credentials, args.calls))
+    finally:
+        config.JWT_CACHE_MAX_SIZE = cache_size
+        clear_token_cache()
+
+    print(f"{args.calls} llamadas con el mismo token")
+    print(f"  sin caché: {uncached:8.1f} us/llamada")
+    print(f"  con caché: {cached:8.1f} us/llamada ({uncached / cached:.1f}x)")
+
+if __name__ == "__main__":
+    main()
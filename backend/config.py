@@ -18,7 +18,15 @@ class Config:
     
     # JWT Configuration
     JWT_ALGORITHM = "HS256"
-    JWT_EXPIRATION_HOURS = 24
+    # Access tokens cortos; la sesión se renueva con /auth/refresh (rotando el refresh token)
+    JWT_EXPIRATION_MINUTES = int(os.getenv("JWT_EXPIRATION_MINUTES", "15"))
+    REFRESH_TOKEN_EXPIRATION_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRATION_DAYS", "30"))
+    # Máximo de tokens verificados en caché por worker (0 desactiva la caché)
+    JWT_CACHE_MAX_SIZE = int(os.getenv("JWT_CACHE_MAX_SIZE", "10000"))
+    # Autorización sin estado: el token lleva rol y versión de perfil, y las peticiones
+    # autenticadas no consultan la BD (requiere backend/sql/001_profile_versions.sql)
+    STATELESS_AUTH = os.getenv("STATELESS_AUTH", "False").lower() == "true"
+    TOKEN_VERSION_REFRESH_INTERVAL = float(os.getenv("TOKEN_VERSION_REFRESH_INTERVAL", "30"))  # segundos
     
     # CORS Configuration
     CORS_ORIGINS = [
@@ -32,12 +40,122 @@ class Config:
     
     # Storage Configuration
     STORAGE_BUCKET = "productos"  # Bucket de Supabase Storage para imágenes
+    IMAGE_UPLOAD_MAX_BYTES = int(os.getenv("IMAGE_UPLOAD_MAX_BYTES", str(5 * 1024 * 1024)))
+    # Las imágenes se guardan por hash de contenido: su URL nunca cambia de contenido
+    IMAGE_CACHE_CONTROL = "31536000"  # max-age en segundos (1 año)
+    
+    # Sales Configuration
+    CHECKOUT_MAX_LINES = int(os.getenv("CHECKOUT_MAX_LINES", "100"))
+    # Reservas de stock del carrito
+    RESERVATION_TTL_SECONDS = int(os.getenv("RESERVATION_TTL_SECONDS", "900"))
+    RESERVATION_MAX_QUANTITY = int(os.getenv("RESERVATION_MAX_QUANTITY", "50"))
+    RESERVATION_SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL", "30"))  # segundos
+    RESERVATION_SWEEP_BATCH = 1000
+    
+    # Directorio de usuarios del panel de administración
+    USER_SEARCH_PAGE_MAX = 100
+    ROLE_BULK_MAX = int(os.getenv("ROLE_BULK_MAX", "500"))  # Usuarios por asignación de rol en lote
+    
+    # Búsqueda facetada del catálogo (índice en memoria por worker)
+    # Recarga completa del índice; entre recargas se actualiza con el feed de cambios
+    CATALOG_INDEX_REFRESH_INTERVAL = float(os.getenv("CATALOG_INDEX_REFRESH_INTERVAL", "3600"))  # segundos
+    CATALOG_INDEX_PAGE_SIZE = 1000  # Filas por página al cargar el índice
+    CATALOG_PRICE_BUCKETS = [0, 50, 100, 200, 500, 1000]  # Límites inferiores de los rangos de precio
+    CATALOG_PAGE_MAX = 100
+    BATCH_LOOKUP_MAX = int(os.getenv("BATCH_LOOKUP_MAX", "100"))  # IDs + SKUs por petición a /productos/lote
+    PRODUCT_CHANGES_PAGE_MAX = 500  # Cambios por página de /productos/cambios
+    # Los cambios más recientes que esto se dejan para la próxima sincronización: una
+    # transacción que aún no confirmó puede tener una marca anterior a otra ya visible
+    PRODUCT_CHANGES_SETTLE_SECONDS = float(os.getenv("PRODUCT_CHANGES_SETTLE_SECONDS", "2"))
+    
+    # Eventos de productos por Server-Sent Events
+    EVENTS_HISTORY_SIZE = int(os.getenv("EVENTS_HISTORY_SIZE", "1000"))  # Para reconexiones con Last-Event-ID
+    EVENTS_SUBSCRIBER_BUFFER = int(os.getenv("EVENTS_SUBSCRIBER_BUFFER", "256"))  # Pendientes antes de desconectar
+    EVENTS_HEARTBEAT_INTERVAL = float(os.getenv("EVENTS_HEARTBEAT_INTERVAL", "15"))  # segundos
+    # Cada worker consulta los cambios de productos de los demás (ver ProductChangeFeed)
+    PRODUCT_CHANGES_POLL_INTERVAL = float(os.getenv("PRODUCT_CHANGES_POLL_INTERVAL", "5"))  # segundos
+    EVENTS_TICKET_SECONDS = 30  # Validez del ticket para abrir /productos/eventos
     
     # App Configuration
     APP_NAME = "Tingo Ventas"
     APP_VERSION = "1.0.0"
 
     DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+    
+    # Server Configuration
+    HOST = os.getenv("HOST", "0.0.0.0")
+    PORT = int(os.getenv("PORT", "8000"))
+    # Workers: WEB_CONCURRENCY (convención de Render/Heroku) o uno por núcleo
+    WORKERS = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+    # Segundos para drenar peticiones en curso al reiniciar/apagar un worker
+    GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+    KEEPALIVE_TIMEOUT = int(os.getenv("KEEPALIVE_TIMEOUT", "5"))
+    # IPs de los proxies cuyo X-Forwarded-For se respeta (separadas por coma). Con "*"
+    # cualquier cliente podría elegir su IP y saltarse los límites por IP
+    FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+    # Reporta tiempos de importación e inicialización por módulo al arrancar
+    STARTUP_PROFILE = os.getenv("STARTUP_PROFILE", "False").lower() == "true"
+    
+    # Health Checks
+    HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "15"))  # segundos entre sondeos
+    HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "3"))
+    
+    # Compression Configuration
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))  # bytes
+    COMPRESSION_GZIP_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 5
+    # Caché de respuestas del catálogo (precomprimidas); el TTL acota cuánto tarda
+    # un worker en ver cambios hechos a través de otro worker
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "64"))
+    RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))  # segundos
+    
+    # Rate Limiting (token bucket por worker salvo que se configure un backend compartido)
+    # key: "ip", "user" o "ip+user"; per_minute: reposición; burst: capacidad del bucket
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    RATE_LIMITS = {
+        "login": {"per_minute": 10, "burst": 5, "key": "ip"},
+        # Por cuenta (email normalizado): intentos contra un mismo usuario desde muchas IPs
+        "login_account": {"per_minute": 10, "burst": 10, "key": "account"},
+        "auth": {"per_minute": 5, "burst": 3, "key": "ip"},  # registro y recuperación
+        "recovery_account": {"per_minute": 3, "burst": 3, "key": "account"},
+        "refresh": {"per_minute": 30, "burst": 10, "key": "ip"},
+        "public": {"per_minute": 120, "burst": 60, "key": "ip"},
+    }
+    
+    # Resiliencia frente a Supabase
+    # Plazo por operación (segundos); se busca "tabla.operación" (o "rpc.función"),
+    # luego la operación (select, insert, update, delete, rpc), la dependencia y "default"
+    UPSTREAM_DEADLINES = {
+        "default": float(os.getenv("UPSTREAM_DEADLINE", "5")),
+        "select": 3.0,
+        "rpc.checkout_sale": 10.0,
+        "auth": 8.0,
+        "storage": 30.0,
+    }
+    UPSTREAM_HTTP_TIMEOUT = float(os.getenv("UPSTREAM_HTTP_TIMEOUT", "30"))  # Tope del cliente HTTP
+    # Circuit breaker por dependencia (postgrest, auth, storage)
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # Fallos seguidos que lo abren
+    CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv("CIRCUIT_RECOVERY_TIMEOUT", "30"))  # Segundos antes de probar
+    # Reintentos y hedging, solo para selects (idempotentes)
+    UPSTREAM_RETRY_ATTEMPTS = int(os.getenv("UPSTREAM_RETRY_ATTEMPTS", "2"))  # Reintentos tras el primer intento
+    UPSTREAM_RETRY_BACKOFF = float(os.getenv("UPSTREAM_RETRY_BACKOFF", "0.05"))  # Espera base (se duplica)
+    UPSTREAM_RETRY_BACKOFF_MAX = float(os.getenv("UPSTREAM_RETRY_BACKOFF_MAX", "1"))  # Tope de la espera
+    UPSTREAM_HEDGE_ENABLED = os.getenv("UPSTREAM_HEDGE_ENABLED", "True").lower() == "true"
+    UPSTREAM_HEDGE_MIN_SAMPLES = int(os.getenv("UPSTREAM_HEDGE_MIN_SAMPLES", "20"))  # Latencias antes de hedgear
+    UPSTREAM_HEDGE_MIN_DELAY = float(os.getenv("UPSTREAM_HEDGE_MIN_DELAY", "0.02"))  # Segundos
+    # Presupuesto global: reintentos + hedges <= RATIO * peticiones (+ MIN_PER_SECOND) en la ventana
+    UPSTREAM_RETRY_BUDGET_RATIO = float(os.getenv("UPSTREAM_RETRY_BUDGET_RATIO", "0.1"))
+    UPSTREAM_RETRY_BUDGET_MIN_PER_SECOND = float(os.getenv("UPSTREAM_RETRY_BUDGET_MIN_PER_SECOND", "1"))
+    UPSTREAM_RETRY_BUDGET_WINDOW = float(os.getenv("UPSTREAM_RETRY_BUDGET_WINDOW", "10"))  # Segundos
+    
+    # Logging (JSON por línea, escrito desde un hilo en segundo plano)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" o "text"
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Registros pendientes antes de descartar
+    # Fracción de registros INFO/DEBUG que se conservan por logger (WARNING o más, siempre)
+    LOG_SAMPLE_RATES = {
+        "backend.access": float(os.getenv("LOG_ACCESS_SAMPLE_RATE", "1.0")),
+    }
 
 config = Config()
 
@@ -6,11 +6,11 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Dict, Any, Optional
 from backend.models.schemas import AuditLogResponse
 from backend.services.audit_service import AuditService
+from backend.services.dependencies import get_audit_service
 from backend.middlewares.auth_middleware import AuthMiddleware
 
 router = APIRouter(prefix="/auditoria", tags=["Auditoría"])
 
-audit_service = AuditService()
 auth_middleware = AuthMiddleware()
 
 @router.get("/listar", response_model=List[AuditLogResponse])
@@ -18,8 +18,10 @@ async def list_audit_logs(
     user_id: Optional[str] = Query(None, description="Filtrar por profile_id"),
     table_name: Optional[str] = Query(None, description="Filtrar por nombre de tabla"),
     action: Optional[str] = Query(None, description="Filtrar por acción"),
+    field: Optional[str] = Query(None, description="Filtrar por campo modificado (p. ej. price)"),
     limit: int = Query(100, ge=1, le=1000, description="Límite de resultados"),
-    user: dict = Depends(auth_middleware.require_role("admin"))
+    user: dict = Depends(auth_middleware.require_role("admin")),
+    audit_service: AuditService = Depends(get_audit_service)
 ) -> List[Dict[str, Any]]:
     """
     Endpoint para listar registros de auditoría
@@ -31,6 +33,7 @@ async def list_audit_logs(
             user_id=user_id,
             table_name=table_name,
             action=action,
+            field=field,
             limit=limit
         )
         return logs
@@ -3,23 +3,29 @@ Controlador de autenticación
 Maneja las peticiones relacionadas con autenticación
 """
 from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from backend.models.schemas import (
     LoginRequest, RegisterRequest, PasswordRecoveryRequest,
-    AuthResponse, MessageResponse
+    RefreshRequest, LogoutRequest, AuthResponse, MessageResponse
 )
 from backend.services.auth_service import AuthService
 from backend.services.audit_service import AuditService
+from backend.services.dependencies import get_auth_service, get_audit_service
 from backend.middlewares.auth_middleware import AuthMiddleware
+from backend.middlewares.rate_limit_middleware import rate_limiter
+from backend.utils.circuit_breaker import UpstreamUnavailableError
 
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
 
-auth_service = AuthService()
-audit_service = AuditService()
 auth_middleware = AuthMiddleware()
 
-@router.post("/login", response_model=AuthResponse)
-async def login(request: LoginRequest) -> Dict[str, Any]:
+@router.post("/login", response_model=AuthResponse,
+             dependencies=[Depends(rate_limiter.limit("login")), Depends(rate_limiter.limit("login_account"))])
+async def login(
+    request: LoginRequest,
+    auth_service: AuthService = Depends(get_auth_service),
+    audit_service: AuditService = Depends(get_audit_service)
+) -> Dict[str, Any]:
     """
     Endpoint de login
     REQ_001: Logeo en el sistema
@@ -39,8 +45,29 @@ async def login(request: LoginRequest) -> Dict[str, Any]:
     except Exception as e:
         raise HTTPException(status_code=401, detail=str(e))
 
-@router.post("/register", response_model=MessageResponse)
-async def register(request: RegisterRequest) -> Dict[str, Any]:
+@router.post("/refresh", response_model=AuthResponse, dependencies=[Depends(rate_limiter.limit("refresh"))])
+async def refresh(
+    request: RefreshRequest,
+    auth_service: AuthService = Depends(get_auth_service)
+) -> Dict[str, Any]:
+    """
+    Endpoint de renovación de sesión
+    Canjea el refresh token por un access token nuevo (y rota el refresh token)
+    sin volver a pedir la contraseña
+    """
+    try:
+        return await auth_service.refresh(request.refresh_token)
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=401, detail=str(e))
+
+@router.post("/register", response_model=MessageResponse, dependencies=[Depends(rate_limiter.limit("auth"))])
+async def register(
+    request: RegisterRequest,
+    auth_service: AuthService = Depends(get_auth_service),
+    audit_service: AuditService = Depends(get_audit_service)
+) -> Dict[str, Any]:
     """
     Endpoint de registro
     REQ_002: Registro de usuarios
@@ -65,12 +92,20 @@ async def register(request: RegisterRequest) -> Dict[str, Any]:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/logout", response_model=MessageResponse)
-async def logout(user: dict = Depends(auth_middleware.get_current_user)) -> Dict[str, Any]:
+async def logout(
+    request: Optional[LogoutRequest] = None,
+    user: dict = Depends(auth_middleware.get_current_user),
+    auth_service: AuthService = Depends(get_auth_service),
+    audit_service: AuditService = Depends(get_audit_service)
+) -> Dict[str, Any]:
     """
     Endpoint de logout
     REQ_005: Cierre de sesión
     """
     try:
+        if request and request.refresh_token:
+            await auth_service.revoke_refresh_token(request.refresh_token)
+        
         # Registrar en auditoría
         await audit_service.log_activity(
             user_id=user["id"],
@@ -82,8 +117,12 @@ async def logout(user: dict = Depends(auth_middleware.get_current_user)) -> Dict
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/password-recovery", response_model=MessageResponse)
-async def password_recovery(request: PasswordRecoveryRequest) -> Dict[str, Any]:
+@router.post("/password-recovery", response_model=MessageResponse,
+             dependencies=[Depends(rate_limiter.limit("auth")), Depends(rate_limiter.limit("recovery_account"))])
+async def password_recovery(
+    request: PasswordRecoveryRequest,
+    auth_service: AuthService = Depends(get_auth_service)
+) -> Dict[str, Any]:
     """
     Endpoint de recuperación de contraseña
     REQ_004: Recuperación de contraseña
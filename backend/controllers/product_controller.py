@@ -2,61 +2,253 @@
 Controlador de productos
 Maneja las peticiones relacionadas con productos
 """
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
-from typing import List, Dict, Any, Optional
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from typing import List, Dict, Any, Optional, Tuple
 from backend.models.schemas import (
-    ProductCreate, ProductUpdate, ProductResponse, MessageResponse
+    ProductCreate, ProductUpdate, ProductResponse, ProductFieldsResponse, MessageResponse,
+    CategorySummaryResponse, ProductSearchResponse, ProductBatchRequest, ProductBatchResponse,
+    ProductChangesResponse
 )
 from backend.services.product_service import ProductService
+from backend.services.catalog_search_service import CatalogSearchService
 from backend.services.audit_service import AuditService
+from backend.services.dependencies import (
+    get_product_service, get_audit_service, get_catalog_search_service
+)
 from backend.middlewares.auth_middleware import AuthMiddleware
+from backend.middlewares.rate_limit_middleware import rate_limiter
+from backend.utils.compression import cached_json_response
+from backend.utils.event_broadcaster import event_broadcaster
+from backend.utils.image_upload import UploadTooLargeError, detect_image_type, read_upload
+from backend.utils.jwt_utils import create_stream_ticket
+from backend.config import config
 
 router = APIRouter(prefix="/productos", tags=["Productos"])
 
-product_service = ProductService()
-audit_service = AuditService()
 auth_middleware = AuthMiddleware()
 
+def product_fields(
+    fields: Optional[str] = Query(None, description="Campos a devolver separados por coma (ej. id,name,price)")
+) -> Optional[Tuple[str, ...]]:
+    """Valida el parámetro fields= de los endpoints de productos"""
+    try:
+        return ProductService.parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # ========== ENDPOINTS PÚBLICOS ==========
 
-@router.get("/publicos", response_model=List[ProductResponse])
+@router.get("/publicos", response_model=List[ProductFieldsResponse], response_model_exclude_unset=True,
+            dependencies=[Depends(rate_limiter.limit("public"))])
 async def list_public_products(
+    request: Request,
     search: Optional[str] = Query(None, description="Búsqueda por nombre, descripción, SKU o marca"),
-    category_id: Optional[str] = Query(None, description="Filtrar por ID de categoría")
-) -> List[Dict[str, Any]]:
+    category_id: Optional[str] = Query(None, description="Filtrar por ID de categoría"),
+    fields: Optional[Tuple[str, ...]] = Depends(product_fields),
+    product_service: ProductService = Depends(get_product_service)
+):
     """
     Endpoint PÚBLICO para listar productos (sin autenticación)
     Para usuarios que quieren ver productos sin iniciar sesión
     """
     try:
+        # Sin búsqueda libre el resultado se repite entre visitantes: se sirve precomprimido
+        if not search:
+            return await cached_json_response(
+                request,
+                key=("productos_publicos", category_id, fields),
+                version=product_service.catalog_version,
+                producer=lambda: product_service.list_products(category_id=category_id, public=True, fields=fields)
+            )
+        
         products = await product_service.list_products(
             search=search,
             category_id=category_id,
-            public=True  # Solo productos activos
+            public=True,  # Solo productos activos
+            fields=fields
         )
         return products
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/categorias")
-async def list_categories() -> List[Dict[str, Any]]:
+@router.get("/categorias", dependencies=[Depends(rate_limiter.limit("public"))])
+async def list_categories(
+    request: Request,
+    product_service: ProductService = Depends(get_product_service)
+):
     """
     Endpoint PÚBLICO para listar categorías
     """
     try:
-        categories = await product_service.list_categories()
-        return categories
+        return await cached_json_response(
+            request,
+            key=("categorias",),
+            version=product_service.catalog_version,
+            producer=product_service.list_categories
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/categorias/resumen", response_model=List[CategorySummaryResponse],
+            dependencies=[Depends(rate_limiter.limit("public"))])
+async def get_category_summary(
+    request: Request,
+    product_service: ProductService = Depends(get_product_service)
+):
+    """
+    Endpoint PÚBLICO con el resumen de cada categoría: productos activos,
+    productos con stock y rango de precios
+    """
+    try:
+        return await cached_json_response(
+            request,
+            key=("categorias_resumen",),
+            version=product_service.catalog_version,
+            producer=product_service.get_category_summary
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/filtrar", response_model=ProductSearchResponse, dependencies=[Depends(rate_limiter.limit("public"))])
+async def search_products(
+    brand: Optional[List[str]] = Query(None, description="Marcas (se puede repetir)"),
+    category_id: Optional[List[int]] = Query(None, description="IDs de categoría (se puede repetir)"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: Optional[bool] = Query(None, description="Solo productos con stock disponible"),
+    sort: str = Query("newest", pattern="^(newest|price_asc|price_desc|name)$"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(24, ge=1, le=config.CATALOG_PAGE_MAX),
+    search_service: CatalogSearchService = Depends(get_catalog_search_service)
+):
+    """
+    Endpoint PÚBLICO de filtrado facetado: productos activos filtrados por marca,
+    categoría, precio y stock, con los conteos de cada faceta
+    """
+    try:
+        return await search_service.search(
+            brands=brand,
+            category_ids=category_id,
+            min_price=min_price,
+            max_price=max_price,
+            in_stock=in_stock,
+            sort=sort,
+            offset=offset,
+            limit=limit
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _lookup_batch(ids: List[int], skus: List[str], fields: Optional[Tuple[str, ...]],
+                        search_service: CatalogSearchService,
+                        product_service: ProductService) -> Dict[str, Any]:
+    """Resuelve un lote desde el índice del worker o, si no está cargado, con una consulta"""
+    if not ids and not skus:
+        raise HTTPException(status_code=400, detail="Indica al menos un ID o SKU")
+    if len(ids) + len(skus) > config.BATCH_LOOKUP_MAX:
+        raise HTTPException(status_code=400, detail=f"Máximo {config.BATCH_LOOKUP_MAX} productos por lote")
+    try:
+        items = search_service.lookup(ids, skus, fields)
+        if items is None:
+            items = await product_service.get_products_batch(tuple(ids), tuple(skus), fields)
+        found = sum(1 for item in items if item["found"])
+        return {"items": items, "found": found, "missing": len(items) - found}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/lote", response_model=ProductBatchResponse, response_model_exclude_unset=True,
+            dependencies=[Depends(rate_limiter.limit("public"))])
+async def get_products_batch(
+    ids: Optional[str] = Query(None, description="IDs separados por coma"),
+    skus: Optional[str] = Query(None, description="SKUs separados por coma"),
+    fields: Optional[Tuple[str, ...]] = Depends(product_fields),
+    search_service: CatalogSearchService = Depends(get_catalog_search_service),
+    product_service: ProductService = Depends(get_product_service)
+):
+    """
+    Endpoint PÚBLICO para obtener varios productos por ID o SKU (carrito, favoritos)
+    Devuelve un resultado por clave en el orden pedido; found=False si no existe o está inactivo
+    """
+    try:
+        id_list = [int(value) for value in (ids or "").split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Los IDs deben ser numéricos")
+    sku_list = [value.strip() for value in (skus or "").split(",") if value.strip()]
+    return await _lookup_batch(id_list, sku_list, fields, search_service, product_service)
+
+@router.post("/lote", response_model=ProductBatchResponse, response_model_exclude_unset=True,
+             dependencies=[Depends(rate_limiter.limit("public"))])
+async def post_products_batch(
+    batch: ProductBatchRequest,
+    fields: Optional[Tuple[str, ...]] = Depends(product_fields),
+    search_service: CatalogSearchService = Depends(get_catalog_search_service),
+    product_service: ProductService = Depends(get_product_service)
+):
+    """
+    Endpoint PÚBLICO equivalente a GET /lote, con las claves en el cuerpo (listas largas de SKUs)
+    """
+    return await _lookup_batch(batch.ids, batch.skus, fields, search_service, product_service)
+
+@router.get("/cambios", response_model=ProductChangesResponse, response_model_exclude_unset=True,
+            dependencies=[Depends(rate_limiter.limit("public"))])
+async def list_product_changes(
+    since: Optional[str] = Query(None, description="Marca devuelta por la llamada anterior (vacío: todo el catálogo)"),
+    limit: int = Query(100, ge=1, le=config.PRODUCT_CHANGES_PAGE_MAX),
+    fields: Optional[Tuple[str, ...]] = Depends(product_fields),
+    product_service: ProductService = Depends(get_product_service)
+):
+    """
+    Endpoint PÚBLICO de sincronización incremental del catálogo
+    Devuelve solo los productos creados, modificados o desactivados desde `since`,
+    y la marca nueva; mientras has_more sea True hay que seguir pidiendo
+    """
+    try:
+        return await product_service.list_changes(since=since, limit=limit, fields=fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # ========== ENDPOINTS PROTEGIDOS ==========
 
-@router.get("/listar", response_model=List[ProductResponse])
+@router.get("/eventos")
+async def product_events(
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user: dict = Depends(auth_middleware.get_stream_user)
+):
+    """
+    Stream (Server-Sent Events) de cambios de productos: product.created,
+    product.updated, product.deactivated y product.stock de este worker, y
+    product.sync con los cambios de los demás (ver ProductChangeFeed).
+    Al reconectar, el navegador envía Last-Event-ID y recibe lo que se perdió;
+    si ya no está en el buffer recibe un evento reset y debe recargar todo
+    """
+    subscriber = event_broadcaster.subscribe(last_event_id)
+    return StreamingResponse(
+        event_broadcaster.stream(subscriber, heartbeat=config.EVENTS_HEARTBEAT_INTERVAL),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/eventos/ticket")
+async def product_events_ticket(
+    user: dict = Depends(auth_middleware.get_current_user)
+) -> Dict[str, Any]:
+    """
+    Ticket para abrir /productos/eventos con EventSource (que no envía cabeceras)
+    Dura EVENTS_TICKET_SECONDS: al reconectar el cliente pide uno nuevo
+    """
+    return {"ticket": create_stream_ticket(user["id"]), "expires_in": config.EVENTS_TICKET_SECONDS}
+
+@router.get("/listar", response_model=List[ProductFieldsResponse], response_model_exclude_unset=True)
 async def list_products(
     search: Optional[str] = Query(None, description="Búsqueda por nombre o descripción"),
     category_id: Optional[str] = Query(None, description="Filtrar por ID de categoría"),
     min_stock: Optional[bool] = Query(None, description="Solo productos con stock mínimo"),
-    user: dict = Depends(auth_middleware.get_current_user)
+    fields: Optional[Tuple[str, ...]] = Depends(product_fields),
+    user: dict = Depends(auth_middleware.get_current_user),
+    product_service: ProductService = Depends(get_product_service)
 ) -> List[Dict[str, Any]]:
     """
     Endpoint para listar productos (requiere autenticación)
@@ -68,16 +260,37 @@ async def list_products(
             search=search,
             category_id=category_id,
             min_stock=min_stock,
-            public=False
+            public=False,
+            fields=fields
         )
         return products
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/detalle/{product_id}", response_model=ProductFieldsResponse, response_model_exclude_unset=True)
+async def get_product(
+    product_id: str,
+    fields: Optional[Tuple[str, ...]] = Depends(product_fields),
+    user: dict = Depends(auth_middleware.get_current_user),
+    product_service: ProductService = Depends(get_product_service)
+) -> Dict[str, Any]:
+    """
+    Endpoint para obtener un producto con todas sus imágenes (requiere autenticación)
+    """
+    try:
+        product = await product_service.get_product(product_id, fields=fields)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if product is None:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    return product
+
 @router.post("/crear", response_model=ProductResponse)
 async def create_product(
     product: ProductCreate,
-    user: dict = Depends(auth_middleware.get_current_user)
+    user: dict = Depends(auth_middleware.get_current_user),
+    product_service: ProductService = Depends(get_product_service),
+    audit_service: AuditService = Depends(get_audit_service)
 ) -> Dict[str, Any]:
     """
     Endpoint para crear producto
@@ -103,7 +316,9 @@ async def create_product(
 async def update_product(
     product_id: str,
     product: ProductUpdate,
-    user: dict = Depends(auth_middleware.get_current_user)
+    user: dict = Depends(auth_middleware.get_current_user),
+    product_service: ProductService = Depends(get_product_service),
+    audit_service: AuditService = Depends(get_audit_service)
 ) -> Dict[str, Any]:
     """
     Endpoint para actualizar producto
@@ -117,13 +332,15 @@ async def update_product(
             raise HTTPException(status_code=400, detail="No hay datos para actualizar")
         
         result = await product_service.update_product(product_id, product_data)
+        changes = result.pop("changes", {})
         
-        # Registrar en auditoría
+        # Registrar en auditoría (solo los campos que cambiaron)
         await audit_service.log_activity(
             user_id=user["id"],
             action="UPDATE",
             resource="product",
-            record_id=product_id
+            record_id=product_id,
+            details={"changes": changes} if changes else None
         )
         
         return result
@@ -133,7 +350,9 @@ async def update_product(
 @router.delete("/eliminar/{product_id}", response_model=MessageResponse)
 async def delete_product(
     product_id: str,
-    user: dict = Depends(auth_middleware.get_current_user)
+    user: dict = Depends(auth_middleware.get_current_user),
+    product_service: ProductService = Depends(get_product_service),
+    audit_service: AuditService = Depends(get_audit_service)
 ) -> Dict[str, Any]:
     """
     Endpoint para eliminar (desactivar) producto
@@ -154,16 +373,18 @@ async def delete_product(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/stock-minimo", response_model=List[ProductResponse])
+@router.get("/stock-minimo", response_model=List[ProductFieldsResponse], response_model_exclude_unset=True)
 async def get_low_stock_products(
-    user: dict = Depends(auth_middleware.get_current_user)
+    fields: Optional[Tuple[str, ...]] = Depends(product_fields),
+    user: dict = Depends(auth_middleware.get_current_user),
+    product_service: ProductService = Depends(get_product_service)
 ) -> List[Dict[str, Any]]:
     """
     Endpoint para obtener productos con stock mínimo
     REQ_012: Control de stock mínimo
     """
     try:
-        products = await product_service.get_low_stock_products()
+        products = await product_service.get_low_stock_products(fields=fields)
         return products
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -172,25 +393,31 @@ async def get_low_stock_products(
 async def upload_product_image(
     product_id: str,
     file: UploadFile = File(...),
-    user: dict = Depends(auth_middleware.get_current_user)
+    user: dict = Depends(auth_middleware.get_current_user),
+    product_service: ProductService = Depends(get_product_service),
+    audit_service: AuditService = Depends(get_audit_service)
 ) -> Dict[str, Any]:
     """
     Endpoint para subir imagen de producto
     REQ_013: Carga de imagen de producto
     """
     try:
-        # Validar que es una imagen
-        if not file.content_type or not file.content_type.startswith("image/"):
-            raise HTTPException(status_code=400, detail="El archivo debe ser una imagen")
+        # Leer el archivo calculando su hash
+        image_bytes, content_hash = await read_upload(file, config.IMAGE_UPLOAD_MAX_BYTES)
         
-        # Leer el archivo
-        image_bytes = await file.read()
+        # Validar que es una imagen por su contenido, no por el nombre o el Content-Type
+        detected = detect_image_type(image_bytes[:16])
+        if detected is None:
+            raise HTTPException(status_code=400, detail="El archivo debe ser una imagen JPEG, PNG, GIF, WebP o AVIF")
+        content_type, extension = detected
         
         # Subir a Supabase Storage
         result = await product_service.upload_product_image(
             product_id=product_id,
             image_file=image_bytes,
-            filename=file.filename or "image.jpg"
+            content_hash=content_hash,
+            content_type=content_type,
+            extension=extension
         )
         
         # Registrar en auditoría
@@ -202,6 +429,10 @@ async def upload_product_image(
         )
         
         return {"message": result["message"], "image_url": result["image_url"]}
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
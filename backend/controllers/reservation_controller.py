@@ -0,0 +1,74 @@
+"""
+Controlador de reservas
+Maneja las reservas de stock del carrito
+"""
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Dict, Any
+from backend.models.schemas import ReservationRequest, ReservationResponse
+from backend.services.reservation_service import ReservationService
+from backend.services.dependencies import get_reservation_service
+from backend.middlewares.auth_middleware import AuthMiddleware
+
+router = APIRouter(prefix="/reservas", tags=["Reservas"])
+
+auth_middleware = AuthMiddleware()
+
+@router.post("/retener", response_model=ReservationResponse)
+async def hold_stock(
+    request: ReservationRequest,
+    user: dict = Depends(auth_middleware.get_current_user),
+    reservation_service: ReservationService = Depends(get_reservation_service)
+) -> Dict[str, Any]:
+    """
+    Endpoint para retener stock de un producto del carrito
+    La cantidad es el total del producto en el carrito; la reserva vence tras
+    RESERVATION_TTL_SECONDS si no se extiende. Responde 409 si no hay stock disponible
+    """
+    try:
+        result = await reservation_service.hold(str(user["id"]), str(request.product_id), request.quantity)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not result.get("success"):
+        raise HTTPException(status_code=409, detail=result)
+    return result
+
+@router.post("/extender")
+async def extend_holds(
+    user: dict = Depends(auth_middleware.get_current_user),
+    reservation_service: ReservationService = Depends(get_reservation_service)
+) -> Dict[str, Any]:
+    """
+    Endpoint para renovar el vencimiento de las reservas del carrito
+    """
+    try:
+        return await reservation_service.extend(str(user["id"]))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/liberar")
+async def release_holds(
+    user: dict = Depends(auth_middleware.get_current_user),
+    reservation_service: ReservationService = Depends(get_reservation_service)
+) -> Dict[str, Any]:
+    """
+    Endpoint para liberar todas las reservas del carrito (vaciar carrito)
+    """
+    try:
+        return await reservation_service.release(str(user["id"]))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/liberar/{product_id}")
+async def release_product_hold(
+    product_id: str,
+    user: dict = Depends(auth_middleware.get_current_user),
+    reservation_service: ReservationService = Depends(get_reservation_service)
+) -> Dict[str, Any]:
+    """
+    Endpoint para liberar la reserva de un producto del carrito
+    """
+    try:
+        return await reservation_service.release(str(user["id"]), product_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -2,29 +2,30 @@
 Controlador de roles
 Maneja las peticiones relacionadas con roles y permisos
 """
-from fastapi import APIRouter, HTTPException, Depends  # type: ignore[import]
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Query  # type: ignore[import]
+from typing import List, Dict, Any, Optional
 import logging
 from backend.models.schemas import (
-    RoleAssignRequest, RoleResponse, MessageResponse, UserResponse,
-    UpdateUserRoleRequest, RemoveUserRoleRequest
+    RoleAssignRequest, RoleResponse, MessageResponse, UserResponse, UserPageResponse,
+    UpdateUserRoleRequest, RemoveUserRoleRequest, BulkRoleAssignRequest, BulkRoleAssignResponse
 )
 from backend.services.role_service import RoleService
 from backend.services.audit_service import AuditService
+from backend.services.dependencies import get_role_service, get_audit_service
 from backend.middlewares.auth_middleware import AuthMiddleware
+from backend.config import config
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/roles", tags=["Roles"])
 
-role_service = RoleService()
-audit_service = AuditService()
 auth_middleware = AuthMiddleware()
 
 @router.get("/listar", response_model=List[RoleResponse])
 async def list_roles(
-    user: dict = Depends(auth_middleware.get_current_user)
+    user: dict = Depends(auth_middleware.get_current_user),
+    role_service: RoleService = Depends(get_role_service)
 ) -> List[Dict[str, Any]]:
     """
     Endpoint para listar roles
@@ -42,7 +43,9 @@ async def list_roles(
 @router.post("/asignar", response_model=MessageResponse)
 async def assign_role(
     request: RoleAssignRequest,
-    user: dict = Depends(auth_middleware.require_role("admin"))
+    user: dict = Depends(auth_middleware.require_role("admin")),
+    role_service: RoleService = Depends(get_role_service),
+    audit_service: AuditService = Depends(get_audit_service)
 ) -> Dict[str, Any]:
     """
     Endpoint para asignar rol a usuario
@@ -67,9 +70,53 @@ async def assign_role(
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/asignar-lote", response_model=BulkRoleAssignResponse)
+async def bulk_assign_role(
+    request: BulkRoleAssignRequest,
+    user: dict = Depends(auth_middleware.require_role("admin")),
+    role_service: RoleService = Depends(get_role_service),
+    audit_service: AuditService = Depends(get_audit_service)
+) -> Dict[str, Any]:
+    """
+    Endpoint para asignar un rol a varios usuarios a la vez
+    REQ_003: Gestión de roles y permisos
+    Solo accesible para administradores
+    """
+    if len(request.user_ids) > config.ROLE_BULK_MAX:
+        raise HTTPException(status_code=400, detail=f"Máximo {config.ROLE_BULK_MAX} usuarios por lote")
+    try:
+        result = await role_service.bulk_assign_role(request.user_ids, request.role_id)
+        
+        # Registrar en auditoría (un registro por usuario actualizado, un solo insert)
+        await audit_service.log_activities(
+            user_id=user["id"],
+            action="ASSIGN_ROLE",
+            resource="user_role",
+            entries=[
+                {
+                    "record_id": change["user_id"],
+                    "details": {
+                        "target_user_id": change["user_id"],
+                        "role_id": request.role_id,
+                        "changes": {"role_id": [change["previous_role_id"], request.role_id]}
+                    }
+                }
+                for change in result["changed"]
+            ]
+        )
+        
+        return {
+            "role": result["role"],
+            "updated": len(result["changed"]),
+            "results": result["results"]
+        }
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/usuarios", response_model=List[UserResponse])
 async def list_users(
-    user: dict = Depends(auth_middleware.require_role("admin"))
+    user: dict = Depends(auth_middleware.require_role("admin")),
+    role_service: RoleService = Depends(get_role_service)
 ) -> List[Dict[str, Any]]:
     """
     Endpoint para listar todos los usuarios con sus roles
@@ -85,10 +132,40 @@ async def list_users(
         logger.error(f"Error al listar usuarios: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error al listar usuarios: {str(e)}")
 
+@router.get("/usuarios/buscar", response_model=UserPageResponse)
+async def search_users(
+    q: Optional[str] = Query(None, max_length=100, description="Texto a buscar en email o nombre"),
+    match: str = Query("contains", pattern="^(contains|prefix)$"),
+    role_id: Optional[str] = Query(None, description="ID de rol, o 'none' para usuarios sin rol"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    limit: int = Query(25, ge=1, le=config.USER_SEARCH_PAGE_MAX),
+    user: dict = Depends(auth_middleware.require_role("admin")),
+    role_service: RoleService = Depends(get_role_service)
+) -> Dict[str, Any]:
+    """
+    Endpoint para buscar usuarios por email o nombre, con filtro de rol y paginación por cursor
+    REQ_003: Gestión de roles y permisos
+    Solo accesible para administradores
+    """
+    try:
+        return await role_service.search_users(
+            query=q,
+            match=match,
+            role_id=role_id,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error al buscar usuarios: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error al buscar usuarios: {str(e)}")
+
 @router.get("/usuarios/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: str,
-    user: dict = Depends(auth_middleware.require_role("admin"))
+    user: dict = Depends(auth_middleware.require_role("admin")),
+    role_service: RoleService = Depends(get_role_service)
 ):
     """
     Endpoint para obtener detalles de un usuario
@@ -108,7 +185,9 @@ async def get_user(
 async def update_user_role(
     user_id: str,
     request: UpdateUserRoleRequest,
-    current_user: dict = Depends(auth_middleware.require_role("admin"))
+    current_user: dict = Depends(auth_middleware.require_role("admin")),
+    role_service: RoleService = Depends(get_role_service),
+    audit_service: AuditService = Depends(get_audit_service)
 ) -> Dict[str, Any]:
     """
     Endpoint para actualizar el rol de un usuario
@@ -137,7 +216,9 @@ async def update_user_role(
 async def remove_user_role(
     user_id: str,
     request: RemoveUserRoleRequest,
-    current_user: dict = Depends(auth_middleware.require_role("admin"))
+    current_user: dict = Depends(auth_middleware.require_role("admin")),
+    role_service: RoleService = Depends(get_role_service),
+    audit_service: AuditService = Depends(get_audit_service)
 ) -> Dict[str, Any]:
     """
     Endpoint para remover un rol de un usuario
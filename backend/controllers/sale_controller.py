@@ -0,0 +1,48 @@
+"""
+Controlador de ventas
+Maneja las peticiones relacionadas con ventas y checkout
+"""
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Dict, Any
+from backend.models.schemas import CheckoutRequest, CheckoutResponse
+from backend.services.sale_service import SaleService
+from backend.services.audit_service import AuditService
+from backend.services.dependencies import get_sale_service, get_audit_service
+from backend.middlewares.auth_middleware import AuthMiddleware
+
+router = APIRouter(prefix="/ventas", tags=["Ventas"])
+
+auth_middleware = AuthMiddleware()
+
+@router.post("/checkout", response_model=CheckoutResponse)
+async def checkout(
+    request: CheckoutRequest,
+    user: dict = Depends(auth_middleware.get_current_user),
+    sale_service: SaleService = Depends(get_sale_service),
+    audit_service: AuditService = Depends(get_audit_service)
+) -> Dict[str, Any]:
+    """
+    Endpoint para confirmar la compra del carrito
+    Descuenta el stock de todas las líneas de forma atómica; si alguna línea no se
+    puede vender (sin stock, precio cambiado, inactiva) no se vende ninguna y se
+    responde 409 con el estado de cada línea
+    """
+    try:
+        lines = [line.dict() for line in request.lines]
+        result = await sale_service.checkout(user["id"], lines)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if not result.get("success"):
+        raise HTTPException(status_code=409, detail=result)
+    
+    # Registrar en auditoría
+    await audit_service.log_activity(
+        user_id=user["id"],
+        action="CHECKOUT",
+        resource="sale",
+        record_id=str(result.get("sale_id")),
+        details={"total": result.get("total"), "lines": len(lines)}
+    )
+    
+    return result
@@ -0,0 +1,28 @@
+"""
+Configuración de Gunicorn para producción
+
+Uso:
+    gunicorn -c backend/gunicorn_conf.py backend.main:app
+"""
+from backend.config import config
+
+bind = f"{config.HOST}:{config.PORT}"
+workers = config.WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Cada worker importa la app por su cuenta: los clientes HTTP no se comparten entre forks
+preload_app = False
+
+# Apagado ordenado: al recibir SIGTERM los workers dejan de aceptar conexiones
+# y tienen graceful_timeout segundos para terminar las peticiones en curso
+graceful_timeout = config.GRACEFUL_TIMEOUT
+timeout = config.GRACEFUL_TIMEOUT * 2
+keepalive = config.KEEPALIVE_TIMEOUT
+
+# Reciclar workers de forma escalonada para evitar fugas de memoria sin cortar tráfico
+max_requests = 10000
+max_requests_jitter = 1000
+
+forwarded_allow_ips = config.FORWARDED_ALLOW_IPS
+accesslog = "-"
+errorlog = "-"
@@ -1,16 +1,93 @@
 """
 Aplicación principal de Tingo Ventas
 """
-from fastapi import FastAPI
+from backend.config import config
+from backend.utils.startup_profiler import startup_profiler
+
+# Se instala antes del resto de imports para medir cuánto cuesta cada módulo
+if config.STARTUP_PROFILE:
+    startup_profiler.install()
+
+from backend.utils.log import setup_logging, shutdown_logging
+
+setup_logging(config.LOG_LEVEL, json_format=config.LOG_FORMAT == "json",
+              queue_size=config.LOG_QUEUE_SIZE, sample_rates=config.LOG_SAMPLE_RATES)
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.exception_handlers import http_exception_handler
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from backend.config import config
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from backend.routes.api import api_router
+from backend.middlewares.compression_middleware import CompressionMiddleware
+from backend.middlewares.request_id_middleware import RequestIdMiddleware
+from backend.services.supabase_service import SupabaseService
+from backend.services.dependencies import (
+    get_catalog_search_service, get_health_service, get_product_service, get_reservation_service
+)
+from backend.services.product_change_feed import ProductChangeFeed
+from backend.services.product_service import ProductService
+from backend.services.token_version_service import TokenVersionService
+from backend.utils.circuit_breaker import UpstreamUnavailableError, find_upstream_error
+from backend.utils.event_broadcaster import event_broadcaster
+from backend.utils.lifecycle import lifecycle
+from backend.utils.metrics import metrics
+
+# Registrado primero para cerrarse al final: los demás hooks de apagado todavía pueden loguear
+lifecycle.on_shutdown("logging", shutdown_logging)
+# Los clientes se crean por worker, en segundo plano (en el pool de hilos) una vez que el
+# worker ya acepta peticiones: /health responde sin esperar a importar el stack de Supabase
+lifecycle.on_startup("supabase_client", SupabaseService.get_client, background=True)
+lifecycle.on_startup("supabase_service_client", SupabaseService.get_service_client, background=True)
+# Sondeos de dependencias en segundo plano; /health/ready solo lee el último resultado
+lifecycle.add_periodic_task("health_probes", config.HEALTH_PROBE_INTERVAL, get_health_service().probe_all)
+# Las tareas periódicas son async: corren en el event loop, junto a los servicios que usan
+async def sweep_reservations():
+    await get_reservation_service().sweep_expired()
+
+async def reload_catalog_index():
+    await get_catalog_search_service().reload()
+
+async def poll_product_changes():
+    await ProductChangeFeed.poll(get_product_service())
+
+# Devuelve al stock las reservas de carrito vencidas
+lifecycle.add_periodic_task("reservation_sweeper", config.RESERVATION_SWEEP_INTERVAL, sweep_reservations)
+# Carga completa del índice facetado al arrancar y luego muy de vez en cuando; los cambios
+# de otros workers y de ventas/reservas le llegan por ProductChangeFeed
+lifecycle.add_periodic_task("catalog_index", config.CATALOG_INDEX_REFRESH_INTERVAL, reload_catalog_index)
+# Las escrituras de productos se difunden a los dashboards por /productos/eventos
+ProductService.on_product_write(
+    lambda action, product_id, data: event_broadcaster.publish(f"product.{action}", {"id": product_id, "data": data})
+)
+# Escrituras de otros workers y cambios fuera de ProductService (barrido de reservas)
+ProductChangeFeed.on_changes(
+    lambda changed, deleted: event_broadcaster.publish(
+        "product.sync", {"changed": [product["id"] for product in changed], "deleted": deleted}
+    )
+)
+lifecycle.add_periodic_task("product_changes", config.PRODUCT_CHANGES_POLL_INTERVAL, poll_product_changes)
+lifecycle.on_shutdown("event_streams", event_broadcaster.close)
+if config.STATELESS_AUTH:
+    lifecycle.add_periodic_task("token_versions", config.TOKEN_VERSION_REFRESH_INTERVAL, TokenVersionService.refresh)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque y apagado de los recursos de cada worker"""
+    await lifecycle.startup()
+    startup_profiler.uninstall()
+    startup_profiler.log_report()
+    try:
+        yield
+    finally:
+        await lifecycle.shutdown(timeout=config.GRACEFUL_TIMEOUT)
 
 app = FastAPI(
     title=config.APP_NAME,
     version=config.APP_VERSION,
-    description="Sistema de gestión de ventas"
+    description="Sistema de gestión de ventas",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -21,8 +98,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware, minimum_size=config.COMPRESSION_MIN_SIZE)
+# El más externo: el ID de petición cubre a todos los demás middlewares
+app.add_middleware(RequestIdMiddleware)
+
 app.include_router(api_router, prefix="/api")
 
+def _upstream_unavailable_response(error: UpstreamUnavailableError) -> JSONResponse:
+    """503 con Retry-After cuando Supabase no responde o su circuito está abierto"""
+    headers = {}
+    if error.retry_after:
+        headers["Retry-After"] = str(int(error.retry_after + 0.999))
+    return JSONResponse(
+        {"detail": "Servicio no disponible temporalmente", "dependency": error.dependency},
+        status_code=503,
+        headers=headers
+    )
+
+@app.exception_handler(UpstreamUnavailableError)
+async def upstream_unavailable_handler(request: Request, exc: UpstreamUnavailableError):
+    return _upstream_unavailable_response(exc)
+
+@app.exception_handler(StarletteHTTPException)
+async def upstream_aware_http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """Los controladores convierten cualquier error en 500; si el origen fue Supabase, es un 503"""
+    upstream = find_upstream_error(exc) if exc.status_code >= 500 else None
+    if upstream is not None:
+        return _upstream_unavailable_response(upstream)
+    return await http_exception_handler(request, exc)
+
 @app.get("/")
 async def root():
     return JSONResponse({
@@ -32,13 +136,27 @@ async def root():
     })
 
 @app.get("/health")
+@app.get("/health/live")
 async def health():
+    """Liveness: el proceso responde (no consulta dependencias)"""
     return JSONResponse({
         "status": "healthy",
         "service": config.APP_NAME
     })
 
+@app.get("/health/ready")
+async def readiness():
+    """Readiness: estado cacheado de Supabase; 503 si alguna dependencia falla"""
+    result = get_health_service().readiness()
+    result["service"] = config.APP_NAME
+    return JSONResponse(result, status_code=200 if result["ready"] else 503)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Métricas internas de este worker"""
+    return JSONResponse(metrics.snapshot())
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from backend.server import main
+    main()
 
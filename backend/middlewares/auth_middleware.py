@@ -2,20 +2,29 @@
 Middleware de autenticación
 Verifica tokens JWT y protege rutas
 """
-from fastapi import HTTPException, Security
+from fastapi import HTTPException, Query, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from backend.services.auth_service import AuthService
 from backend.services.role_service import RoleService
+from backend.services.dependencies import get_auth_service, get_role_service
+from backend.utils.circuit_breaker import UpstreamUnavailableError
+from backend.utils.jwt_utils import verify_stream_ticket
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 class AuthMiddleware:
     """Middleware para autenticación y autorización"""
     
-    def __init__(self):
-        self.auth_service = AuthService()
-        self.role_service = RoleService()
+    # Los servicios se resuelven en la primera petición, no al importar los controladores
+    @property
+    def auth_service(self) -> AuthService:
+        return get_auth_service()
+    
+    @property
+    def role_service(self) -> RoleService:
+        return get_role_service()
     
     async def get_current_user(self, credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
         """
@@ -31,7 +40,40 @@ class AuthMiddleware:
             HTTPException: Si el token es inválido o no está presente
         """
         token = credentials.credentials
-        user = self.auth_service.verify_user_token(token)
+        user = await self.auth_service.verify_user_token(token)
+        
+        if user is None:
+            raise HTTPException(
+                status_code=401,
+                detail="Token inválido o expirado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        
+        return user
+    
+    async def get_stream_user(self,
+                              credentials: Optional[HTTPAuthorizationCredentials] = Security(optional_security),
+                              ticket: Optional[str] = Query(None, description="Ticket de /productos/eventos/ticket (EventSource no envía cabeceras)")) -> dict:
+        """
+        Obtiene el usuario actual desde la cabecera Bearer o, si no está, desde ?ticket=
+        Para conexiones de EventSource, que no permiten enviar cabeceras. El access
+        token nunca va en la URL: el ticket dura segundos y solo abre el stream
+        
+        Args:
+            credentials: Credenciales HTTP Bearer opcionales
+            ticket: Ticket de stream en la query string
+            
+        Returns:
+            Datos del usuario autenticado
+            
+        Raises:
+            HTTPException: Si el token o el ticket es inválido o no está presente
+        """
+        if credentials:
+            user = await self.auth_service.verify_user_token(credentials.credentials)
+        else:
+            user_id = verify_stream_ticket(ticket) if ticket else None
+            user = {"id": user_id} if user_id else None
         
         if user is None:
             raise HTTPException(
@@ -54,7 +96,7 @@ class AuthMiddleware:
         """
         async def role_checker(credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
             token = credentials.credentials
-            user = self.auth_service.verify_user_token(token)
+            user = await self.auth_service.verify_user_token(token)
             
             if user is None:
                 raise HTTPException(
@@ -64,8 +106,12 @@ class AuthMiddleware:
                 )
             
             try:
-                user_roles_response = await self.role_service.get_user_roles(user["id"])
-                user_roles = [role.get("name") for role in user_roles_response if isinstance(role, dict) and role.get("name")]
+                if user.get("profile") is None and "role" in user:
+                    # Modo sin estado: el rol viene en el token ya validado contra su versión
+                    user_roles = [user["role"]] if user["role"] else []
+                else:
+                    user_roles_response = await self.role_service.get_user_roles(user["id"])
+                    user_roles = [role.get("name") for role in user_roles_response if isinstance(role, dict) and role.get("name")]
                 
                 # Admin tiene todos los permisos
                 if "admin" in user_roles:
@@ -89,7 +135,7 @@ class AuthMiddleware:
         
         return role_checker
     
-    def get_optional_user(self, credentials: Optional[HTTPAuthorizationCredentials] = Security(security)) -> Optional[dict]:
+    async def get_optional_user(self, credentials: Optional[HTTPAuthorizationCredentials] = Security(security)) -> Optional[dict]:
         """
         Obtiene el usuario si existe token, pero no lanza excepción si no hay
         
@@ -104,8 +150,10 @@ class AuthMiddleware:
         
         try:
             token = credentials.credentials
-            user = self.auth_service.verify_user_token(token)
+            user = await self.auth_service.verify_user_token(token)
             return user
+        except UpstreamUnavailableError:
+            raise
         except Exception:
             return None
 
@@ -0,0 +1,84 @@
+"""
+Middleware de compresión
+Comprime respuestas (brotli/gzip) según Accept-Encoding a partir de un tamaño mínimo
+"""
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from backend.utils.compression import compress, negotiate_encoding
+
+# Respuestas que no se deben bufferizar ni recomprimir
+_STREAMING_TYPES = ("text/event-stream",)
+_INCOMPRESSIBLE_PREFIXES = ("image/", "video/", "audio/", "application/zip", "application/gzip")
+
+class CompressionMiddleware:
+    """Middleware ASGI de compresión con negociación de contenido"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self.app, encoding, self.minimum_size)
+        await responder(scope, receive, send)
+
+class _CompressionResponder:
+    """Intercepta los mensajes de respuesta de una petición y los comprime al final"""
+
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = _unattached_send
+        self.start_message: Message = {}
+        self.passthrough = False
+        self.chunks = []
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    async def send_with_compression(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            # Ya comprimida (caché precomprimida), streaming o binario: no tocar
+            self.passthrough = (
+                "content-encoding" in headers
+                or content_type.startswith(_STREAMING_TYPES)
+                or content_type.startswith(_INCOMPRESSIBLE_PREFIXES)
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        self.chunks.append(message.get("body", b""))
+        if message.get("more_body", False):
+            return
+
+        body = b"".join(self.chunks)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if len(body) >= self.minimum_size:
+            body = compress(body, self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": body})
+
+async def _unattached_send(message: Message):
+    raise RuntimeError("send no inicializado")  # pragma: no cover
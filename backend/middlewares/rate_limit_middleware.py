@@ -0,0 +1,152 @@
+"""
+Middleware de limitación de tasa
+Token bucket por cliente (IP y/o usuario) configurable por ruta, con respuesta 429
+"""
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException, Request, Security
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from backend.config import config
+from backend.utils.jwt_utils import verify_token
+from backend.utils.metrics import metrics
+
+optional_security = HTTPBearer(auto_error=False)
+
+class RateLimitBackend(ABC):
+    """
+    Interfaz de almacenamiento de buckets
+    Una implementación compartida (p. ej. Redis) permite aplicar el mismo límite
+    entre todos los workers; la implementación local lo aplica por worker
+    """
+
+    @abstractmethod
+    async def consume(self, key: str, rate: float, burst: int, cost: float = 1) -> float:
+        """
+        Intenta consumir `cost` tokens del bucket `key`
+
+        Args:
+            key: Identificador del bucket (ruta + cliente)
+            rate: Tokens repuestos por segundo
+            burst: Capacidad máxima del bucket
+            cost: Tokens que consume la petición
+
+        Returns:
+            0 si se admite la petición; si no, segundos hasta que haya tokens suficientes
+        """
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """Buckets en memoria del proceso, acotados con LRU"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consume(self, key: str, rate: float, burst: int, cost: float = 1) -> float:
+        # Sin awaits: la operación es atómica dentro del event loop
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (float(burst), now))
+        tokens = min(float(burst), tokens + (now - updated) * rate)
+
+        if tokens >= cost:
+            self._buckets[key] = (tokens - cost, now)
+            retry_after = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            retry_after = (cost - tokens) / rate if rate > 0 else float("inf")
+
+        self._buckets.move_to_end(key)
+        # Un bucket expulsado vuelve lleno: solo favorece a clientes inactivos hace tiempo
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+class RateLimiter:
+    """Genera dependencias de FastAPI que aplican los límites de config.RATE_LIMITS"""
+
+    def __init__(self, backend: Optional[RateLimitBackend] = None):
+        self.backend = backend or InMemoryRateLimitBackend()
+
+    def set_backend(self, backend: RateLimitBackend):
+        """Reemplaza el backend (p. ej. uno compartido entre workers)"""
+        self.backend = backend
+
+    @staticmethod
+    def _client_key(request: Request, credentials: Optional[HTTPAuthorizationCredentials],
+                    key_by: str) -> str:
+        """Identificador del cliente según la política de la ruta ("ip", "user" o "ip+user")"""
+        ip = request.client.host if request.client else "unknown"
+        if key_by == "ip":
+            return f"ip:{ip}"
+
+        user_id = None
+        if credentials is not None:
+            payload = verify_token(credentials.credentials)
+            user_id = payload.get("sub") if payload else None
+
+        if key_by == "user":
+            # Sin token válido se limita por IP
+            return f"user:{user_id}" if user_id else f"ip:{ip}"
+        return f"ip:{ip}|user:{user_id or '-'}"
+
+    @staticmethod
+    async def _account_key(request: Request) -> str:
+        """
+        Identificador de la cuenta atacada: el email del cuerpo, normalizado
+        Limita el credential stuffing distribuido (muchas IPs contra una cuenta),
+        que un límite por IP no detecta. FastAPI ya leyó el cuerpo: request.json()
+        usa la copia en memoria
+        """
+        try:
+            body = await request.json()
+            email = body.get("email") if isinstance(body, dict) else None
+        except Exception:
+            email = None
+        if not isinstance(email, str) or not email.strip():
+            ip = request.client.host if request.client else "unknown"
+            return f"ip:{ip}"
+        return f"account:{email.strip().lower()}"
+
+    def limit(self, name: str):
+        """
+        Crea un dependency que aplica el límite `name`
+
+        Args:
+            name: Clave en config.RATE_LIMITS (por ejemplo "login" o "public")
+
+        Returns:
+            Función dependency para FastAPI
+        """
+        async def rate_limit_checker(
+            request: Request,
+            credentials: Optional[HTTPAuthorizationCredentials] = Security(optional_security)
+        ):
+            if not config.RATE_LIMIT_ENABLED:
+                return
+
+            policy: Dict = config.RATE_LIMITS.get(name, {})
+            if not policy:
+                return
+
+            rate = policy["per_minute"] / 60.0
+            key_by = policy.get("key", "ip")
+            if key_by == "account":
+                client_key = await self._account_key(request)
+            else:
+                client_key = self._client_key(request, credentials, key_by)
+            retry_after = await self.backend.consume(f"{name}:{client_key}", rate, policy["burst"])
+
+            if retry_after > 0:
+                metrics.increment("rate_limit_rejected_total", route=name)
+                raise HTTPException(
+                    status_code=429,
+                    detail="Demasiadas solicitudes, intente nuevamente más tarde",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+            metrics.increment("rate_limit_allowed_total", route=name)
+
+        return rate_limit_checker
+
+rate_limiter = RateLimiter()
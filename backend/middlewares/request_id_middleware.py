@@ -0,0 +1,46 @@
+"""
+Middleware de ID de petición
+Asigna a cada petición un ID (o respeta el X-Request-ID recibido), lo deja disponible
+para los logs y lo devuelve en la respuesta; registra una línea de acceso por petición
+"""
+import logging
+import time
+import uuid
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from backend.utils.log import request_id_var
+
+access_logger = logging.getLogger("backend.access")
+
+class RequestIdMiddleware:
+    """Middleware ASGI de correlación de logs"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = Headers(scope=scope).get("x-request-id") or uuid.uuid4().hex
+        token = request_id_var.set(request_id[:64])
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_request_id(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("X-Request-ID", request_id_var.get())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            access_logger.log(
+                logging.WARNING if status >= 500 else logging.INFO,
+                "%s %s %s", scope["method"], scope["path"], status,
+                extra={"status": status, "duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+            )
+            request_id_var.reset(token)
@@ -22,10 +22,20 @@ class PasswordRecoveryRequest(BaseModel):
     """Esquema para recuperación de contraseña"""
     email: EmailStr
 
+class RefreshRequest(BaseModel):
+    """Esquema para renovar el access token"""
+    refresh_token: str = Field(..., min_length=20)
+
+class LogoutRequest(BaseModel):
+    """Esquema para logout (el refresh token se revoca si se envía)"""
+    refresh_token: Optional[str] = None
+
 class AuthResponse(BaseModel):
     """Respuesta de autenticación"""
     access_token: str
     token_type: str
+    expires_in: Optional[int] = None       # Segundos de validez del access token
+    refresh_token: Optional[str] = None
     user: Dict[str, Any]
 
 # ========== PRODUCT SCHEMAS ==========
@@ -73,6 +83,7 @@ class ProductResponse(BaseModel):
     brand: Optional[str] = None
     price: float
     current_stock: int
+    available_stock: Optional[int] = None  # current_stock - unidades reservadas en carritos
     min_stock: int
     is_active: bool
     category_id: Optional[int] = None         # <--- CORREGIDO
@@ -82,6 +93,121 @@ class ProductResponse(BaseModel):
     created_at: Optional[str] = None
     updated_at: Optional[str] = None
 
+class ProductFieldsResponse(BaseModel):
+    """
+    Producto con solo los campos pedidos en fields= (los demás no se serializan:
+    los endpoints usan response_model_exclude_unset)
+    """
+    id: Union[str, int]
+    name: Optional[str] = None
+    description: Optional[str] = None
+    Sku: Optional[str] = None
+    brand: Optional[str] = None
+    price: Optional[float] = None
+    current_stock: Optional[int] = None
+    available_stock: Optional[int] = None
+    min_stock: Optional[int] = None
+    is_active: Optional[bool] = None
+    category_id: Optional[int] = None
+    category: Optional[str] = None
+    image_url: Optional[str] = None
+    images: Optional[List[str]] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class CategorySummaryResponse(BaseModel):
+    """Categoría con sus contadores para los filtros de la tienda"""
+    id: Union[str, int]
+    name: str
+    product_count: int = 0   # Productos activos
+    in_stock_count: int = 0  # Productos activos con stock
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+
+class ProductFacetsResponse(BaseModel):
+    """Conteos por faceta (con todos los filtros salvo el de la propia faceta)"""
+    brand: Dict[str, int] = {}
+    category: Dict[Union[str, int], int] = {}  # Por category_id
+    price: Dict[str, int] = {}       # Por rango de precio ("50-100", "1000+")
+    in_stock: int = 0
+
+
+class ProductSearchResponse(BaseModel):
+    """Página de productos filtrados con sus facetas"""
+    items: List[ProductResponse]
+    total: int
+    facets: ProductFacetsResponse
+
+class ProductBatchRequest(BaseModel):
+    """IDs y/o SKUs a buscar por lote"""
+    ids: List[int] = []
+    skus: List[str] = []
+
+class ProductBatchItem(BaseModel):
+    """Resultado de una clave del lote (product es None si no existe o está inactivo)"""
+    by: str  # "id" o "sku"
+    key: Union[str, int]
+    found: bool
+    product: Optional[ProductFieldsResponse] = None
+
+class ProductBatchResponse(BaseModel):
+    """Resultados del lote en el orden pedido: primero los IDs y luego los SKUs"""
+    items: List[ProductBatchItem]
+    found: int
+    missing: int
+
+class ProductChangesResponse(BaseModel):
+    """Cambios del catálogo desde la marca enviada (ver /productos/cambios)"""
+    changed: List[ProductFieldsResponse]  # Creados o modificados (activos)
+    deleted: List[Union[str, int]]        # IDs desactivados: quitarlos de la copia local
+    since: Optional[str] = None           # Marca para la próxima llamada
+    has_more: bool
+
+
+# ========== SALE SCHEMAS ==========
+
+class CheckoutLine(BaseModel):
+    """Línea del carrito para checkout"""
+    product_id: Union[str, int]
+    quantity: int = Field(..., gt=0)
+    price: Optional[float] = Field(None, gt=0)  # Precio que vio el cliente (se valida)
+
+class CheckoutRequest(BaseModel):
+    """Esquema para checkout"""
+    lines: List[CheckoutLine] = Field(..., min_length=1)
+
+class CheckoutLineResult(BaseModel):
+    """Resultado de una línea del checkout"""
+    product_id: Union[str, int]
+    quantity: int
+    status: str  # ok, not_found, inactive, price_changed, insufficient_stock
+    unit_price: Optional[float] = None
+    available: Optional[int] = None
+
+class CheckoutResponse(BaseModel):
+    """Respuesta de checkout"""
+    success: bool
+    sale_id: Optional[Union[str, int]] = None
+    total: Optional[float] = None
+    lines: List[CheckoutLineResult]
+
+
+class ReservationRequest(BaseModel):
+    """Esquema para reservar stock de un producto del carrito"""
+    product_id: Union[str, int]
+    quantity: int = Field(..., ge=0)  # Cantidad total en el carrito (0 libera)
+
+class ReservationResponse(BaseModel):
+    """Respuesta de reserva"""
+    success: bool
+    product_id: Union[str, int]
+    reservation_id: Optional[str] = None
+    quantity: Optional[int] = None
+    expires_at: Optional[str] = None
+    available: Optional[int] = None
+
 
 # ========== ROLE SCHEMAS ==========
 
@@ -90,6 +216,22 @@ class RoleAssignRequest(BaseModel):
     user_id: str
     role_id: str
 
+class BulkRoleAssignRequest(BaseModel):
+    """Esquema para asignar un rol a varios usuarios"""
+    user_ids: List[str] = Field(..., min_length=1)
+    role_id: str
+
+class BulkRoleAssignResult(BaseModel):
+    """Resultado de un usuario: updated, unchanged, not_found o invalid"""
+    user_id: str
+    status: str
+
+class BulkRoleAssignResponse(BaseModel):
+    """Resultado de la asignación en lote"""
+    role: Optional[str] = None
+    updated: int
+    results: List[BulkRoleAssignResult]
+
 class RoleResponse(BaseModel):
     """Respuesta de rol"""
     id: Union[str, int]
@@ -119,6 +261,12 @@ class UserListResponse(BaseModel):
     users: List[UserResponse]
     total: int
 
+class UserPageResponse(BaseModel):
+    """Página de la búsqueda de usuarios"""
+    users: List[UserResponse]
+    total: Optional[int] = None        # Estimado; solo en la primera página
+    next_cursor: Optional[str] = None  # None si no hay más páginas
+
 class UpdateUserRoleRequest(BaseModel):
     """Esquema para actualizar rol de usuario"""
     role_id: str
@@ -130,12 +278,15 @@ class RemoveUserRoleRequest(BaseModel):
 # ========== AUDIT SCHEMAS ==========
 
 class AuditLogResponse(BaseModel):
-    """Respuesta de registro de auditoría"""
+    """Respuesta de registro de auditoría (columnas de audit_logs)"""
     id: Union[str, int]
-    user_id: Union[str, int]
+    profile_id: Optional[Union[str, int]] = None
     action: str
-    resource: str
-    details: Dict[str, Any]
+    table_name: Optional[str] = None
+    record_id: Optional[str] = None
+    details: Optional[Dict[str, Any]] = None
+    changed_fields: Optional[List[str]] = None
+    profiles: Optional[Dict[str, Any]] = None
     created_at: str
 
 # ========== COMMON SCHEMAS ==========
@@ -3,7 +3,7 @@ Rutas principales del API
 Agrupa todos los routers de los controladores
 """
 from fastapi import APIRouter
-from backend.controllers import auth_controller, product_controller, role_controller, audit_controller
+from backend.controllers import auth_controller, product_controller, role_controller, audit_controller, sale_controller, reservation_controller
 
 api_router = APIRouter()
 
@@ -12,4 +12,6 @@ api_router.include_router(auth_controller.router)
 api_router.include_router(product_controller.router)
 api_router.include_router(role_controller.router)
 api_router.include_router(audit_controller.router)
+api_router.include_router(sale_controller.router)
+api_router.include_router(reservation_controller.router)
 
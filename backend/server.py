@@ -0,0 +1,49 @@
+"""
+Punto de entrada del servidor de Tingo Ventas
+Lanza uvicorn con varios workers y apagado ordenado
+
+Uso:
+    python -m backend.server --workers 4 --port 8000
+"""
+import argparse
+import uvicorn
+from backend.config import config
+
+APP_IMPORT_PATH = "backend.main:app"
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Lee los argumentos de línea de comandos (por defecto los de config)"""
+    parser = argparse.ArgumentParser(description=f"Servidor de {config.APP_NAME}")
+    parser.add_argument("--host", default=config.HOST)
+    parser.add_argument("--port", type=int, default=config.PORT)
+    parser.add_argument("--workers", type=int, default=config.WORKERS,
+                        help="Número de procesos worker (default: WEB_CONCURRENCY o núcleos)")
+    parser.add_argument("--graceful-timeout", type=int, default=config.GRACEFUL_TIMEOUT,
+                        help="Segundos para terminar las peticiones en curso al apagar")
+    parser.add_argument("--reload", action="store_true", help="Recarga automática (solo desarrollo)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Arranca el servidor"""
+    args = parse_args(argv)
+
+    # Con --reload uvicorn solo admite un proceso
+    workers = 1 if args.reload else max(1, args.workers)
+
+    # La app se pasa como import string para que cada worker la importe
+    # (y cree sus propios clientes en el lifespan) en lugar de heredarla del maestro
+    uvicorn.run(
+        APP_IMPORT_PATH,
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        reload=args.reload,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        timeout_keep_alive=config.KEEPALIVE_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=config.FORWARDED_ALLOW_IPS,
+        lifespan="on",
+    )
+
+if __name__ == "__main__":
+    main()
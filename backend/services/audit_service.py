@@ -2,16 +2,21 @@
 Servicio de auditoría
 Maneja el registro de actividades del sistema
 """
-from typing import List, Dict, Any, Optional
-from supabase import Client
+import logging
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 from backend.services.supabase_service import SupabaseService
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
 class AuditService:
     """Servicio para operaciones de auditoría"""
     
     def __init__(self):
-        self.supabase: Client = SupabaseService.get_service_client()
+        self.supabase: "Client" = SupabaseService.get_service_client()
     
     async def log_activity(self, user_id: str, action: str, 
                           resource: str, details: Optional[Dict[str, Any]] = None,
@@ -23,43 +28,86 @@ class AuditService:
             user_id: ID del usuario (profile_id en la tabla)
             action: Acción realizada (CREATE, UPDATE, DELETE, LOGIN, etc.)
             resource: Recurso afectado (se mapea a table_name)
-            details: Detalles adicionales de la acción
+            details: Detalles adicionales de la acción. Si incluye `changes`
+                ({campo: [antes, después]}), sus claves se guardan en changed_fields
             record_id: ID del registro afectado
             
         Returns:
             Registro de auditoría creado
         """
         try:
-            # Mapear resource a table_name
-            table_name_map = {
-                "product": "products",
-                "user": "profiles",
-                "auth": "auth",
-                "product_image": "product_images"
-            }
-            table_name = table_name_map.get(resource, resource)
-            
-            audit_data = {
-                "profile_id": user_id,  # Usar profile_id en lugar de user_id
-                "action": action,
-                "table_name": table_name,
-                "record_id": record_id,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            
-            response = self.supabase.table("audit_logs").insert(audit_data).execute()
+            audit_data = self._build_entry(user_id, action, resource, details, record_id)
+            response = await SupabaseService.execute(self.supabase.table("audit_logs").insert(audit_data))
             
             if response.data and len(response.data) > 0:
                 return response.data[0]
             raise Exception("Error al crear registro de auditoría")
         except Exception as e:
             # No lanzar excepción en auditoría para no interrumpir el flujo principal
-            print(f"Error en auditoría: {str(e)}")
+            logger.warning("Error en auditoría: %s", e, extra={"action": action, "resource": resource})
             return {}
     
+    async def log_activities(self, user_id: str, action: str, resource: str,
+                             entries: List[Dict[str, Any]]) -> int:
+        """
+        Registra varias actividades de una misma operación con un solo insert
+        
+        Args:
+            user_id: ID del usuario que realizó la operación
+            action: Acción realizada
+            resource: Recurso afectado
+            entries: Un dict por registro afectado, con record_id y details opcionales
+            
+        Returns:
+            Cantidad de registros creados (0 si falló)
+        """
+        if not entries:
+            return 0
+        try:
+            rows = [
+                self._build_entry(user_id, action, resource, entry.get("details"), entry.get("record_id"))
+                for entry in entries
+            ]
+            response = await SupabaseService.execute(self.supabase.table("audit_logs").insert(rows))
+            return len(response.data or [])
+        except Exception as e:
+            # Igual que log_activity: la auditoría no interrumpe la operación
+            logger.warning("Error en auditoría: %s", e, extra={"action": action, "resource": resource})
+            return 0
+    
+    @staticmethod
+    def _build_entry(user_id: str, action: str, resource: str,
+                     details: Optional[Dict[str, Any]], record_id: Optional[str]) -> Dict[str, Any]:
+        """Arma la fila de audit_logs de una actividad"""
+        # Mapear resource a table_name
+        table_name_map = {
+            "product": "products",
+            "user": "profiles",
+            "auth": "auth",
+            "product_image": "product_images",
+            "sale": "sales"
+        }
+        table_name = table_name_map.get(resource, resource)
+        
+        audit_data = {
+            "profile_id": user_id,  # Usar profile_id en lugar de user_id
+            "action": action,
+            "table_name": table_name,
+            "record_id": record_id,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        
+        if details:
+            audit_data["details"] = details
+            changes = details.get("changes")
+            if isinstance(changes, dict) and changes:
+                audit_data["changed_fields"] = sorted(changes)
+        return audit_data
+    
     async def list_audit_logs(self, user_id: Optional[str] = None,
                              table_name: Optional[str] = None,
                              action: Optional[str] = None,
+                             field: Optional[str] = None,
                              limit: int = 100) -> List[Dict[str, Any]]:
         """
         Lista los registros de auditoría con filtros opcionales
@@ -68,6 +116,7 @@ class AuditService:
             user_id: Filtrar por profile_id
             table_name: Filtrar por nombre de tabla
             action: Filtrar por acción
+            field: Filtrar por campo modificado (p. ej. "price")
             limit: Límite de resultados
             
         Returns:
@@ -85,7 +134,11 @@ class AuditService:
             if action:
                 query = query.eq("action", action)
             
-            response = query.order("created_at", desc=True).limit(limit).execute()
+            if field:
+                # Usa el índice GIN sobre changed_fields
+                query = query.contains("changed_fields", [field])
+            
+            response = await SupabaseService.execute(query.order("created_at", desc=True).limit(limit))
             return response.data if response.data else []
         except Exception as e:
             raise Exception(f"Error al listar registros de auditoría: {str(e)}")
@@ -101,7 +154,9 @@ class AuditService:
             Registro de auditoría o None
         """
         try:
-            response = self.supabase.table("audit_logs").select("*, profiles(email, full_name)").eq("id", log_id).execute()
+            response = await SupabaseService.execute(
+                self.supabase.table("audit_logs").select("*, profiles(email, full_name)").eq("id", log_id)
+            )
             if response.data and len(response.data) > 0:
                 return response.data[0]
             return None
@@ -2,18 +2,29 @@
 Servicio de autenticación
 Maneja login, registro, recuperación de contraseña y validación de tokens
 """
-from typing import Optional, Dict, Any
-from supabase import Client
+import hashlib
+import logging
+import secrets
+import uuid
+from typing import TYPE_CHECKING, Optional, Dict, Any
+from backend.config import config
 from backend.services.supabase_service import SupabaseService
+from backend.services.token_version_service import TokenVersionService
+from backend.utils.circuit_breaker import UpstreamUnavailableError
 from backend.utils.jwt_utils import create_access_token, verify_token
-from datetime import datetime
+from datetime import datetime, timedelta
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
 
 class AuthService:
     """Servicio para operaciones de autenticación"""
     
     def __init__(self):
-        self.supabase: Client = SupabaseService.get_client()
-        self.service_supabase: Client = SupabaseService.get_service_client()
+        self.supabase: "Client" = SupabaseService.get_client()
+        self.service_supabase: "Client" = SupabaseService.get_service_client()
     
     async def login(self, email: str, password: str) -> Dict[str, Any]:
         """
@@ -21,7 +32,7 @@ class AuthService:
         """
         try:
             # 1. Autenticar en Supabase Auth
-            response = self.supabase.auth.sign_in_with_password({
+            response = await SupabaseService.call("auth", "auth.sign_in", self.supabase.auth.sign_in_with_password, {
                 "email": email,
                 "password": password
             })
@@ -32,36 +43,15 @@ class AuthService:
             user = response.user
             session = response.session
             
-            # 2. Obtener perfil del usuario desde 'public.profiles'
-            profile = self._get_user_profile(user.id)
+            # 2. Obtener perfil del usuario desde 'public.profiles' (con nombre de rol y versión)
+            profile = await self._get_user_profile(user.id, with_claims=True)
             
             if not profile:
                 raise Exception("Perfil de usuario no encontrado (Error de sincronización)")
             
-            # 3. Obtener el role_id (Asumimos 3=Usuario como fallback si es nulo)
-            role_id = profile.get("role_id", 3)
-            
-            # 4. Crear token JWT que incluye el role_id
-            token_data = {
-                "sub": user.id,
-                "email": user.email,
-                "role_id": role_id  # <--- IMPORTANTE: Esto permite validar permisos en el Front/Back
-            }
-            
-            access_token = create_access_token(token_data)
-            
-            # 5. Construir respuesta
-            result = {
-                "access_token": access_token,
-                "token_type": "bearer",
-                "user": {
-                    "id": user.id,
-                    "email": user.email,
-                    "role_id": role_id,
-                    "full_name": profile.get("full_name"),
-                    "profile": profile
-                }
-            }
+            # 3. Crear token JWT (con role_id) y un refresh token de una familia nueva
+            result = self._token_response(user.id, user.email, profile)
+            result["refresh_token"] = await self._issue_refresh_token(user.id)
             
             if session:
                 result["session"] = {
@@ -73,6 +63,106 @@ class AuthService:
         except Exception as e:
             raise Exception(f"Error en login: {str(e)}")
     
+    async def refresh(self, refresh_token: str) -> Dict[str, Any]:
+        """
+        Canjea un refresh token por un access token nuevo, sin volver a pedir la contraseña
+        El refresh token se rota: el presentado queda usado y se devuelve otro de la
+        misma familia. Presentar uno ya usado revoca la familia (token robado)
+        
+        Args:
+            refresh_token: Refresh token recibido en el login o en el último refresh
+            
+        Returns:
+            Mismo formato que login, con el refresh token nuevo
+            
+        Raises:
+            UpstreamUnavailableError: Si Supabase no está disponible
+            Exception: Si el refresh token no es válido
+        """
+        new_token = secrets.token_urlsafe(32)
+        response = await SupabaseService.execute(
+            self.service_supabase.rpc("rotate_refresh_token", {
+                "p_token_hash": _hash_token(refresh_token),
+                "p_new_hash": _hash_token(new_token),
+                "p_expires_at": self._refresh_expiry()
+            })
+        )
+        outcome = response.data or {}
+        status = outcome.get("status")
+        if status == "reused":
+            logger.warning(
+                "Refresh token reutilizado: familia revocada",
+                extra={"user_id": outcome.get("profile_id"), "family_id": outcome.get("family_id")}
+            )
+        if status != "ok":
+            raise Exception("Sesión expirada, inicia sesión nuevamente")
+        
+        user_id = str(outcome["profile_id"])
+        profile = await self._get_user_profile(user_id, with_claims=True)
+        if not profile:
+            raise Exception("Perfil de usuario no encontrado")
+        
+        result = self._token_response(user_id, profile.get("email"), profile)
+        result["refresh_token"] = new_token
+        return result
+    
+    async def revoke_refresh_token(self, refresh_token: str):
+        """Revoca la familia de un refresh token (logout)"""
+        await SupabaseService.execute(
+            self.service_supabase.rpc("revoke_refresh_token_family", {"p_token_hash": _hash_token(refresh_token)})
+        )
+    
+    def _token_response(self, user_id: str, email: Optional[str], profile: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Crea el access token de un usuario a partir de su perfil (con roles y profile_versions
+        embebidos, ver _get_user_profile con with_claims=True) y arma la respuesta de login
+        """
+        role_name = _embedded(profile.pop("roles", None)).get("name")
+        profile_version = _embedded(profile.pop("profile_versions", None)).get("version", 0)
+        
+        # Obtener el role_id (Asumimos 3=Usuario como fallback si es nulo)
+        role_id = profile.get("role_id", 3)
+        
+        token_data = {
+            "sub": user_id,
+            "email": email,
+            "role_id": role_id,  # <--- IMPORTANTE: Esto permite validar permisos en el Front/Back
+            "role": role_name
+        }
+        if config.STATELESS_AUTH:
+            # Versión de perfil: un cambio de rol invalida el token sin consultar la BD
+            token_data["pv"] = profile_version
+        
+        return {
+            "access_token": create_access_token(token_data),
+            "token_type": "bearer",
+            "expires_in": config.JWT_EXPIRATION_MINUTES * 60,
+            "user": {
+                "id": user_id,
+                "email": email,
+                "role_id": role_id,
+                "full_name": profile.get("full_name"),
+                "profile": profile
+            }
+        }
+    
+    async def _issue_refresh_token(self, user_id: str) -> str:
+        """Crea el primer refresh token de una familia nueva (una por login)"""
+        token = secrets.token_urlsafe(32)
+        await SupabaseService.execute(
+            self.service_supabase.table("refresh_tokens").insert({
+                "token_hash": _hash_token(token),
+                "family_id": str(uuid.uuid4()),
+                "profile_id": user_id,
+                "expires_at": self._refresh_expiry()
+            })
+        )
+        return token
+    
+    @staticmethod
+    def _refresh_expiry() -> str:
+        return (datetime.utcnow() + timedelta(days=config.REFRESH_TOKEN_EXPIRATION_DAYS)).isoformat() + "Z"
+    
     async def register(self, email: str, password: str, full_name: str) -> Dict[str, Any]:
         """
         Registra un nuevo usuario.
@@ -80,11 +170,11 @@ class AuthService:
         usando la metadata enviada aquí.
         """
         try:
-            print(f"[REGISTER] Iniciando registro para: {email}")
+            logger.info("Iniciando registro", extra={"email": email})
             
             # 1. Registrar en Supabase Auth enviando full_name en metadata
             # Esto dispara el Trigger 'on_auth_user_created' en Postgres
-            response = self.supabase.auth.sign_up({
+            response = await SupabaseService.call("auth", "auth.sign_up", self.supabase.auth.sign_up, {
                 "email": email,
                 "password": password,
                 "options": {
@@ -98,17 +188,18 @@ class AuthService:
                 raise Exception("Error al crear usuario en Supabase Auth")
             
             user = response.user
-            print(f"[REGISTER] Usuario creado en Auth con id: {user.id}")
+            logger.info("Usuario creado en Auth", extra={"user_id": user.id})
             
             # 2. Auto-confirmar email (Opcional, útil para desarrollo)
             try:
-                self.service_supabase.auth.admin.update_user_by_id(
+                await SupabaseService.call(
+                    "auth", "auth.update_user", self.service_supabase.auth.admin.update_user_by_id,
                     user.id,
                     {"email_confirm": True}
                 )
-                print(f"[REGISTER] Email auto-confirmado para usuario: {user.id}")
+                logger.info("Email auto-confirmado", extra={"user_id": user.id})
             except Exception as confirm_error:
-                print(f"[REGISTER] Advertencia al confirmar email: {str(confirm_error)}")
+                logger.warning("No se pudo auto-confirmar el email: %s", confirm_error, extra={"user_id": user.id})
             
             # Nota: No necesitamos insertar en 'profiles' manualmente, 
             # el Trigger SQL ya lo hizo leyendo 'full_name' de la metadata.
@@ -123,15 +214,13 @@ class AuthService:
                 "message": "Usuario registrado exitosamente"
             }
         except Exception as e:
-            print(f"[REGISTER] Error crítico: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error en registro", extra={"email": email})
             raise Exception(f"Error en registro: {str(e)}")
     
     async def logout(self, access_token: str) -> Dict[str, Any]:
         """Cierra sesión del usuario"""
         try:
-            self.supabase.auth.sign_out()
+            await SupabaseService.call("auth", "auth.sign_out", self.supabase.auth.sign_out)
             return {"message": "Sesión cerrada exitosamente"}
         except Exception as e:
             raise Exception(f"Error en logout: {str(e)}")
@@ -139,14 +228,15 @@ class AuthService:
     async def password_recovery(self, email: str) -> Dict[str, Any]:
         """Solicita recuperación de contraseña"""
         try:
-            self.supabase.auth.reset_password_for_email(email)
+            await SupabaseService.call("auth", "auth.reset_password", self.supabase.auth.reset_password_for_email, email)
             return {"message": "Se ha enviado un email con instrucciones"}
         except Exception as e:
             raise Exception(f"Error en recuperación de contraseña: {str(e)}")
     
-    def verify_user_token(self, token: str) -> Optional[Dict[str, Any]]:
+    async def verify_user_token(self, token: str) -> Optional[Dict[str, Any]]:
         """
         Verifica token y devuelve datos del usuario incluyendo role_id
+        Si Supabase no está disponible lanza UpstreamUnavailableError (503), no None (401)
         """
         try:
             payload = verify_token(token)
@@ -154,11 +244,24 @@ class AuthService:
                 return None
             
             user_id = payload.get("sub")
-            if not user_id:
+            # Los tickets de un solo propósito (stream de eventos) no son access tokens
+            if not user_id or payload.get("purpose"):
                 return None
             
+            # Modo sin estado: los claims bastan mientras la versión del perfil siga vigente
+            if config.STATELESS_AUTH and "pv" in payload and TokenVersionService.is_fresh():
+                if not TokenVersionService.is_current(user_id, int(payload["pv"])):
+                    return None
+                return {
+                    "id": user_id,
+                    "email": payload.get("email"),
+                    "role_id": payload.get("role_id", 3),
+                    "role": payload.get("role"),
+                    "profile": None
+                }
+            
             # Verificar perfil
-            profile = self._get_user_profile(user_id)
+            profile = await self._get_user_profile(user_id)
             if not profile:
                 return None
             
@@ -168,15 +271,39 @@ class AuthService:
                 "role_id": payload.get("role_id", 3), # Recuperamos el ID numérico
                 "profile": profile
             }
+        except UpstreamUnavailableError:
+            raise
         except Exception:
             return None
     
-    def _get_user_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Obtiene el perfil del usuario desde la tabla profiles"""
+    async def _get_user_profile(self, user_id: str, with_claims: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el perfil del usuario desde la tabla profiles
+        Con with_claims=True incluye el nombre del rol y la versión del perfil en la misma consulta
+        """
         try:
-            response = self.service_supabase.table("profiles").select("*").eq("id", user_id).execute()
+            columns = "*"
+            if with_claims:
+                columns += ", roles(name)"
+                if config.STATELESS_AUTH:
+                    columns += ", profile_versions(version)"
+            response = await SupabaseService.execute(
+                self.service_supabase.table("profiles").select(columns).eq("id", user_id)
+            )
             if response.data and len(response.data) > 0:
                 return response.data[0]
             return None
+        except UpstreamUnavailableError:
+            raise
         except Exception:
-            return None
\ No newline at end of file
+            return None
+
+def _hash_token(token: str) -> str:
+    """Solo se guarda el hash del refresh token: una copia de la tabla no sirve para iniciar sesión"""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+def _embedded(value: Any) -> Dict[str, Any]:
+    """Normaliza un recurso embebido de PostgREST (objeto, lista o null) a dict"""
+    if isinstance(value, list):
+        return value[0] if value else {}
+    return value or {}
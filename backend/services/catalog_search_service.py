@@ -0,0 +1,161 @@
+"""
+Servicio de búsqueda facetada del catálogo
+Mantiene por worker un FacetIndex con los productos activos: se carga completo al
+arrancar (y muy de vez en cuando), se actualiza en el acto con las escrituras de
+ProductService y con los cambios de otros workers que trae ProductChangeFeed
+"""
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+from backend.config import config
+from backend.services.product_change_feed import ProductChangeFeed
+from backend.services.product_service import ProductService
+from backend.services.supabase_service import SupabaseService
+from backend.utils.facet_index import FacetIndex
+from backend.utils.metrics import metrics
+from backend.utils.single_flight import single_flight
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+class CatalogSearchService:
+    """Servicio para filtrar el catálogo por marca, categoría, precio y stock"""
+
+    def __init__(self):
+        self.supabase: "Client" = SupabaseService.get_service_client()
+        self._index: Optional[FacetIndex] = None
+        # Escrituras ocurridas mientras se carga un índice nuevo (se reaplican al terminar)
+        self._pending: Optional[List[Tuple[str, Any, Optional[Dict[str, Any]]]]] = None
+        ProductService.on_product_write(self._product_changed)
+        ProductChangeFeed.on_changes(self._changes_synced)
+
+    def _product_changed(self, action: str, product_id: Any, product: Optional[Dict[str, Any]]):
+        """Aplica una escritura de producto al índice vigente"""
+        if self._pending is not None:
+            self._pending.append((action, product_id, product))
+        if self._index is not None:
+            self._apply(self._index, action, product_id, product)
+
+    def _changes_synced(self, changed: List[Dict[str, Any]], deleted: List[Any]):
+        """Aplica al índice los cambios del feed (filas completas de list_changes)"""
+        for product in changed:
+            self._product_changed("updated", product["id"], product)
+        for product_id in deleted:
+            self._product_changed("deactivated", product_id, None)
+        if self._index is not None:
+            metrics.set_gauge("catalog_index_products", len(self._index))
+
+    @staticmethod
+    def _apply(index: FacetIndex, action: str, product_id: Any, product: Optional[Dict[str, Any]]):
+        if product is None:
+            index.remove(product_id)
+        elif action == "stock":
+            # Sin current_stock en el evento (reservas) se conserva el indexado
+            current = index.get(product_id)
+            if current is not None:
+                index.upsert({**current, **product})
+        else:
+            index.upsert(product)
+
+    @single_flight("catalog_index.reload")
+    async def reload(self) -> int:
+        """
+        Reconstruye el índice con los productos activos
+        Corre al arrancar y muy de vez en cuando, para corregir lo que el feed de cambios
+        no haya visto (p. ej. una transacción confirmada después de pasar su marca)
+
+        Returns:
+            Cantidad de productos indexados
+        """
+        self._pending = []
+        try:
+            products = await self._fetch_active_products()
+            index = FacetIndex(config.CATALOG_PRICE_BUCKETS)
+            index.load(products)
+            for action, product_id, product in self._pending:
+                self._apply(index, action, product_id, product)
+            self._index = index
+        finally:
+            self._pending = None
+        metrics.set_gauge("catalog_index_products", len(index))
+        return len(index)
+
+    async def _fetch_active_products(self) -> List[Dict[str, Any]]:
+        """Lee los productos activos por páginas (PostgREST limita las filas por respuesta)"""
+        page_size = config.CATALOG_INDEX_PAGE_SIZE
+        products: List[Dict[str, Any]] = []
+        start = 0
+        while True:
+            response = await SupabaseService.execute(
+                self.supabase.table("products")
+                .select("*, categories(name), product_images(image_url)")
+                .eq("is_active", True)
+                .order("id")
+                .range(start, start + page_size - 1)
+            )
+            rows = response.data or []
+            products.extend(ProductService._format_product(row) for row in rows)
+            if len(rows) < page_size:
+                return products
+            start += page_size
+
+    def lookup(self, ids: Sequence[Any] = (), skus: Sequence[str] = (),
+               fields: Optional[Sequence[str]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Busca productos por ID o SKU en el índice del worker, sin ir a Supabase
+
+        Args:
+            ids: IDs de producto
+            skus: SKUs
+            fields: Campos a devolver, o None para todos
+
+        Returns:
+            Resultados como ProductService.batch_results, o None si el índice aún no está
+            cargado o se piden campos que no guarda (images)
+        """
+        index = self._index
+        if index is None or (fields is not None and "images" in fields):
+            return None
+        metrics.increment("catalog_index_lookups_total")
+        return ProductService.batch_results(
+            ids, skus, index.get, index.get_by_sku,
+            lambda product: {field: product.get(field) for field in fields} if fields is not None else product
+        )
+
+    async def search(self, brands: Optional[Sequence[str]] = None,
+                     category_ids: Optional[Sequence[int]] = None,
+                     min_price: Optional[float] = None,
+                     max_price: Optional[float] = None,
+                     in_stock: Optional[bool] = None,
+                     sort: str = "newest",
+                     offset: int = 0,
+                     limit: int = 24) -> Dict[str, Any]:
+        """
+        Filtra el catálogo público y devuelve los conteos de cada faceta
+
+        Args:
+            brands: Marcas aceptadas
+            category_ids: Categorías aceptadas
+            min_price: Precio mínimo
+            max_price: Precio máximo
+            in_stock: Si es True, solo productos con stock disponible
+            sort: newest, price_asc, price_desc o name
+            offset: Resultados a saltar
+            limit: Tamaño de página
+
+        Returns:
+            Diccionario con items, total y facets
+        """
+        try:
+            if self._index is None:
+                await self.reload()
+            return self._index.query(
+                brands=brands,
+                category_ids=category_ids,
+                min_price=min_price,
+                max_price=max_price,
+                in_stock=in_stock,
+                sort=sort,
+                offset=offset,
+                limit=limit
+            )
+        except Exception as e:
+            raise Exception(f"Error al filtrar productos: {str(e)}")
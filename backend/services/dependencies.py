@@ -0,0 +1,62 @@
+"""
+Dependencias de FastAPI para los servicios
+Cada servicio (y su cliente de Supabase) se construye en la primera petición
+que lo necesita y se reutiliza después, en lugar de crearse al importar los controladores
+"""
+from functools import lru_cache
+from backend.services.audit_service import AuditService
+from backend.services.auth_service import AuthService
+from backend.services.catalog_search_service import CatalogSearchService
+from backend.services.health_service import HealthService
+from backend.services.product_service import ProductService
+from backend.services.reservation_service import ReservationService
+from backend.services.role_service import RoleService
+from backend.services.sale_service import SaleService
+from backend.utils.startup_profiler import startup_profiler
+
+@lru_cache(maxsize=None)
+def get_product_service() -> ProductService:
+    """Instancia compartida de ProductService"""
+    with startup_profiler.track("ProductService"):
+        return ProductService()
+
+@lru_cache(maxsize=None)
+def get_audit_service() -> AuditService:
+    """Instancia compartida de AuditService"""
+    with startup_profiler.track("AuditService"):
+        return AuditService()
+
+@lru_cache(maxsize=None)
+def get_auth_service() -> AuthService:
+    """Instancia compartida de AuthService"""
+    with startup_profiler.track("AuthService"):
+        return AuthService()
+
+@lru_cache(maxsize=None)
+def get_role_service() -> RoleService:
+    """Instancia compartida de RoleService"""
+    with startup_profiler.track("RoleService"):
+        return RoleService()
+
+@lru_cache(maxsize=None)
+def get_sale_service() -> SaleService:
+    """Instancia compartida de SaleService"""
+    with startup_profiler.track("SaleService"):
+        return SaleService()
+
+@lru_cache(maxsize=None)
+def get_reservation_service() -> ReservationService:
+    """Instancia compartida de ReservationService"""
+    with startup_profiler.track("ReservationService"):
+        return ReservationService()
+
+@lru_cache(maxsize=None)
+def get_catalog_search_service() -> CatalogSearchService:
+    """Instancia compartida de CatalogSearchService (guarda el índice del worker)"""
+    with startup_profiler.track("CatalogSearchService"):
+        return CatalogSearchService()
+
+@lru_cache(maxsize=None)
+def get_health_service() -> HealthService:
+    """Instancia compartida de HealthService (guarda el último sondeo del worker)"""
+    return HealthService()
@@ -0,0 +1,90 @@
+"""
+Servicio de salud
+Sondea periódicamente las dependencias (PostgREST, Storage) y guarda el último resultado
+para que /health/ready no genere tráfico hacia Supabase en cada petición
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from backend.config import config
+from backend.services.supabase_service import SupabaseService
+from backend.utils.circuit_breaker import breaker_states
+
+class HealthService:
+    """Servicio para el estado de las dependencias externas"""
+
+    def __init__(self):
+        self.probes: Dict[str, Callable[[], Any]] = {
+            "postgrest": self._probe_postgrest,
+            "storage": self._probe_storage,
+        }
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._last_run: Optional[float] = None
+
+    def _probe_postgrest(self):
+        """Select mínimo: una fila, una columna"""
+        SupabaseService.get_service_client().table("products").select("id").limit(1).execute()
+
+    def _probe_storage(self):
+        """Verifica que el bucket de imágenes exista y sea accesible"""
+        SupabaseService.get_service_client().storage.get_bucket(config.STORAGE_BUCKET)
+
+    async def _run_probe(self, name: str, probe: Callable[[], Any]) -> Dict[str, Any]:
+        """
+        Ejecuta un sondeo en un hilo aparte con timeout
+
+        Args:
+            name: Nombre de la dependencia
+            probe: Función bloqueante que lanza excepción si la dependencia falla
+
+        Returns:
+            Resultado con estado, latencia y error (si lo hubo)
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(loop.run_in_executor(None, probe), timeout=config.HEALTH_PROBE_TIMEOUT)
+            status, error = "up", None
+        except asyncio.TimeoutError:
+            status, error = "down", f"timeout tras {config.HEALTH_PROBE_TIMEOUT}s"
+        except Exception as e:
+            status, error = "down", str(e)
+
+        return {
+            "status": status,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+            "checked_at": datetime.utcnow().isoformat(),
+            "error": error,
+        }
+
+    async def probe_all(self):
+        """Sondea todas las dependencias en paralelo y actualiza el resultado cacheado"""
+        names = list(self.probes)
+        results = await asyncio.gather(*(self._run_probe(name, self.probes[name]) for name in names))
+        self._results = dict(zip(names, results))
+        self._last_run = time.monotonic()
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Estado de preparación a partir del último sondeo (no hace llamadas externas)
+
+        Returns:
+            Diccionario con `ready`, estado general, detalle por dependencia y estado
+            de los circuit breakers (informativo: un circuito abierto no saca al worker
+            del balanceador, porque todos los workers verían la misma dependencia caída)
+        """
+        if self._last_run is None:
+            return {"ready": False, "status": "starting", "dependencies": {}, "circuits": breaker_states()}
+
+        age = time.monotonic() - self._last_run
+        stale = age > config.HEALTH_PROBE_INTERVAL * 3
+        ready = not stale and all(r["status"] == "up" for r in self._results.values())
+
+        return {
+            "ready": ready,
+            "status": "stale" if stale else ("ready" if ready else "degraded"),
+            "last_check_age_s": round(age, 1),
+            "dependencies": self._results,
+            "circuits": breaker_states(),
+        }
@@ -0,0 +1,50 @@
+"""
+Feed de cambios de productos entre workers
+Cada worker consulta periódicamente /productos/cambios por dentro (list_changes) desde
+su última marca y avisa a sus oyentes. Así se enteran de las escrituras atendidas por
+otros workers y de los cambios que no pasan por ProductService (barrido de reservas,
+ventas, ediciones directas en la BD)
+"""
+from typing import Any, Callable, Dict, List, Optional
+from backend.config import config
+from backend.services.product_service import ProductService
+
+# Se llaman con (productos creados o modificados, IDs desactivados)
+ChangeListener = Callable[[List[Dict[str, Any]], List[Any]], None]
+
+class ProductChangeFeed:
+    """Marca de sincronización del worker y oyentes del feed"""
+
+    _watermark: Optional[str] = None
+    _started = False
+    _listeners: List[ChangeListener] = []
+
+    @classmethod
+    def on_changes(cls, listener: ChangeListener):
+        """Registra un oyente del feed"""
+        cls._listeners.append(listener)
+
+    @classmethod
+    async def poll(cls, product_service: ProductService):
+        """
+        Trae los cambios desde la última marca y avisa a los oyentes
+        La primera vez solo toma la marca actual: el estado inicial lo carga cada oyente
+        """
+        if not cls._started:
+            cls._watermark = await product_service.latest_watermark()
+            cls._started = True
+            return
+
+        has_more = True
+        while has_more:
+            result = await product_service.list_changes(
+                since=cls._watermark, limit=config.PRODUCT_CHANGES_PAGE_MAX
+            )
+            if result["changed"] or result["deleted"]:
+                for listener in cls._listeners:
+                    try:
+                        listener(result["changed"], result["deleted"])
+                    except Exception:
+                        pass  # Un oyente con errores no debe frenar el feed
+            cls._watermark = result["since"]
+            has_more = result["has_more"]
@@ -2,21 +2,107 @@
 Servicio de productos
 Maneja CRUD de productos y operaciones relacionadas
 """
-from typing import List, Optional, Dict, Any
-from supabase import Client
+import base64
+import json
+from typing import TYPE_CHECKING, Callable, List, Optional, Dict, Any, Sequence, Tuple
+from backend.config import config
 from backend.services.supabase_service import SupabaseService
-from datetime import datetime
+from backend.utils.single_flight import single_flight
+from datetime import datetime, timedelta
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 class ProductService:
     """Servicio para operaciones con productos"""
     
+    # Se incrementa en cada escritura del catálogo; invalida las respuestas cacheadas
+    catalog_version: int = 0
+    # Se llaman con (acción, product_id, datos); ver _product_changed
+    _write_listeners: List[Callable[[str, Any, Optional[Dict[str, Any]]], None]] = []
+    
+    # Campo de respuesta -> columnas de products que necesita (ver _format_product).
+    # category, image_url e images salen de las relaciones
+    FIELD_COLUMNS: Dict[str, Tuple[str, ...]] = {
+        "id": ("id",),
+        "name": ("name",),
+        "description": ("description",),
+        "Sku": ("Sku",),
+        "brand": ("brand",),
+        "price": ("price",),
+        "current_stock": ("current_stock",),
+        "available_stock": ("current_stock", "reserved_stock"),
+        "min_stock": ("min_stock",),
+        "is_active": ("is_active",),
+        "category_id": ("category_id",),
+        "category": (),
+        "image_url": (),
+        "images": (),
+        "created_at": ("created_at",),
+        "updated_at": ("updated_at",),
+    }
+    
     def __init__(self):
-        self.supabase: Client = SupabaseService.get_service_client()
+        self.supabase: "Client" = SupabaseService.get_service_client()
+    
+    @classmethod
+    def parse_fields(cls, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+        """
+        Valida el parámetro fields= ("id,name,price")
+        
+        Args:
+            fields: Campos separados por coma, o None para todos
+            
+        Returns:
+            Campos pedidos (siempre incluye id) o None
+            
+        Raises:
+            ValueError: Si hay campos desconocidos
+        """
+        if not fields:
+            return None
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - cls.FIELD_COLUMNS.keys()
+        if unknown:
+            raise ValueError(f"Campos desconocidos: {', '.join(sorted(unknown))}")
+        return tuple(sorted(requested | {"id"}))
     
+    def _product_query(self, fields: Optional[Sequence[str]] = None, include_images: bool = False,
+                       extra_columns: Sequence[str] = ()) -> Any:
+        """
+        Select de products con solo las columnas y relaciones que usa la respuesta
+        
+        Args:
+            fields: Campos de la respuesta, o None para todos
+            include_images: Si es True, trae todas las imágenes (si no, solo la primera)
+            extra_columns: Columnas que se necesitan para filtrar en Python
+            
+        Returns:
+            Builder de postgrest
+        """
+        if fields is None:
+            columns = ["*"]
+            embeds = ["categories(name)", "product_images(image_url)"]
+        else:
+            columns = sorted({column for field in fields for column in self.FIELD_COLUMNS[field]} | set(extra_columns))
+            include_images = include_images or "images" in fields
+            embeds = []
+            if "category" in fields:
+                embeds.append("categories(name)")
+            if include_images or "image_url" in fields:
+                embeds.append("product_images(image_url)")
+        query = self.supabase.table("products").select(",".join(columns + embeds))
+        if "product_images(image_url)" in embeds and not include_images:
+            # Las vistas de lista solo muestran la primera imagen
+            query = query.limit(1, foreign_table="product_images")
+        return query
+    
+    @single_flight("products.list")
     async def list_products(self, search: Optional[str] = None, 
                           category_id: Optional[str] = None,
                           min_stock: Optional[bool] = None,
-                          public: bool = False) -> List[Dict[str, Any]]:
+                          public: bool = False,
+                          fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """
         Lista todos los productos con filtros opcionales
         
@@ -25,13 +111,17 @@ class ProductService:
             category_id: Filtrar por ID de categoría
             min_stock: Si es True, solo productos con stock mínimo
             public: Si es True, solo productos activos (para vista pública)
+            fields: Campos a devolver (ver parse_fields), o None para todos
             
         Returns:
             Lista de productos
         """
         try:
-            # Incluir relación con categorías e imágenes
-            query = self.supabase.table("products").select("*, categories(*), product_images(*)")
+            # Incluir relación con categorías e imágenes (solo lo que se va a devolver)
+            query = self._product_query(
+                fields,
+                extra_columns=("current_stock", "min_stock") if min_stock is not None else ()
+            )
             
             # Si es vista pública, solo productos activos
             if public:
@@ -44,7 +134,7 @@ class ProductService:
             if category_id:
                 query = query.eq("category_id", category_id)
             
-            response = query.order("created_at", desc=True).execute()
+            response = await SupabaseService.execute(query.order("created_at", desc=True))
             products = response.data if response.data else []
             
             # Filtrar productos con stock mínimo si se solicita
@@ -52,74 +142,195 @@ class ProductService:
                 products = [p for p in products if p.get("current_stock", 0) <= p.get("min_stock", 0)]
             
             # Formatear productos para respuesta
-            formatted_products = []
-            for product in products:
-                # Obtener primera imagen si existe
-                images = product.get("product_images", [])
-                image_url = images[0].get("image_url") if images and len(images) > 0 else None
-                
-                formatted_product = {
-                    "id": product.get("id"),
-                    "name": product.get("name"),
-                    "description": product.get("description"),
-                    "Sku": product.get("Sku"),
-                    "brand": product.get("brand"),
-                    "price": product.get("price"),
-                    "current_stock": product.get("current_stock", 0),
-                    "min_stock": product.get("min_stock", 0),
-                    "is_active": product.get("is_active", True),
-                    "category_id": product.get("category_id"),
-                    "category": product.get("categories", {}).get("name") if product.get("categories") else None,
-                    "image_url": image_url,
-                    "created_at": product.get("created_at"),
-                    "updated_at": product.get("updated_at")
-                }
-                formatted_products.append(formatted_product)
+            formatted_products = [self._format_product(product, fields=fields) for product in products]
             
             return formatted_products
         except Exception as e:
             raise Exception(f"Error al listar productos: {str(e)}")
     
-    async def get_product(self, product_id: str) -> Optional[Dict[str, Any]]:
+    @single_flight("products.get")
+    async def get_product(self, product_id: str,
+                          fields: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
         """
         Obtiene un producto por ID
         
         Args:
             product_id: ID del producto
+            fields: Campos a devolver (ver parse_fields), o None para todos
             
         Returns:
             Producto o None si no existe
         """
         try:
-            response = self.supabase.table("products").select("*, categories(*), product_images(*)").eq("id", product_id).execute()
+            response = await SupabaseService.execute(
+                self._product_query(fields, include_images=fields is None).eq("id", product_id)
+            )
             if response.data and len(response.data) > 0:
-                product = response.data[0]
-                
-                # Formatear producto
-                images = product.get("product_images", [])
-                image_url = images[0].get("image_url") if images and len(images) > 0 else None
-                
-                return {
-                    "id": product.get("id"),
-                    "name": product.get("name"),
-                    "description": product.get("description"),
-                    "Sku": product.get("Sku"),
-                    "brand": product.get("brand"),
-                    "price": product.get("price"),
-                    "current_stock": product.get("current_stock", 0),
-                    "min_stock": product.get("min_stock", 0),
-                    "is_active": product.get("is_active", True),
-                    "category_id": product.get("category_id"),
-                    "category": product.get("categories", {}).get("name") if product.get("categories") else None,
-                    "image_url": image_url,
-                    "images": [img.get("image_url") for img in images],
-                    "created_at": product.get("created_at"),
-                    "updated_at": product.get("updated_at")
-                }
+                return self._format_product(response.data[0], include_images=fields is None, fields=fields)
             return None
         except Exception as e:
             raise Exception(f"Error al obtener producto: {str(e)}")
     
+    @single_flight("products.batch")
+    async def get_products_batch(self, ids: Sequence[int] = (), skus: Sequence[str] = (),
+                                 fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Obtiene varios productos activos por ID o SKU con una sola consulta
+        
+        Args:
+            ids: IDs de producto
+            skus: SKUs
+            fields: Campos a devolver (ver parse_fields), o None para todos
+            
+        Returns:
+            Un resultado por ID y luego uno por SKU, en el orden pedido (ver batch_results)
+        """
+        try:
+            filters = []
+            if ids:
+                filters.append(f"id.in.({','.join(str(int(i)) for i in dict.fromkeys(ids))})")
+            if skus:
+                filters.append(f"Sku.in.({','.join(SupabaseService.quote(sku) for sku in dict.fromkeys(skus))})")
+            extra = ("Sku",) if skus else ()
+            response = await SupabaseService.execute(
+                self._product_query(fields, extra_columns=extra).eq("is_active", True).or_(",".join(filters))
+            )
+            rows = response.data or []
+            by_id = {str(row["id"]): row for row in rows}
+            by_sku = {row["Sku"]: row for row in rows if row.get("Sku")}
+            return self.batch_results(
+                ids, skus,
+                lambda product_id: by_id.get(str(product_id)),
+                lambda sku: by_sku.get(sku),
+                lambda row: self._format_product(row, fields=fields)
+            )
+        except Exception as e:
+            raise Exception(f"Error al obtener productos: {str(e)}")
+    
+    @staticmethod
+    def batch_results(ids: Sequence[Any], skus: Sequence[str],
+                      find_id: Callable[[Any], Optional[Dict[str, Any]]],
+                      find_sku: Callable[[str], Optional[Dict[str, Any]]],
+                      render: Callable[[Dict[str, Any]], Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Arma la respuesta de una búsqueda por lote: un elemento por clave pedida, en orden,
+        con found=False (y product=None) para las que no existen o están inactivas
+        """
+        results = []
+        for by, keys, find in (("id", ids, find_id), ("sku", skus, find_sku)):
+            for key in keys:
+                row = find(key)
+                results.append({
+                    "by": by,
+                    "key": key,
+                    "found": row is not None,
+                    "product": render(row) if row is not None else None
+                })
+        return results
+    
+    async def list_changes(self, since: Optional[str] = None, limit: int = 100,
+                           fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Productos creados, modificados o desactivados después de una marca, en orden
+        de (updated_at, id), para que el cliente mantenga su copia del catálogo
+        
+        Args:
+            since: Marca devuelta por la llamada anterior, o None para empezar desde cero
+            limit: Máximo de productos por página
+            fields: Campos a devolver (ver parse_fields), o None para todos
+            
+        Returns:
+            {"changed": productos activos, "deleted": IDs desactivados (tombstones),
+             "since": marca para la próxima llamada, "has_more": si hay otra página}
+            
+        Raises:
+            ValueError: Si la marca no es válida
+        """
+        after = self._decode_watermark(since) if since else None
+        try:
+            query = self._product_query(fields, extra_columns=("is_active", "updated_at")).lt(
+                "updated_at", self._changes_cutoff()
+            )
+            
+            if after is None:
+                # Primera sincronización: el cliente no tiene nada que borrar
+                query = query.eq("is_active", True)
+            else:
+                updated_at, product_id = (SupabaseService.quote(value) for value in after)
+                query = query.or_(
+                    f"updated_at.gt.{updated_at},and(updated_at.eq.{updated_at},id.gt.{product_id})"
+                )
+            
+            # Una fila de más indica si hay otra página
+            response = await SupabaseService.execute(
+                query.order("updated_at").order("id").limit(limit + 1)
+            )
+            rows = response.data or []
+            page = rows[:limit]
+            
+            changed = []
+            deleted = []
+            for row in page:
+                if row.get("is_active", True):
+                    changed.append(self._format_product(row, fields=fields))
+                else:
+                    deleted.append(row["id"])
+            
+            if page:
+                since = self._encode_watermark(page[-1]["updated_at"], page[-1]["id"])
+            
+            return {
+                "changed": changed,
+                "deleted": deleted,
+                "since": since,
+                "has_more": len(rows) > limit
+            }
+        except Exception as e:
+            raise Exception(f"Error al obtener cambios de productos: {str(e)}")
+    
+    async def latest_watermark(self) -> Optional[str]:
+        """
+        Marca del último cambio ya asentado (la que devolvería list_changes al terminar
+        de recorrer todo el catálogo), sin traer los productos
+        
+        Returns:
+            Marca, o None si no hay productos
+        """
+        try:
+            response = await SupabaseService.execute(
+                self.supabase.table("products").select("id, updated_at")
+                .lt("updated_at", self._changes_cutoff())
+                .order("updated_at", desc=True).order("id", desc=True).limit(1)
+            )
+            if response.data:
+                return self._encode_watermark(response.data[0]["updated_at"], response.data[0]["id"])
+            return None
+        except Exception as e:
+            raise Exception(f"Error al obtener cambios de productos: {str(e)}")
+    
+    @staticmethod
+    def _changes_cutoff() -> str:
+        """
+        updated_at lo fija un trigger (010_product_changes.sql); lo más reciente se
+        deja para la próxima llamada por si hay transacciones sin confirmar
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=config.PRODUCT_CHANGES_SETTLE_SECONDS)
+        return cutoff.isoformat() + "+00:00"
+    
+    @staticmethod
+    def _encode_watermark(updated_at: str, product_id: Any) -> str:
+        raw = json.dumps([updated_at, str(product_id)], separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+    
+    @staticmethod
+    def _decode_watermark(watermark: str) -> List[str]:
+        try:
+            raw = base64.urlsafe_b64decode(watermark + "=" * (-len(watermark) % 4))
+            updated_at, product_id = json.loads(raw)
+            return [str(updated_at), str(product_id)]
+        except Exception:
+            raise ValueError("Marca de sincronización inválida")
+    
     async def create_product(self, product_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Crea un nuevo producto
@@ -147,29 +358,107 @@ class ProductService:
             # Remover None values
             supabase_data = {k: v for k, v in supabase_data.items() if v is not None}
             
-            response = self.supabase.table("products").insert(supabase_data).execute()
+            # Una sola llamada: inserta el producto y su imagen y devuelve la fila con sus relaciones
+            # (create_product_full, backend/sql/005_product_write_functions.sql)
+            response = await SupabaseService.execute(
+                self.supabase.rpc("create_product_full", {
+                    "p_product": supabase_data,
+                    "p_image_url": product_data.get("image_url")
+                })
+            )
             
-            if response.data and len(response.data) > 0:
-                product = response.data[0]
-                
-                # Si hay imagen, crear registro en product_images
-                if product_data.get("image_url"):
-                    await self._add_product_image(product["id"], product_data["image_url"])
-                
-                return await self.get_product(product["id"])
+            if response.data:
+                self._bump_catalog_version()
+                product = self._format_product(response.data, include_images=True)
+                self._product_changed("created", product["id"], product)
+                return product
             raise Exception("Error al crear producto")
         except Exception as e:
             raise Exception(f"Error al crear producto: {str(e)}")
     
-    async def _add_product_image(self, product_id: str, image_url: str):
-        """Agrega una imagen a un producto"""
-        try:
-            self.supabase.table("product_images").insert({
-                "product_id": product_id,
-                "image_url": image_url
-            }).execute()
-        except Exception:
-            pass  # Si falla, continuar sin la imagen
+    @classmethod
+    def _bump_catalog_version(cls):
+        """Marca el catálogo como modificado"""
+        cls.catalog_version += 1
+    
+    @classmethod
+    def on_product_write(cls, listener: Callable[[str, Any, Optional[Dict[str, Any]]], None]):
+        """
+        Registra una función a llamar tras cada escritura de producto de este worker
+        
+        Args:
+            listener: Recibe la acción, el ID del producto y sus datos
+        """
+        cls._write_listeners.append(listener)
+    
+    @classmethod
+    def _product_changed(cls, action: str, product_id: Any, product: Optional[Dict[str, Any]]):
+        """
+        Avisa a los listeners de una escritura ya confirmada
+        
+        Args:
+            action: created, updated, deactivated o stock
+            product_id: ID del producto
+            product: Producto formateado; None si se desactivó; para stock,
+                     solo id, available_stock y current_stock (si se conoce)
+        """
+        for listener in cls._write_listeners:
+            try:
+                listener(action, product_id, product)
+            except Exception:
+                pass  # La escritura ya se hizo; un listener no debe hacerla fallar
+    
+    @classmethod
+    def _stock_changed(cls, product_id: Any, available_stock: int, current_stock: Optional[int] = None):
+        """
+        Avisa que cambió el stock disponible (ventas y reservas) e invalida las
+        respuestas cacheadas del catálogo
+        current_stock va solo si se conoce; una reserva no lo modifica
+        """
+        cls._bump_catalog_version()
+        data = {"id": product_id, "available_stock": available_stock}
+        if current_stock is not None:
+            data["current_stock"] = current_stock
+        cls._product_changed("stock", product_id, data)
+    
+    @staticmethod
+    def _format_product(product: Dict[str, Any], include_images: bool = False,
+                        fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Convierte una fila de products con sus relaciones (categories, product_images)
+        al formato de respuesta
+        
+        Args:
+            product: Fila con la forma del select "*, categories(*), product_images(*)"
+            include_images: Si es True, incluye la lista completa de imágenes
+            fields: Si se indica, solo se devuelven esos campos
+            
+        Returns:
+            Producto formateado
+        """
+        images = product.get("product_images") or []
+        formatted = {
+            "id": product.get("id"),
+            "name": product.get("name"),
+            "description": product.get("description"),
+            "Sku": product.get("Sku"),
+            "brand": product.get("brand"),
+            "price": product.get("price"),
+            "current_stock": product.get("current_stock", 0),
+            "available_stock": product.get("current_stock", 0) - product.get("reserved_stock", 0),
+            "min_stock": product.get("min_stock", 0),
+            "is_active": product.get("is_active", True),
+            "category_id": product.get("category_id"),
+            "category": product.get("categories", {}).get("name") if product.get("categories") else None,
+            "image_url": images[0].get("image_url") if images else None,
+            "created_at": product.get("created_at"),
+            "updated_at": product.get("updated_at")
+        }
+        if include_images or (fields is not None and "images" in fields):
+            formatted["images"] = [img.get("image_url") for img in images]
+        if fields is not None:
+            return {field: formatted[field] for field in fields}
+        return formatted
     
     async def update_product(self, product_id: str, product_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -180,7 +469,8 @@ class ProductService:
             product_data: Datos a actualizar
             
         Returns:
-            Producto actualizado
+            Producto actualizado, con `changes` = {campo: [antes, después]} de los
+            campos que realmente cambiaron (para auditoría)
         """
         try:
             # Mapear campos del schema a la estructura real de Supabase
@@ -208,14 +498,21 @@ class ProductService:
             if not supabase_data:
                 raise Exception("No hay datos para actualizar")
             
-            response = self.supabase.table("products").update(supabase_data).eq("id", product_id).execute()
+            # Una sola llamada: aplica los cambios, agrega la imagen y devuelve la fila
+            # con sus relaciones y el diff (update_product_full, 005_product_write_functions.sql)
+            response = await SupabaseService.execute(
+                self.supabase.rpc("update_product_full", {
+                    "p_product_id": product_id,
+                    "p_changes": supabase_data,
+                    "p_image_url": product_data.get("image_url")
+                })
+            )
             
-            if response.data and len(response.data) > 0:
-                # Si hay nueva imagen, agregarla
-                if product_data.get("image_url"):
-                    await self._add_product_image(product_id, product_data["image_url"])
-                
-                return await self.get_product(product_id)
+            if response.data:
+                self._bump_catalog_version()
+                product = self._format_product(response.data["product"], include_images=True)
+                self._product_changed("updated" if product["is_active"] else "deactivated", product_id, product)
+                return {**product, "changes": response.data.get("changes") or {}}
             raise Exception("Producto no encontrado")
         except Exception as e:
             raise Exception(f"Error al actualizar producto: {str(e)}")
@@ -232,27 +529,34 @@ class ProductService:
         """
         try:
             # En lugar de eliminar, desactivamos el producto
-            response = self.supabase.table("products").update({
-                "is_active": False
-            }).eq("id", product_id).execute()
+            response = await SupabaseService.execute(
+                self.supabase.table("products").update({"is_active": False}).eq("id", product_id)
+            )
             
             if response.data:
+                self._bump_catalog_version()
+                self._product_changed("deactivated", product_id, None)
                 return {"message": "Producto eliminado (desactivado) exitosamente"}
             raise Exception("Producto no encontrado")
         except Exception as e:
             raise Exception(f"Error al eliminar producto: {str(e)}")
     
-    async def get_low_stock_products(self) -> List[Dict[str, Any]]:
+    async def get_low_stock_products(self, fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
         """
         Obtiene productos con stock mínimo o menor
         
+        Args:
+            fields: Campos a devolver (ver parse_fields), o None para todos
+        
         Returns:
             Lista de productos con stock bajo
         """
         try:
             # Obtener todos los productos activos y filtrar en Python
             # porque Supabase no permite comparar columnas directamente
-            response = self.supabase.table("products").select("*, categories(*), product_images(*)").eq("is_active", True).execute()
+            response = await SupabaseService.execute(
+                self._product_query(fields, extra_columns=("current_stock", "min_stock")).eq("is_active", True)
+            )
             products = response.data if response.data else []
             
             # Filtrar productos donde current_stock <= min_stock
@@ -262,40 +566,25 @@ class ProductService:
             ]
             
             # Formatear productos
-            formatted_products = []
-            for product in low_stock:
-                images = product.get("product_images", [])
-                image_url = images[0].get("image_url") if images and len(images) > 0 else None
-                
-                formatted_products.append({
-                    "id": product.get("id"),
-                    "name": product.get("name"),
-                    "description": product.get("description"),
-                    "Sku": product.get("Sku"),
-                    "brand": product.get("brand"),
-                    "price": product.get("price"),
-                    "current_stock": product.get("current_stock", 0),
-                    "min_stock": product.get("min_stock", 0),
-                    "is_active": product.get("is_active", True),
-                    "category_id": product.get("category_id"),
-                    "category": product.get("categories", {}).get("name") if product.get("categories") else None,
-                    "image_url": image_url,
-                    "created_at": product.get("created_at"),
-                    "updated_at": product.get("updated_at")
-                })
+            formatted_products = [self._format_product(product, fields=fields) for product in low_stock]
             
             return formatted_products
         except Exception as e:
             raise Exception(f"Error al obtener productos con stock mínimo: {str(e)}")
     
-    async def upload_product_image(self, product_id: str, image_file: bytes, filename: str) -> Dict[str, Any]:
+    async def upload_product_image(self, product_id: str, image_file: bytes, content_hash: str,
+                                   content_type: str, extension: str) -> Dict[str, Any]:
         """
         Sube una imagen de producto a Supabase Storage
+        La ruta es el hash del contenido: si la imagen ya está en Storage (subida antes
+        para este u otro producto) no se vuelve a subir, solo se agrega la fila
         
         Args:
             product_id: ID del producto
             image_file: Bytes de la imagen
-            filename: Nombre del archivo
+            content_hash: SHA-256 del contenido (hex)
+            content_type: Tipo MIME detectado por los magic bytes
+            extension: Extensión que corresponde al tipo
             
         Returns:
             URL de la imagen subida
@@ -303,31 +592,48 @@ class ProductService:
         try:
             from backend.config import config
             
-            # Generar nombre único para el archivo
-            import uuid
-            file_extension = filename.split(".")[-1] if "." in filename else "jpg"
-            unique_filename = f"{product_id}/{uuid.uuid4()}.{file_extension}"
-            
-            # Subir a Supabase Storage
             storage = self.supabase.storage.from_(config.STORAGE_BUCKET)
-            response = storage.upload(unique_filename, image_file, file_options={"content-type": f"image/{file_extension}"})
+            existing = await SupabaseService.execute(
+                self.supabase.table("product_images")
+                .select("image_url")
+                .eq("content_hash", content_hash)
+                .limit(1)
+            )
             
-            # Obtener URL pública
-            public_url = storage.get_public_url(unique_filename)
+            if existing.data:
+                public_url = existing.data[0]["image_url"]
+            else:
+                # upsert: si otra petición sube el mismo contenido a la vez, el archivo es idéntico
+                path = f"sha256/{content_hash[:2]}/{content_hash}.{extension}"
+                await SupabaseService.call(
+                    "storage", "storage.upload", storage.upload,
+                    path, image_file, file_options={
+                        "content-type": content_type,
+                        "cache-control": config.IMAGE_CACHE_CONTROL,
+                        "upsert": "true"
+                    }
+                )
+                public_url = storage.get_public_url(path)
             
-            # Crear registro en product_images
-            self.supabase.table("product_images").insert({
-                "product_id": product_id,
-                "image_url": public_url
-            }).execute()
+            # Crear registro en product_images (una vez por producto y contenido)
+            await SupabaseService.execute(
+                self.supabase.table("product_images").upsert({
+                    "product_id": product_id,
+                    "image_url": public_url,
+                    "content_hash": content_hash
+                }, on_conflict="product_id,content_hash", ignore_duplicates=True)
+            )
             
+            self._bump_catalog_version()
             return {
                 "image_url": public_url,
+                "deduplicated": bool(existing.data),
                 "message": "Imagen subida exitosamente"
             }
         except Exception as e:
             raise Exception(f"Error al subir imagen: {str(e)}")
     
+    @single_flight("categories.list")
     async def list_categories(self) -> List[Dict[str, Any]]:
         """
         Lista todas las categorías
@@ -336,8 +642,27 @@ class ProductService:
             Lista de categorías
         """
         try:
-            response = self.supabase.table("categories").select("*").order("name").execute()
+            response = await SupabaseService.execute(
+                self.supabase.table("categories").select("*").order("name")
+            )
             return response.data if response.data else []
         except Exception as e:
             raise Exception(f"Error al listar categorías: {str(e)}")
-
+    
+    @single_flight("categories.summary")
+    async def get_category_summary(self) -> List[Dict[str, Any]]:
+        """
+        Resumen de categorías para los filtros de la tienda
+        Sale de la vista category_summary (backend/sql/006_category_stats.sql), cuyos
+        agregados mantiene un trigger en cada escritura de products
+        
+        Returns:
+            Categorías con product_count, in_stock_count, min_price y max_price
+        """
+        try:
+            response = await SupabaseService.execute(
+                self.supabase.table("category_summary").select("*").order("name")
+            )
+            return response.data if response.data else []
+        except Exception as e:
+            raise Exception(f"Error al obtener resumen de categorías: {str(e)}")
@@ -0,0 +1,114 @@
+"""
+Servicio de reservas de stock
+Retiene unidades mientras están en el carrito, con vencimiento y barrido periódico
+Las operaciones son funciones de BD (backend/sql/003_stock_reservations.sql) que
+mantienen products.reserved_stock, así que valen para todos los workers
+"""
+from typing import TYPE_CHECKING, Dict, Any, Optional
+from backend.config import config
+from backend.services.product_service import ProductService
+from backend.services.supabase_service import SupabaseService
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+class ReservationService:
+    """Servicio para reservas de stock del carrito"""
+
+    def __init__(self):
+        self.supabase: "Client" = SupabaseService.get_service_client()
+
+    async def hold(self, cart_id: str, product_id: str, quantity: int) -> Dict[str, Any]:
+        """
+        Fija la cantidad retenida de un producto para un carrito
+
+        Args:
+            cart_id: Identificador del carrito (el ID del usuario)
+            product_id: ID del producto
+            quantity: Cantidad total a retener (0 libera la reserva)
+
+        Returns:
+            Resultado con success, reservation_id, expires_at y stock disponible
+        """
+        if quantity > config.RESERVATION_MAX_QUANTITY:
+            raise Exception(f"No se pueden reservar más de {config.RESERVATION_MAX_QUANTITY} unidades")
+        try:
+            response = await SupabaseService.execute(
+                self.supabase.rpc("hold_stock", {
+                    "p_cart_id": cart_id,
+                    "p_product_id": product_id,
+                    "p_quantity": quantity,
+                    "p_ttl_seconds": config.RESERVATION_TTL_SECONDS
+                })
+            )
+            result = response.data if isinstance(response.data, dict) else {}
+        except Exception as e:
+            raise Exception(f"Error al reservar stock: {str(e)}")
+
+        if result.get("success") and result.get("available") is not None:
+            ProductService._stock_changed(product_id, result["available"], result.get("current_stock"))
+        return result
+
+    async def extend(self, cart_id: str) -> Dict[str, Any]:
+        """
+        Renueva el vencimiento de todas las reservas vigentes del carrito
+
+        Args:
+            cart_id: Identificador del carrito
+
+        Returns:
+            Cantidad de reservas extendidas
+        """
+        try:
+            response = await SupabaseService.execute(
+                self.supabase.rpc("extend_holds", {
+                    "p_cart_id": cart_id,
+                    "p_ttl_seconds": config.RESERVATION_TTL_SECONDS
+                })
+            )
+            return {"extended": response.data or 0, "ttl_seconds": config.RESERVATION_TTL_SECONDS}
+        except Exception as e:
+            raise Exception(f"Error al extender reservas: {str(e)}")
+
+    async def release(self, cart_id: str, product_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Libera las reservas de un producto o de todo el carrito
+
+        Args:
+            cart_id: Identificador del carrito
+            product_id: ID del producto (None libera todo el carrito)
+
+        Returns:
+            Unidades devueltas al stock disponible
+        """
+        try:
+            response = await SupabaseService.execute(
+                self.supabase.rpc("release_holds", {"p_cart_id": cart_id, "p_product_id": product_id})
+            )
+            result = response.data if isinstance(response.data, dict) else {}
+        except Exception as e:
+            raise Exception(f"Error al liberar reservas: {str(e)}")
+
+        self._stock_returned(result)
+        return {"released": result.get("released", 0)}
+
+    async def sweep_expired(self) -> int:
+        """
+        Devuelve al stock las reservas vencidas (tarea periódica del lifespan)
+
+        Returns:
+            Unidades liberadas
+        """
+        response = await SupabaseService.execute(
+            self.supabase.rpc("release_expired_reservations", {"p_batch": config.RESERVATION_SWEEP_BATCH})
+        )
+        result = response.data if isinstance(response.data, dict) else {}
+        self._stock_returned(result)
+        return result.get("released", 0)
+
+    @staticmethod
+    def _stock_returned(result: Dict[str, Any]):
+        """Avisa el nuevo stock de los productos cuyas reservas se liberaron"""
+        for product in result.get("products") or []:
+            ProductService._stock_changed(product["product_id"], product["available"],
+                                          product.get("current_stock"))
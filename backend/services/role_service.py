@@ -2,16 +2,24 @@
 Servicio de roles y permisos
 Maneja la gestión de roles y asignación a usuarios
 """
-from typing import List, Dict, Any, Optional
-from supabase import Client
+import base64
+import json
+import uuid
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
+from backend.config import config
 from backend.services.supabase_service import SupabaseService
+from backend.services.token_version_service import TokenVersionService
+from backend.utils.single_flight import single_flight
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from supabase import Client
+
 class RoleService:
     """Servicio para operaciones con roles"""
     
     def __init__(self):
-        self.supabase: Client = SupabaseService.get_service_client()
+        self.supabase: "Client" = SupabaseService.get_service_client()
     
     async def list_roles(self) -> List[Dict[str, Any]]:
         """
@@ -21,13 +29,14 @@ class RoleService:
             Lista de roles
         """
         try:
-            response = self.supabase.table("roles").select("*").execute()
+            response = await SupabaseService.execute(self.supabase.table("roles").select("*"))
             if response.data:
                 return response.data  # type: ignore
             return []
         except Exception as e:
             raise Exception(f"Error al listar roles: {str(e)}")
     
+    @single_flight("user_roles.get")
     async def get_user_roles(self, user_id: str) -> List[Dict[str, Any]]:
         """
         Obtiene los roles de un usuario
@@ -40,7 +49,9 @@ class RoleService:
         """
         try:
             # Obtener el perfil del usuario (role_id)
-            profile_response = self.supabase.table("profiles").select("id, role_id").eq("id", user_id).execute()
+            profile_response = await SupabaseService.execute(
+                self.supabase.table("profiles").select("id, role_id").eq("id", user_id)
+            )
 
             if not profile_response.data:
                 return []
@@ -52,7 +63,7 @@ class RoleService:
                 return []
 
             # Obtener el rol completo desde la tabla roles por id
-            role_response = self.supabase.table("roles").select("*").eq("id", role_id).execute()
+            role_response = await SupabaseService.execute(self.supabase.table("roles").select("*").eq("id", role_id))
 
             if role_response.data:
                 return role_response.data
@@ -74,7 +85,9 @@ class RoleService:
         """
         try:
             # Verificar que el rol existe
-            role_response = self.supabase.table("roles").select("*").eq("id", role_id).execute()
+            role_response = await SupabaseService.execute(
+                self.supabase.table("roles").select("*").eq("id", role_id)
+            )
             if not role_response.data:
                 raise Exception("Rol no encontrado")
 
@@ -82,9 +95,12 @@ class RoleService:
             role_name = role.get("name")
 
             # Actualizar el campo role_id en profiles
-            update_response = self.supabase.table("profiles").update({"role_id": role_id}).eq("id", user_id).execute()
+            update_response = await SupabaseService.execute(
+                self.supabase.table("profiles").update({"role_id": role_id}).eq("id", user_id)
+            )
 
             if update_response.data:
+                await self._invalidate_tokens([user_id])
                 # Devolver también el nombre del rol para compatibilidad con frontend
                 return {
                     "message": "Rol asignado exitosamente",
@@ -94,6 +110,77 @@ class RoleService:
         except Exception as e:
             raise Exception(f"Error al asignar rol: {str(e)}")
     
+    async def bulk_assign_role(self, user_ids: List[str], role_id: str) -> Dict[str, Any]:
+        """
+        Asigna un rol a varios usuarios con una sola actualización
+        
+        Args:
+            user_ids: IDs de los usuarios
+            role_id: ID del rol
+            
+        Returns:
+            Diccionario con role (nombre), results (un estado por usuario, en orden:
+            updated, unchanged, not_found o invalid) y changed (usuarios actualizados
+            con su rol anterior, para auditoría)
+        """
+        try:
+            # Verificar que el rol existe (una vez para todo el lote)
+            role_response = await SupabaseService.execute(
+                self.supabase.table("roles").select("*").eq("id", role_id)
+            )
+            if not role_response.data:
+                raise Exception("Rol no encontrado")
+            role = role_response.data[0]
+            
+            requested = list(dict.fromkeys(str(user_id) for user_id in user_ids))
+            valid = [user_id for user_id in requested if self._is_uuid(user_id)]
+            
+            # Rol actual de los perfiles existentes: solo se actualizan (e invalidan) los que cambian
+            current: Dict[str, Any] = {}
+            if valid:
+                profiles_response = await SupabaseService.execute(
+                    self.supabase.table("profiles").select("id, role_id").in_("id", valid)
+                )
+                current = {str(row["id"]): row.get("role_id") for row in profiles_response.data or []}
+            
+            to_update = [user_id for user_id, current_role in current.items() if str(current_role) != str(role["id"])]
+            updated = set()
+            if to_update:
+                update_response = await SupabaseService.execute(
+                    self.supabase.table("profiles").update({"role_id": role["id"]}).in_("id", to_update)
+                )
+                updated = {str(row["id"]) for row in update_response.data or []}
+                await self._invalidate_tokens(sorted(updated))
+            
+            results = []
+            for user_id in requested:
+                if user_id in updated:
+                    status = "updated"
+                elif user_id in current and user_id not in to_update:
+                    status = "unchanged"
+                elif self._is_uuid(user_id):
+                    status = "not_found"
+                else:
+                    status = "invalid"
+                results.append({"user_id": user_id, "status": status})
+            
+            return {
+                "role": role.get("name"),
+                "results": results,
+                "changed": [{"user_id": user_id, "previous_role_id": current[user_id]} for user_id in to_update
+                            if user_id in updated]
+            }
+        except Exception as e:
+            raise Exception(f"Error al asignar rol: {str(e)}")
+    
+    @staticmethod
+    def _is_uuid(value: str) -> bool:
+        try:
+            uuid.UUID(value)
+            return True
+        except ValueError:
+            return False
+    
     async def remove_role(self, user_id: str, role_id: str) -> Dict[str, Any]:
         """
         Remueve un rol de un usuario (establece role como null en profiles)
@@ -107,11 +194,19 @@ class RoleService:
         """
         try:
             # Establecer role_id como null
-            response = self.supabase.table("profiles").update({"role_id": None}).eq("id", user_id).execute()
+            response = await SupabaseService.execute(
+                self.supabase.table("profiles").update({"role_id": None}).eq("id", user_id)
+            )
+            await self._invalidate_tokens([user_id])
             return {"message": "Rol removido exitosamente"}
         except Exception as e:
             raise Exception(f"Error al remover rol: {str(e)}")
     
+    async def _invalidate_tokens(self, user_ids: List[str]):
+        """Invalida los tokens sin estado emitidos antes de un cambio de rol"""
+        if config.STATELESS_AUTH:
+            await TokenVersionService.bump(user_ids)
+    
     def has_permission(self, user_roles: List[str], required_role: str) -> bool:
         """
         Verifica si un usuario tiene un permiso específico
@@ -138,32 +233,109 @@ class RoleService:
             Lista de usuarios con sus roles
         """
         try:
-            response = self.supabase.table("profiles").select("id, email, full_name, role_id, created_at").execute()
+            response = await SupabaseService.execute(
+                self.supabase.table("profiles").select("id, email, full_name, role_id, created_at")
+            )
             if not response.data:
                 return []
 
-            # Enriquecer cada usuario con sus roles
-            users: List[Dict[str, Any]] = []
-            for user in response.data:
-                if isinstance(user, dict):
-                    user_id = user.get("id")
-                    if user_id:
-                        roles = await self.get_user_roles(str(user_id))
-                        # roles es una lista de objetos role (posiblemente vacía)
-                        user["roles"] = roles
-                        # Para compatibilidad con frontend, exponer el nombre del rol en `role` si existe
-                        if roles and isinstance(roles, list) and len(roles) > 0:
-                            first_role = roles[0]
-                            if isinstance(first_role, dict):
-                                user["role"] = first_role.get("name")
-                        else:
-                            user["role"] = None
-                    users.append(user)
-
-            return users
+            # Los roles son pocos: una consulta para todos en lugar de una por usuario
+            roles_by_id = await self._roles_by_id()
+            return [self._with_roles(user, roles_by_id) for user in response.data if isinstance(user, dict)]
         except Exception as e:
             raise Exception(f"Error al listar usuarios: {str(e)}")
     
+    async def search_users(self, query: Optional[str] = None, match: str = "contains",
+                           role_id: Optional[str] = None, cursor: Optional[str] = None,
+                           limit: int = 25) -> Dict[str, Any]:
+        """
+        Busca usuarios por email o nombre, paginando por cursor
+        
+        Args:
+            query: Texto a buscar en email y nombre
+            match: "contains" (en cualquier parte) o "prefix" (al inicio)
+            role_id: Filtrar por rol; "none" para usuarios sin rol
+            cursor: next_cursor de la página anterior
+            limit: Tamaño de página
+            
+        Returns:
+            Diccionario con users, total (solo en la primera página) y next_cursor
+            
+        Raises:
+            ValueError: Si el cursor no es válido
+        """
+        after = self._decode_cursor(cursor) if cursor else None
+        try:
+            # El total es una estimación del planificador (exacta en tablas chicas):
+            # un count(*) exacto recorrería todos los perfiles que coinciden
+            builder = self.supabase.table("profiles").select(
+                "id, email, full_name, role_id, created_at",
+                count="estimated" if after is None else None
+            )
+            
+            term = (query or "").strip().replace("*", "").replace("%", "")
+            if term:
+                pattern = SupabaseService.quote(f"{term}*" if match == "prefix" else f"*{term}*")
+                builder = builder.or_(f"email.ilike.{pattern},full_name.ilike.{pattern}")
+            
+            if role_id == "none":
+                builder = builder.is_("role_id", "null")
+            elif role_id:
+                builder = builder.eq("role_id", role_id)
+            
+            if after is not None:
+                created_at, user_id = (SupabaseService.quote(value) for value in after)
+                builder = builder.or_(
+                    f"created_at.lt.{created_at},and(created_at.eq.{created_at},id.lt.{user_id})"
+                )
+            
+            # Una fila de más indica si hay otra página
+            response = await SupabaseService.execute(
+                builder.order("created_at", desc=True).order("id", desc=True).limit(limit + 1)
+            )
+            rows = response.data or []
+            page = rows[:limit]
+            
+            roles_by_id = await self._roles_by_id()
+            next_cursor = None
+            if len(rows) > limit:
+                last = page[-1]
+                next_cursor = self._encode_cursor(last["created_at"], last["id"])
+            
+            return {
+                "users": [self._with_roles(user, roles_by_id) for user in page],
+                "total": response.count if after is None else None,
+                "next_cursor": next_cursor
+            }
+        except Exception as e:
+            raise Exception(f"Error al buscar usuarios: {str(e)}")
+    
+    async def _roles_by_id(self) -> Dict[Any, Dict[str, Any]]:
+        """Roles indexados por ID"""
+        return {role["id"]: role for role in await self.list_roles()}
+    
+    @staticmethod
+    def _with_roles(user: Dict[str, Any], roles_by_id: Dict[Any, Dict[str, Any]]) -> Dict[str, Any]:
+        """Agrega roles (lista) y role (nombre, compatibilidad con frontend) a un perfil"""
+        role = roles_by_id.get(user.get("role_id"))
+        user["roles"] = [role] if role else []
+        user["role"] = role.get("name") if role else None
+        return user
+    
+    @staticmethod
+    def _encode_cursor(created_at: str, user_id: Any) -> str:
+        raw = json.dumps([created_at, str(user_id)], separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> List[str]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            created_at, user_id = json.loads(raw)
+            return [str(created_at), str(user_id)]
+        except Exception:
+            raise ValueError("Cursor inválido")
+    
     async def get_user(self, user_id: str) -> Dict[str, Any]:
         """
         Obtiene los detalles de un usuario con sus roles
@@ -175,7 +347,9 @@ class RoleService:
             Datos del usuario con sus roles
         """
         try:
-            response = self.supabase.table("profiles").select("id, email, full_name, role_id, created_at").eq("id", user_id).execute()
+            response = await SupabaseService.execute(
+                self.supabase.table("profiles").select("id, email, full_name, role_id, created_at").eq("id", user_id)
+            )
 
             if not response.data:
                 raise Exception("Usuario no encontrado")
@@ -209,7 +383,9 @@ class RoleService:
         """
         try:
             # Verificar que el rol existe
-            role_response = self.supabase.table("roles").select("*").eq("id", new_role_id).execute()
+            role_response = await SupabaseService.execute(
+                self.supabase.table("roles").select("*").eq("id", new_role_id)
+            )
             if not role_response.data:
                 raise Exception("Rol no encontrado")
 
@@ -217,9 +393,12 @@ class RoleService:
             role_name = role.get("name")
 
             # Actualizar el role_id directamente en profiles
-            update_response = self.supabase.table("profiles").update({"role_id": new_role_id}).eq("id", user_id).execute()
+            update_response = await SupabaseService.execute(
+                self.supabase.table("profiles").update({"role_id": new_role_id}).eq("id", user_id)
+            )
 
             if update_response.data:
+                await self._invalidate_tokens([user_id])
                 return {"message": "Rol actualizado exitosamente", "role": role_name}
 
             raise Exception("Error al actualizar rol")
@@ -0,0 +1,68 @@
+"""
+Servicio de ventas
+Maneja el checkout del carrito con descuento atómico de stock
+"""
+from typing import TYPE_CHECKING, List, Dict, Any
+from backend.config import config
+from backend.services.product_service import ProductService
+from backend.services.supabase_service import SupabaseService
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+class SaleService:
+    """Servicio para operaciones de venta"""
+
+    def __init__(self):
+        self.supabase: "Client" = SupabaseService.get_service_client()
+
+    async def checkout(self, user_id: str, lines: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Registra una venta a partir de las líneas del carrito
+
+        La validación (existencia, estado, precio y stock), el descuento de stock y el
+        registro de la venta ocurren en una sola transacción en la función checkout_sale
+        (backend/sql/002_checkout.sql): o se venden todas las líneas o ninguna.
+        Las unidades reservadas por el propio carrito (aunque la reserva haya vencido
+        y el barrido aún no pasó) cuentan como disponibles y se liberan al vender; las
+        reservadas por otros carritos no.
+
+        Args:
+            user_id: ID del comprador (profile_id)
+            lines: Líneas con product_id, quantity y el price que vio el cliente
+
+        Returns:
+            Resultado con success, sale_id, total y el estado de cada línea
+        """
+        if not lines:
+            raise Exception("El carrito está vacío")
+        if len(lines) > config.CHECKOUT_MAX_LINES:
+            raise Exception(f"El carrito no puede tener más de {config.CHECKOUT_MAX_LINES} líneas")
+
+        try:
+            response = await SupabaseService.execute(
+                self.supabase.rpc("checkout_sale", {
+                    "p_profile_id": user_id,
+                    "p_cart_id": user_id,  # El carrito puede usar sus propias reservas
+                    "p_lines": [
+                        {
+                            "product_id": line["product_id"],
+                            "quantity": line["quantity"],
+                            "price": line.get("price")
+                        }
+                        for line in lines
+                    ]
+                })
+            )
+        except Exception as e:
+            raise Exception(f"Error al procesar la venta: {str(e)}")
+
+        result = response.data if isinstance(response.data, dict) else {}
+        if result.get("success"):
+            # Cambió el stock: invalidar respuestas cacheadas del catálogo
+            ProductService._bump_catalog_version()
+            for line in result.get("lines") or []:
+                if line.get("available") is not None:
+                    ProductService._stock_changed(line["product_id"], line["available"],
+                                                 line.get("current_stock"))
+        return result
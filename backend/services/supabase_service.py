@@ -2,38 +2,166 @@
 Servicio de conexión a Supabase
 Maneja la conexión única a Supabase para toda la aplicación
 """
-from supabase import create_client, Client
+import asyncio
+import functools
+from typing import TYPE_CHECKING, Any, Callable, Optional, Tuple
 from backend.config import config
+from backend.utils.circuit_breaker import UpstreamUnavailableError, get_breaker, is_transient_error
+from backend.utils.metrics import metrics
+from backend.utils.startup_profiler import startup_profiler
+from backend.utils.upstream_policy import upstream_policy
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 class SupabaseService:
     """Servicio singleton para conexión a Supabase"""
-    
-    _instance: Client = None
-    _service_instance: Client = None
-    
+
+    _instance: Optional["Client"] = None
+    _service_instance: Optional["Client"] = None
+
+    @staticmethod
+    def _create_client(key: str) -> "Client":
+        """
+        Crea un cliente de Supabase
+        El paquete supabase (postgrest, auth, storage, realtime) se importa aquí
+        y no al importar la aplicación, para no pagarlo en el arranque en frío
+        """
+        with startup_profiler.track("supabase.create_client"):
+            from supabase import ClientOptions, create_client
+            # Tope de red por si el plazo de una operación vence: el hilo no queda colgado
+            options = ClientOptions(
+                postgrest_client_timeout=config.UPSTREAM_HTTP_TIMEOUT,
+                storage_client_timeout=int(config.UPSTREAM_HTTP_TIMEOUT)
+            )
+            return create_client(config.SUPABASE_URL, key, options=options)
+
     @classmethod
-    def get_client(cls) -> Client:
+    def get_client(cls) -> "Client":
         """Obtiene el cliente de Supabase con anon key (para operaciones del usuario)"""
         if cls._instance is None:
-            cls._instance = create_client(
-                config.SUPABASE_URL,
-                config.SUPABASE_ANON_KEY
-            )
+            cls._instance = cls._create_client(config.SUPABASE_ANON_KEY)
         return cls._instance
-    
+
     @classmethod
-    def get_service_client(cls) -> Client:
+    def get_service_client(cls) -> "Client":
         """Obtiene el cliente de Supabase con service key (para operaciones administrativas)"""
         if cls._service_instance is None:
-            cls._service_instance = create_client(
-                config.SUPABASE_URL,
-                config.SUPABASE_SERVICE_KEY
-            )
+            cls._service_instance = cls._create_client(config.SUPABASE_SERVICE_KEY)
         return cls._service_instance
-    
+
+    @staticmethod
+    async def execute(query: Any) -> Any:
+        """
+        Ejecuta una consulta de postgrest en un hilo del pool
+        El cliente de Supabase es síncrono: llamarlo directamente bloquea el event loop
+        y serializa todas las peticiones del worker.
+        Los selects son idempotentes: se reintentan ante errores transitorios y, si
+        tardan más de lo habitual, se repiten en paralelo (ver upstream_policy)
+
+        Args:
+            query: Builder de postgrest listo para .execute()
+
+        Returns:
+            Respuesta de postgrest
+
+        Raises:
+            UpstreamUnavailableError: Circuito abierto, plazo vencido o error de red
+        """
+        operation = SupabaseService.describe(query)
+        if not operation.endswith(".select"):
+            return await SupabaseService.call("postgrest", operation, query.execute)
+        return await upstream_policy.run(
+            operation,
+            lambda: SupabaseService.call("postgrest", operation, query.execute)
+        )
+
+    @staticmethod
+    async def call(dependency: str, operation: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Ejecuta una llamada bloqueante a Supabase en el pool, con plazo y circuit breaker
+
+        Args:
+            dependency: postgrest, auth o storage (un circuito por dependencia)
+            operation: Nombre de la operación ("products.select", "auth.sign_in"); define el plazo
+            fn: Función bloqueante del cliente
+            *args, **kwargs: Argumentos de fn
+
+        Returns:
+            Lo que devuelva fn
+
+        Raises:
+            UpstreamUnavailableError: Circuito abierto, plazo vencido o error de red
+        """
+        breaker = get_breaker(dependency)
+        breaker.before_call()
+        deadline = SupabaseService.deadline_for(dependency, operation)
+        metrics.increment("upstream_calls_total", dependency=dependency)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(None, functools.partial(fn, *args, **kwargs)),
+                timeout=deadline
+            )
+        except asyncio.TimeoutError:
+            breaker.record_failure()
+            metrics.increment("upstream_deadline_exceeded_total", operation=operation)
+            raise UpstreamUnavailableError(dependency, f"{operation} no respondió en {deadline:g}s")
+        except Exception as e:
+            if is_transient_error(e):
+                breaker.record_failure()
+                raise UpstreamUnavailableError(dependency, f"{dependency} no disponible: {str(e)}") from e
+            # Error de la petición (validación, restricción): la dependencia respondió
+            breaker.release()
+            raise
+        except BaseException:
+            breaker.release()  # Cancelada: no dice nada de la dependencia
+            raise
+        breaker.record_success()
+        upstream_policy.record_latency(operation, loop.time() - started)
+        return result
+
+    @staticmethod
+    def describe(query: Any) -> str:
+        """
+        Nombre de operación de un builder de postgrest: "<tabla>.<select|insert|update|delete>"
+        o "rpc.<función>"
+        """
+        request = getattr(query, "request", None)
+        path = str(getattr(request, "path", ""))
+        method = getattr(request, "http_method", "GET")
+        method = str(getattr(method, "value", method)).upper()
+        target = path.rsplit("/rest/v1/", 1)[-1].split("?")[0] or "unknown"
+        if target.startswith("rpc/"):
+            return f"rpc.{target[4:]}"
+        verb = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+        return f"{target}.{verb.get(method, method.lower())}"
+
+    @staticmethod
+    def quote(value: Any) -> str:
+        """
+        Escapa un valor para filtros compuestos de PostgREST (or=(...), in.(...)), donde
+        comas, puntos, dos puntos y paréntesis sin comillas rompen la expresión
+        """
+        return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+    @staticmethod
+    def deadline_for(dependency: str, operation: str) -> float:
+        """
+        Plazo de una operación según config.UPSTREAM_DEADLINES, del más específico al
+        más general: "tabla.operación", "operación", dependencia y "default"
+        """
+        deadlines = config.UPSTREAM_DEADLINES
+        verb = operation.rsplit(".", 1)[-1]
+        kind = operation.split(".", 1)[0] if operation.startswith("rpc.") else verb
+        for key in (operation, kind, dependency):
+            if key in deadlines:
+                return deadlines[key]
+        return deadlines["default"]
+
     @classmethod
     def reset_instances(cls):
         """Resetea las instancias (útil para testing)"""
         cls._instance = None
         cls._service_instance = None
-
@@ -0,0 +1,77 @@
+"""
+Servicio de versiones de token
+Mantiene en memoria la versión vigente de cada perfil (tabla profile_versions)
+para que la autorización sin estado detecte usuarios degradados sin consultar la BD
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+from backend.config import config
+from backend.services.supabase_service import SupabaseService
+
+class TokenVersionService:
+    """Copia en memoria de profile_versions, compartida por todo el worker"""
+
+    _versions: Dict[str, int] = {}
+    _refreshed_since: Optional[datetime] = None
+    _last_refresh: Optional[float] = None
+
+    @classmethod
+    async def refresh(cls):
+        """
+        Trae las versiones modificadas desde el último refresco
+        La primera vez carga la tabla completa (solo contiene perfiles con cambios de rol)
+        """
+        started = datetime.utcnow()
+        query = SupabaseService.get_service_client().table("profile_versions").select("profile_id, version")
+        if cls._refreshed_since is not None:
+            # Margen para no perder filas de transacciones que confirmaron tarde
+            since = cls._refreshed_since - timedelta(seconds=5)
+            query = query.gte("updated_at", since.isoformat() + "Z")
+
+        response = await SupabaseService.execute(query)
+        for row in response.data or []:
+            cls._apply(str(row["profile_id"]), int(row["version"]))
+        cls._refreshed_since = started
+        cls._last_refresh = time.monotonic()
+
+    @classmethod
+    def _apply(cls, profile_id: str, version: int):
+        """Guarda una versión si es más nueva que la conocida"""
+        if version > cls._versions.get(profile_id, 0):
+            cls._versions[profile_id] = version
+
+    @classmethod
+    def is_fresh(cls) -> bool:
+        """True si la copia en memoria se refrescó hace poco (si no, no se puede confiar en ella)"""
+        if cls._last_refresh is None:
+            return False
+        return time.monotonic() - cls._last_refresh < config.TOKEN_VERSION_REFRESH_INTERVAL * 3
+
+    @classmethod
+    def current_version(cls, profile_id: str) -> int:
+        """Versión vigente del perfil (0 si nunca cambió)"""
+        return cls._versions.get(str(profile_id), 0)
+
+    @classmethod
+    def is_current(cls, profile_id: str, token_version: int) -> bool:
+        """True si el token se emitió con la versión vigente del perfil"""
+        return token_version >= cls.current_version(profile_id)
+
+    @classmethod
+    async def bump(cls, profile_ids: Iterable[str]):
+        """
+        Invalida los tokens emitidos a los perfiles indicados (cambio de rol, revocación)
+
+        Args:
+            profile_ids: IDs de perfil
+        """
+        ids = [str(pid) for pid in profile_ids]
+        if not ids:
+            return
+        response = await SupabaseService.execute(
+            SupabaseService.get_service_client().rpc("bump_profile_versions", {"p_profile_ids": ids})
+        )
+        # Este worker lo ve de inmediato; los demás en su próximo refresco
+        for row in response.data or []:
+            cls._apply(str(row["profile_id"]), int(row["version"]))
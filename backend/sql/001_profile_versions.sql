@@ -0,0 +1,31 @@
+-- Versiones de perfil para autorización sin estado (STATELESS_AUTH)
+-- Cada cambio de rol incrementa la versión; los tokens emitidos con una versión
+-- anterior dejan de ser válidos cuando los workers refrescan su copia en memoria
+
+create table if not exists public.profile_versions (
+    profile_id uuid primary key references public.profiles(id) on delete cascade,
+    version integer not null default 1,
+    updated_at timestamptz not null default now()
+);
+
+create index if not exists profile_versions_updated_at_idx
+    on public.profile_versions (updated_at);
+
+create or replace function public.bump_profile_versions(p_profile_ids uuid[])
+returns table (profile_id uuid, version integer, updated_at timestamptz)
+language sql
+as $$
+    insert into public.profile_versions as pv (profile_id, version, updated_at)
+    select distinct unnest(p_profile_ids), 1, now()
+    on conflict (profile_id)
+    do update set version = pv.version + 1, updated_at = now()
+    returning pv.profile_id, pv.version, pv.updated_at;
+$$;
+
+-- Solo el backend (service_role) lee y sube versiones: con la anon key cualquiera
+-- podría invalidar todas las sesiones
+alter table public.profile_versions enable row level security;
+revoke all on public.profile_versions from anon, authenticated;
+
+revoke execute on function public.bump_profile_versions(uuid[]) from public, anon, authenticated;
+grant execute on function public.bump_profile_versions(uuid[]) to service_role;
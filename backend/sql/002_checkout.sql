@@ -0,0 +1,138 @@
+-- Ventas y checkout atómico
+-- checkout_sale valida y descuenta el stock de todas las líneas y registra la venta
+-- en una sola transacción. Las filas de products se bloquean (FOR UPDATE, en orden
+-- de id para evitar deadlocks), así que compras concurrentes del mismo SKU se
+-- serializan y el stock nunca queda negativo.
+
+create table if not exists public.sales (
+    id bigint generated always as identity primary key,
+    profile_id uuid not null references public.profiles(id),
+    total numeric(12, 2) not null,
+    created_at timestamptz not null default now()
+);
+
+create table if not exists public.sale_items (
+    id bigint generated always as identity primary key,
+    sale_id bigint not null references public.sales(id) on delete cascade,
+    product_id bigint not null references public.products(id),
+    quantity integer not null check (quantity > 0),
+    unit_price numeric(12, 2) not null,
+    subtotal numeric(12, 2) not null
+);
+
+create index if not exists sale_items_sale_id_idx on public.sale_items (sale_id);
+create index if not exists sales_profile_id_idx on public.sales (profile_id, created_at desc);
+
+-- p_lines: [{"product_id": 1, "quantity": 2, "price": 10.5}, ...]
+-- "price" es el precio que vio el cliente; si cambió, la venta no se registra
+create or replace function public.checkout_sale(p_profile_id uuid, p_lines jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_line record;
+    v_results jsonb := '[]'::jsonb;
+    v_ok boolean := true;
+    v_status text;
+    v_total numeric(12, 2) := 0;
+    v_sale_id bigint;
+begin
+    -- Lectura única de todos los productos del carrito, bloqueando sus filas
+    for v_line in
+        with requested as (
+            select (l->>'product_id')::bigint as product_id,
+                   sum((l->>'quantity')::integer) as quantity,
+                   max((l->>'price')::numeric) as price
+            from jsonb_array_elements(p_lines) as l
+            group by 1
+        ),
+        locked as (
+            select p.id, p.price, p.current_stock, p.is_active
+            from public.products p
+            where p.id in (select product_id from requested)
+            order by p.id
+            for update
+        )
+        select r.product_id, r.quantity, r.price as expected_price,
+               k.id as found_id, k.price, k.current_stock, k.is_active
+        from requested r
+        left join locked k on k.id = r.product_id
+        order by r.product_id
+    loop
+        v_status := case
+            when v_line.found_id is null then 'not_found'
+            when not v_line.is_active then 'inactive'
+            when v_line.expected_price is not null and v_line.expected_price <> v_line.price then 'price_changed'
+            when v_line.current_stock < v_line.quantity then 'insufficient_stock'
+            else 'ok'
+        end;
+        v_ok := v_ok and v_status = 'ok';
+        if v_status = 'ok' then
+            v_total := v_total + v_line.price * v_line.quantity;
+        end if;
+
+        v_results := v_results || jsonb_build_object(
+            'product_id', v_line.product_id,
+            'quantity', v_line.quantity,
+            'status', v_status,
+            'unit_price', v_line.price,
+            'available', v_line.current_stock
+        );
+    end loop;
+
+    if not v_ok then
+        return jsonb_build_object('success', false, 'sale_id', null, 'total', null, 'lines', v_results);
+    end if;
+
+    insert into public.sales (profile_id, total)
+    values (p_profile_id, v_total)
+    returning id into v_sale_id;
+
+    -- Descuento condicional: la guarda current_stock >= quantity es redundante con el
+    -- bloqueo, pero hace imposible el stock negativo aunque cambie el flujo
+    with requested as (
+        select (l->>'product_id')::bigint as product_id,
+               sum((l->>'quantity')::integer) as quantity
+        from jsonb_array_elements(p_lines) as l
+        group by 1
+    ),
+    updated as (
+        update public.products p
+        set current_stock = p.current_stock - r.quantity,
+            updated_at = now()
+        from requested r
+        where p.id = r.product_id
+          and p.current_stock >= r.quantity
+        returning p.id, p.price, r.quantity, p.current_stock
+    )
+    insert into public.sale_items (sale_id, product_id, quantity, unit_price, subtotal)
+    select v_sale_id, u.id, u.quantity, u.price, u.price * u.quantity
+    from updated u;
+
+    if (select count(*) from public.sale_items where sale_id = v_sale_id)
+       <> jsonb_array_length(v_results) then
+        -- Revierte toda la transacción (venta incluida)
+        raise exception 'checkout_sale: stock insuficiente al descontar';
+    end if;
+
+    -- Stock restante por línea
+    select coalesce(jsonb_agg(
+               line || jsonb_build_object('available', p.current_stock, 'current_stock', p.current_stock)
+               order by (line->>'product_id')::bigint
+           ), '[]'::jsonb)
+    into v_results
+    from jsonb_array_elements(v_results) as line
+    join public.products p on p.id = (line->>'product_id')::bigint;
+
+    return jsonb_build_object('success', true, 'sale_id', v_sale_id, 'total', v_total, 'lines', v_results);
+end;
+$$;
+
+-- Las ventas solo se crean y leen desde el backend (service_role). Con la anon key del
+-- frontend cualquiera podría registrar ventas a nombre de otro perfil y vaciar el stock
+alter table public.sales enable row level security;
+alter table public.sale_items enable row level security;
+revoke all on public.sales, public.sale_items from anon, authenticated;
+
+revoke execute on function public.checkout_sale(uuid, jsonb) from public, anon, authenticated;
+grant execute on function public.checkout_sale(uuid, jsonb) to service_role;
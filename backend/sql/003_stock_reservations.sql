@@ -0,0 +1,311 @@
+-- Reservas de stock del carrito con vencimiento
+-- products.reserved_stock es el índice incremental de unidades retenidas: lo mantienen
+-- las funciones de este archivo, así que el stock disponible de un producto es
+-- current_stock - reserved_stock sin recorrer las reservas en cada lectura.
+
+alter table public.products
+    add column if not exists reserved_stock integer not null default 0
+    check (reserved_stock >= 0);
+
+create table if not exists public.stock_reservations (
+    id uuid primary key default gen_random_uuid(),
+    cart_id text not null,
+    product_id bigint not null references public.products(id) on delete cascade,
+    quantity integer not null check (quantity > 0),
+    expires_at timestamptz not null,
+    created_at timestamptz not null default now(),
+    unique (cart_id, product_id)
+);
+
+create index if not exists stock_reservations_expires_at_idx on public.stock_reservations (expires_at);
+
+-- Fija la cantidad retenida de un producto para un carrito (valor absoluto, como el carrito)
+create or replace function public.hold_stock(p_cart_id text, p_product_id bigint,
+                                             p_quantity integer, p_ttl_seconds integer)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_previous integer;
+    v_delta integer;
+    v_available integer;
+    v_product record;
+    v_hold record;
+begin
+    -- Se bloquea primero el producto: si aún no hay reserva no hay fila que bloquear, y
+    -- dos primeras retenciones simultáneas (doble clic) sumarían ambas p_quantity a
+    -- reserved_stock mientras el upsert deja guardada una sola
+    perform 1 from public.products where id = p_product_id for update;
+
+    select quantity into v_previous
+    from public.stock_reservations
+    where cart_id = p_cart_id and product_id = p_product_id
+    for update;
+    v_delta := p_quantity - coalesce(v_previous, 0);
+
+    update public.products
+    set reserved_stock = reserved_stock + v_delta
+    where id = p_product_id
+      and is_active
+      and (v_delta <= 0 or current_stock - reserved_stock >= v_delta)
+    returning id, current_stock, reserved_stock into v_product;
+
+    if not found then
+        select current_stock - reserved_stock into v_available
+        from public.products where id = p_product_id;
+        return jsonb_build_object('success', false, 'product_id', p_product_id,
+                                  'available', v_available);
+    end if;
+
+    if p_quantity <= 0 then
+        delete from public.stock_reservations
+        where cart_id = p_cart_id and product_id = p_product_id;
+        return jsonb_build_object('success', true, 'product_id', p_product_id, 'quantity', 0,
+                                  'available', v_product.current_stock - v_product.reserved_stock,
+                                  'current_stock', v_product.current_stock);
+    end if;
+
+    insert into public.stock_reservations (cart_id, product_id, quantity, expires_at)
+    values (p_cart_id, p_product_id, p_quantity, now() + make_interval(secs => p_ttl_seconds))
+    on conflict (cart_id, product_id)
+    do update set quantity = excluded.quantity, expires_at = excluded.expires_at
+    returning id, quantity, expires_at into v_hold;
+
+    return jsonb_build_object('success', true, 'reservation_id', v_hold.id, 'product_id', p_product_id,
+                              'quantity', v_hold.quantity, 'expires_at', v_hold.expires_at,
+                              'available', v_product.current_stock - v_product.reserved_stock,
+                              'current_stock', v_product.current_stock);
+end;
+$$;
+
+-- Extiende todas las reservas vigentes de un carrito
+create or replace function public.extend_holds(p_cart_id text, p_ttl_seconds integer)
+returns integer
+language sql
+as $$
+    with extended as (
+        update public.stock_reservations
+        set expires_at = now() + make_interval(secs => p_ttl_seconds)
+        where cart_id = p_cart_id and expires_at > now()
+        returning 1
+    )
+    select count(*)::integer from extended;
+$$;
+
+-- Libera reservas (de un producto o de todo el carrito) devolviendo las unidades
+-- Devuelve las unidades liberadas y el stock de cada producto afectado, para que el
+-- backend avise del cambio (caché del catálogo, índice facetado, dashboards)
+drop function if exists public.release_holds(text, bigint);
+create or replace function public.release_holds(p_cart_id text, p_product_id bigint default null)
+returns jsonb
+language sql
+as $$
+    with released as (
+        delete from public.stock_reservations
+        where cart_id = p_cart_id
+          and (p_product_id is null or product_id = p_product_id)
+        returning product_id, quantity
+    ),
+    per_product as (
+        select product_id, sum(quantity) as quantity from released group by product_id
+    ),
+    restored as (
+        update public.products p
+        set reserved_stock = greatest(0, p.reserved_stock - r.quantity)
+        from per_product r
+        where p.id = r.product_id
+        returning p.id, p.current_stock, p.reserved_stock
+    )
+    select jsonb_build_object(
+        'released', (select coalesce(sum(quantity), 0)::integer from per_product),
+        'products', (select coalesce(jsonb_agg(jsonb_build_object(
+                                 'product_id', id,
+                                 'available', current_stock - reserved_stock,
+                                 'current_stock', current_stock) order by id), '[]'::jsonb)
+                     from restored)
+    );
+$$;
+
+-- Barrido de reservas vencidas; skip locked permite que varios workers lo ejecuten a la vez
+-- Devuelve lo mismo que release_holds
+drop function if exists public.release_expired_reservations(integer);
+create or replace function public.release_expired_reservations(p_batch integer default 1000)
+returns jsonb
+language sql
+as $$
+    with expired as (
+        select id from public.stock_reservations
+        where expires_at <= now()
+        order by expires_at
+        limit p_batch
+        for update skip locked
+    ),
+    released as (
+        delete from public.stock_reservations s
+        using expired e
+        where s.id = e.id
+        returning s.product_id, s.quantity
+    ),
+    per_product as (
+        select product_id, sum(quantity) as quantity from released group by product_id
+    ),
+    restored as (
+        update public.products p
+        set reserved_stock = greatest(0, p.reserved_stock - r.quantity)
+        from per_product r
+        where p.id = r.product_id
+        returning p.id, p.current_stock, p.reserved_stock
+    )
+    select jsonb_build_object(
+        'released', (select coalesce(sum(quantity), 0)::integer from per_product),
+        'products', (select coalesce(jsonb_agg(jsonb_build_object(
+                                 'product_id', id,
+                                 'available', current_stock - reserved_stock,
+                                 'current_stock', current_stock) order by id), '[]'::jsonb)
+                     from restored)
+    );
+$$;
+
+-- Las reservas solo las maneja el backend (service_role): con la anon key cualquiera
+-- podría retener o liberar stock de cualquier carrito
+alter table public.stock_reservations enable row level security;
+revoke all on public.stock_reservations from anon, authenticated;
+
+revoke execute on function public.hold_stock(text, bigint, integer, integer) from public, anon, authenticated;
+revoke execute on function public.extend_holds(text, integer) from public, anon, authenticated;
+revoke execute on function public.release_holds(text, bigint) from public, anon, authenticated;
+revoke execute on function public.release_expired_reservations(integer) from public, anon, authenticated;
+grant execute on function public.hold_stock(text, bigint, integer, integer) to service_role;
+grant execute on function public.extend_holds(text, integer) to service_role;
+grant execute on function public.release_holds(text, bigint) to service_role;
+grant execute on function public.release_expired_reservations(integer) to service_role;
+
+-- checkout_sale (002) considerando reservas: el carrito que compra puede usar sus
+-- propias unidades retenidas, pero no las de otros carritos; al vender se liberan
+drop function if exists public.checkout_sale(uuid, jsonb);
+
+create or replace function public.checkout_sale(p_profile_id uuid, p_lines jsonb, p_cart_id text default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_line record;
+    v_results jsonb := '[]'::jsonb;
+    v_ok boolean := true;
+    v_status text;
+    v_available integer;
+    v_total numeric(12, 2) := 0;
+    v_sale_id bigint;
+begin
+    -- Las reservas propias cuentan aunque hayan vencido: sus unidades siguen en
+    -- reserved_stock hasta el barrido y nadie más las tiene. Se bloquean antes que los
+    -- productos (el mismo orden que el barrido y release_holds) y el barrido, con skip
+    -- locked, ya no las toca
+    if p_cart_id is not null then
+        perform 1 from public.stock_reservations
+        where cart_id = p_cart_id
+          and product_id in (select (l->>'product_id')::bigint from jsonb_array_elements(p_lines) as l)
+        order by product_id
+        for update;
+    end if;
+
+    for v_line in
+        with requested as (
+            select (l->>'product_id')::bigint as product_id,
+                   sum((l->>'quantity')::integer) as quantity,
+                   max((l->>'price')::numeric) as price
+            from jsonb_array_elements(p_lines) as l
+            group by 1
+        ),
+        locked as (
+            select p.id, p.price, p.current_stock, p.reserved_stock, p.is_active
+            from public.products p
+            where p.id in (select product_id from requested)
+            order by p.id
+            for update
+        )
+        select r.product_id, r.quantity, r.price as expected_price,
+               k.id as found_id, k.price, k.current_stock, k.reserved_stock, k.is_active,
+               coalesce(h.quantity, 0) as own_held
+        from requested r
+        left join locked k on k.id = r.product_id
+        left join public.stock_reservations h
+               on h.cart_id = p_cart_id and h.product_id = r.product_id
+        order by r.product_id
+    loop
+        v_available := v_line.current_stock - v_line.reserved_stock + v_line.own_held;
+        v_status := case
+            when v_line.found_id is null then 'not_found'
+            when not v_line.is_active then 'inactive'
+            when v_line.expected_price is not null and v_line.expected_price <> v_line.price then 'price_changed'
+            when v_available < v_line.quantity then 'insufficient_stock'
+            else 'ok'
+        end;
+        v_ok := v_ok and v_status = 'ok';
+        if v_status = 'ok' then
+            v_total := v_total + v_line.price * v_line.quantity;
+        end if;
+
+        v_results := v_results || jsonb_build_object(
+            'product_id', v_line.product_id,
+            'quantity', v_line.quantity,
+            'status', v_status,
+            'unit_price', v_line.price,
+            'available', v_available
+        );
+    end loop;
+
+    if not v_ok then
+        return jsonb_build_object('success', false, 'sale_id', null, 'total', null, 'lines', v_results);
+    end if;
+
+    -- Las reservas propias se consumen con la venta
+    if p_cart_id is not null then
+        perform public.release_holds(p_cart_id, (line->>'product_id')::bigint)
+        from jsonb_array_elements(v_results) as line;
+    end if;
+
+    insert into public.sales (profile_id, total)
+    values (p_profile_id, v_total)
+    returning id into v_sale_id;
+
+    with requested as (
+        select (l->>'product_id')::bigint as product_id,
+               sum((l->>'quantity')::integer) as quantity
+        from jsonb_array_elements(p_lines) as l
+        group by 1
+    ),
+    updated as (
+        update public.products p
+        set current_stock = p.current_stock - r.quantity,
+            updated_at = now()
+        from requested r
+        where p.id = r.product_id
+          and p.current_stock - p.reserved_stock >= r.quantity
+        returning p.id, p.price, r.quantity
+    )
+    insert into public.sale_items (sale_id, product_id, quantity, unit_price, subtotal)
+    select v_sale_id, u.id, u.quantity, u.price, u.price * u.quantity
+    from updated u;
+
+    if (select count(*) from public.sale_items where sale_id = v_sale_id)
+       <> jsonb_array_length(v_results) then
+        raise exception 'checkout_sale: stock insuficiente al descontar';
+    end if;
+
+    select coalesce(jsonb_agg(
+               line || jsonb_build_object('available', p.current_stock - p.reserved_stock,
+                                          'current_stock', p.current_stock)
+               order by (line->>'product_id')::bigint
+           ), '[]'::jsonb)
+    into v_results
+    from jsonb_array_elements(v_results) as line
+    join public.products p on p.id = (line->>'product_id')::bigint;
+
+    return jsonb_build_object('success', true, 'sale_id', v_sale_id, 'total', v_total, 'lines', v_results);
+end;
+$$;
+
+-- Igual que en 002: el checkout solo lo ejecuta el backend
+revoke execute on function public.checkout_sale(uuid, jsonb, text) from public, anon, authenticated;
+grant execute on function public.checkout_sale(uuid, jsonb, text) to service_role;
@@ -0,0 +1,51 @@
+-- Diferencias por campo en auditoría
+-- audit_logs guarda solo los campos que cambiaron ({"price": [antes, después]})
+-- y su lista en changed_fields, indexada para buscar "quién cambió el precio"
+
+alter table public.audit_logs
+    add column if not exists details jsonb,
+    add column if not exists changed_fields text[];
+
+create index if not exists audit_logs_changed_fields_idx
+    on public.audit_logs using gin (changed_fields);
+
+-- Actualiza un producto y devuelve la fila nueva junto con el diff, en una sola llamada:
+-- la fila anterior se lee bajo bloqueo dentro de la misma transacción
+create or replace function public.update_product_diff(p_product_id bigint, p_changes jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_old public.products;
+    v_new public.products;
+    v_diff jsonb;
+begin
+    select * into v_old from public.products where id = p_product_id for update;
+    if not found then
+        return null;
+    end if;
+
+    v_new := jsonb_populate_record(v_old, p_changes);
+
+    update public.products
+    set name = v_new.name,
+        description = v_new.description,
+        "Sku" = v_new."Sku",
+        brand = v_new.brand,
+        price = v_new.price,
+        current_stock = v_new.current_stock,
+        min_stock = v_new.min_stock,
+        is_active = v_new.is_active,
+        category_id = v_new.category_id,
+        updated_at = now()
+    where id = p_product_id
+    returning * into v_new;
+
+    select coalesce(jsonb_object_agg(k, jsonb_build_array(to_jsonb(v_old) -> k, to_jsonb(v_new) -> k)), '{}'::jsonb)
+    into v_diff
+    from jsonb_object_keys(p_changes) as k
+    where (to_jsonb(v_old) -> k) is distinct from (to_jsonb(v_new) -> k);
+
+    return jsonb_build_object('product', to_jsonb(v_new), 'changes', v_diff);
+end;
+$$;
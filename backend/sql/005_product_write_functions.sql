@@ -0,0 +1,71 @@
+-- Escrituras de producto en una sola llamada
+-- Cada función escribe el producto (y su imagen, si viene) y devuelve la fila con
+-- la misma forma que el select "*, categories(*), product_images(*)" de PostgREST,
+-- para que el backend no tenga que volver a leerla.
+
+create or replace function public.product_with_embeds(p_product_id bigint)
+returns jsonb
+language sql
+stable
+as $$
+    select to_jsonb(p)
+        || jsonb_build_object(
+               'categories', (select to_jsonb(c) from public.categories c where c.id = p.category_id),
+               'product_images', coalesce(
+                   (select jsonb_agg(to_jsonb(i) order by i.id)
+                    from public.product_images i where i.product_id = p.id),
+                   '[]'::jsonb)
+           )
+    from public.products p
+    where p.id = p_product_id;
+$$;
+
+create or replace function public.create_product_full(p_product jsonb, p_image_url text default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_row public.products;
+    v_id bigint;
+begin
+    v_row := jsonb_populate_record(null::public.products, p_product);
+
+    insert into public.products (name, description, "Sku", brand, price, current_stock,
+                                 min_stock, is_active, category_id)
+    values (v_row.name, v_row.description, v_row."Sku", v_row.brand, v_row.price,
+            coalesce(v_row.current_stock, 0), coalesce(v_row.min_stock, 0),
+            coalesce(v_row.is_active, true), v_row.category_id)
+    returning id into v_id;
+
+    if p_image_url is not null then
+        insert into public.product_images (product_id, image_url) values (v_id, p_image_url);
+    end if;
+
+    return public.product_with_embeds(v_id);
+end;
+$$;
+
+-- Igual que update_product_diff (004) pero agrega la imagen y devuelve la fila embebida
+create or replace function public.update_product_full(p_product_id bigint, p_changes jsonb,
+                                                      p_image_url text default null)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_result jsonb;
+    v_changes jsonb;
+begin
+    v_result := public.update_product_diff(p_product_id, p_changes);
+    if v_result is null then
+        return null;
+    end if;
+    v_changes := v_result -> 'changes';
+
+    if p_image_url is not null then
+        insert into public.product_images (product_id, image_url) values (p_product_id, p_image_url);
+        v_changes := v_changes || jsonb_build_object('image_url', jsonb_build_array(null, p_image_url));
+    end if;
+
+    return jsonb_build_object('product', public.product_with_embeds(p_product_id), 'changes', v_changes);
+end;
+$$;
@@ -0,0 +1,151 @@
+-- Resumen de categorías para los filtros de la tienda
+-- category_stats guarda, por categoría, la cantidad de productos activos, cuántos
+-- tienen stock disponible y el rango de precios. Un trigger sobre products la mantiene
+-- al día sumando la diferencia entre la fila anterior y la nueva, así que ni leer el
+-- resumen ni escribir un producto depende del tamaño del catálogo.
+
+create table if not exists public.category_stats (
+    category_id bigint primary key references public.categories (id) on delete cascade,
+    product_count integer not null default 0,
+    in_stock_count integer not null default 0,
+    min_price numeric,
+    max_price numeric,
+    updated_at timestamptz not null default now()
+);
+
+-- Mínimo y máximo de precio de una categoría sin recorrer sus productos
+create index if not exists products_active_category_price_idx
+    on public.products (category_id, price)
+    where is_active;
+
+-- Recalcula una categoría completa (carga inicial)
+create or replace function public.refresh_category_stats(p_category_id bigint)
+returns void
+language sql
+as $$
+    insert into public.category_stats as s
+        (category_id, product_count, in_stock_count, min_price, max_price, updated_at)
+    select p_category_id,
+           count(*),
+           count(*) filter (where p.current_stock - p.reserved_stock > 0),
+           min(p.price),
+           max(p.price),
+           now()
+    from public.products p
+    where p.category_id = p_category_id
+      and p.is_active
+    on conflict (category_id) do update
+        set product_count = excluded.product_count,
+            in_stock_count = excluded.in_stock_count,
+            min_price = excluded.min_price,
+            max_price = excluded.max_price,
+            updated_at = excluded.updated_at;
+$$;
+
+-- Suma los deltas de una escritura a los contadores de la categoría. El upsert bloquea
+-- la fila de category_stats hasta el fin de la transacción, así que dos escrituras
+-- concurrentes de la misma categoría se aplican una después de la otra sin perder
+-- ninguna. El rango de precios no admite deltas: se vuelve a leer con el índice
+-- parcial (dos búsquedas en el borde del índice, no un recorrido de la categoría)
+create or replace function public.apply_category_stats_delta(p_category_id bigint, p_count_delta integer,
+                                                             p_in_stock_delta integer, p_prices_changed boolean)
+returns void
+language plpgsql
+as $$
+begin
+    if p_count_delta = 0 and p_in_stock_delta = 0 and not p_prices_changed then
+        return;
+    end if;
+
+    insert into public.category_stats as s (category_id, product_count, in_stock_count, updated_at)
+    values (p_category_id, p_count_delta, p_in_stock_delta, now())
+    on conflict (category_id) do update
+        set product_count = s.product_count + excluded.product_count,
+            in_stock_count = s.in_stock_count + excluded.in_stock_count,
+            updated_at = excluded.updated_at;
+
+    if p_prices_changed then
+        update public.category_stats
+        set min_price = (select min(price) from public.products
+                         where category_id = p_category_id and is_active),
+            max_price = (select max(price) from public.products
+                         where category_id = p_category_id and is_active)
+        where category_id = p_category_id;
+    end if;
+end;
+$$;
+
+-- "Con stock" es stock disponible (current_stock - reserved_stock), como en la tienda
+create or replace function public.products_category_stats_trigger()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_old_active integer := 0;
+    v_old_in_stock integer := 0;
+    v_new_active integer := 0;
+    v_new_in_stock integer := 0;
+begin
+    if tg_op in ('UPDATE', 'DELETE') and old.category_id is not null and old.is_active then
+        v_old_active := 1;
+        v_old_in_stock := (old.current_stock - old.reserved_stock > 0)::integer;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') and new.category_id is not null and new.is_active then
+        v_new_active := 1;
+        v_new_in_stock := (new.current_stock - new.reserved_stock > 0)::integer;
+    end if;
+
+    if tg_op = 'UPDATE' and old.category_id is not distinct from new.category_id then
+        -- Misma categoría: un solo delta (lo habitual, p. ej. un descuento de stock)
+        if new.category_id is not null then
+            perform public.apply_category_stats_delta(
+                new.category_id,
+                v_new_active - v_old_active,
+                v_new_in_stock - v_old_in_stock,
+                v_new_active <> v_old_active or (v_new_active = 1 and new.price is distinct from old.price)
+            );
+        end if;
+        return null;
+    end if;
+
+    if v_old_active = 1 then
+        perform public.apply_category_stats_delta(old.category_id, -1, -v_old_in_stock, true);
+    end if;
+    if v_new_active = 1 then
+        perform public.apply_category_stats_delta(new.category_id, 1, v_new_in_stock, true);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists products_category_stats on public.products;
+create trigger products_category_stats
+    after insert or delete or update of category_id, price, current_stock, reserved_stock, is_active
+    on public.products
+    for each row
+    execute function public.products_category_stats_trigger();
+
+-- Categorías sin productos activos aparecen con contadores en cero
+create or replace view public.category_summary as
+    select c.id,
+           c.name,
+           coalesce(s.product_count, 0) as product_count,
+           coalesce(s.in_stock_count, 0) as in_stock_count,
+           s.min_price,
+           s.max_price
+    from public.categories c
+    left join public.category_stats s on s.category_id = c.id;
+
+-- Carga inicial
+select public.refresh_category_stats(id) from public.categories;
+
+-- Solo el backend (service_role) escribe el resumen: con la anon key cualquiera
+-- podría alterar los conteos y rangos de precio que muestra la tienda
+alter table public.category_stats enable row level security;
+revoke all on public.category_stats from anon, authenticated;
+
+-- Solo los usa el trigger y la carga inicial
+revoke execute on function public.refresh_category_stats(bigint) from public, anon, authenticated;
+revoke execute on function public.apply_category_stats_delta(bigint, integer, integer, boolean) from public, anon, authenticated;
+grant execute on function public.refresh_category_stats(bigint) to service_role;
+grant execute on function public.apply_category_stats_delta(bigint, integer, integer, boolean) to service_role;
@@ -0,0 +1,16 @@
+-- Imágenes direccionadas por contenido
+-- Los archivos se guardan en Storage como sha256/<2 primeros>/<hash>.<ext>, así que
+-- subir la misma foto otra vez (o usarla en varias variantes del producto) no vuelve
+-- a subirla: solo se agrega la fila en product_images.
+
+alter table public.product_images
+    add column if not exists content_hash text;
+
+-- Buscar si el contenido ya está en Storage
+create index if not exists product_images_content_hash_idx
+    on public.product_images (content_hash)
+    where content_hash is not null;
+
+-- La misma imagen no se asocia dos veces al mismo producto
+create unique index if not exists product_images_product_content_hash_key
+    on public.product_images (product_id, content_hash);
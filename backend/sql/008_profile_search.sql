@@ -0,0 +1,21 @@
+-- Búsqueda de usuarios para el panel de administración
+-- /roles/usuarios/buscar filtra profiles por email o nombre (ilike '%texto%' o
+-- 'texto%') y por rol, y pagina por (created_at, id) descendente. Los índices
+-- trigram permiten resolver los ilike sin recorrer toda la tabla, y el índice
+-- compuesto hace que cada página cueste lo mismo sin importar cuántas se saltaron.
+
+create extension if not exists pg_trgm;
+
+create index if not exists profiles_email_trgm_idx
+    on public.profiles using gin (email gin_trgm_ops);
+
+create index if not exists profiles_full_name_trgm_idx
+    on public.profiles using gin (full_name gin_trgm_ops);
+
+-- Paginación por cursor: order by created_at desc, id desc
+create index if not exists profiles_created_at_id_idx
+    on public.profiles (created_at desc, id desc);
+
+-- Filtro por rol con el mismo orden
+create index if not exists profiles_role_created_at_id_idx
+    on public.profiles (role_id, created_at desc, id desc);
@@ -0,0 +1,94 @@
+-- Refresh tokens con rotación y detección de reutilización
+-- /auth/refresh canjea un refresh token por un access token nuevo y otro refresh
+-- token de la misma familia (la familia nace en cada login). Solo se guarda el
+-- SHA-256 del token. Si un token ya canjeado se vuelve a presentar, alguien tiene
+-- una copia robada: se revoca la familia completa y ambos tienen que volver a
+-- iniciar sesión.
+
+create table if not exists public.refresh_tokens (
+    token_hash text primary key,
+    family_id uuid not null,
+    profile_id uuid not null references public.profiles (id) on delete cascade,
+    parent_hash text,
+    expires_at timestamptz not null,
+    used_at timestamptz,
+    revoked_at timestamptz,
+    created_at timestamptz not null default now()
+);
+
+create index if not exists refresh_tokens_family_idx
+    on public.refresh_tokens (family_id);
+
+-- Limpieza de tokens vencidos
+create index if not exists refresh_tokens_expires_at_idx
+    on public.refresh_tokens (expires_at);
+
+-- Canjea p_token_hash por p_new_hash de forma atómica (el for update serializa dos
+-- canjes simultáneos del mismo token: el segundo ve used_at y revoca la familia).
+-- status: ok, invalid, expired, revoked o reused
+create or replace function public.rotate_refresh_token(
+    p_token_hash text,
+    p_new_hash text,
+    p_expires_at timestamptz
+)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_token public.refresh_tokens%rowtype;
+begin
+    select * into v_token
+    from public.refresh_tokens
+    where token_hash = p_token_hash
+    for update;
+
+    if not found then
+        return jsonb_build_object('status', 'invalid');
+    end if;
+
+    if v_token.revoked_at is not null then
+        return jsonb_build_object('status', 'revoked', 'profile_id', v_token.profile_id);
+    end if;
+
+    if v_token.used_at is not null then
+        update public.refresh_tokens
+        set revoked_at = now()
+        where family_id = v_token.family_id and revoked_at is null;
+        return jsonb_build_object('status', 'reused', 'profile_id', v_token.profile_id,
+                                  'family_id', v_token.family_id);
+    end if;
+
+    if v_token.expires_at <= now() then
+        return jsonb_build_object('status', 'expired', 'profile_id', v_token.profile_id);
+    end if;
+
+    update public.refresh_tokens set used_at = now() where token_hash = p_token_hash;
+    insert into public.refresh_tokens (token_hash, family_id, profile_id, parent_hash, expires_at)
+    values (p_new_hash, v_token.family_id, v_token.profile_id, p_token_hash, p_expires_at);
+
+    return jsonb_build_object('status', 'ok', 'profile_id', v_token.profile_id,
+                              'family_id', v_token.family_id);
+end;
+$$;
+
+-- Cierra sesión: revoca la familia del token presentado
+create or replace function public.revoke_refresh_token_family(p_token_hash text)
+returns void
+language sql
+as $$
+    update public.refresh_tokens
+    set revoked_at = now()
+    where revoked_at is null
+      and family_id = (select family_id from public.refresh_tokens where token_hash = p_token_hash);
+$$;
+
+-- Solo el backend (service_role) usa la tabla y las funciones. Con la anon key del
+-- frontend se podría insertar un token_hash elegido para cualquier perfil y canjearlo
+-- en /auth/refresh: RLS sin políticas y sin privilegios para anon/authenticated
+alter table public.refresh_tokens enable row level security;
+revoke all on public.refresh_tokens from anon, authenticated;
+
+revoke execute on function public.rotate_refresh_token(text, text, timestamptz) from public, anon, authenticated;
+revoke execute on function public.revoke_refresh_token_family(text) from public, anon, authenticated;
+grant execute on function public.rotate_refresh_token(text, text, timestamptz) to service_role;
+grant execute on function public.revoke_refresh_token_family(text) to service_role;
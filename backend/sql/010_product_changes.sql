@@ -0,0 +1,29 @@
+-- Sincronización incremental del catálogo
+-- /productos/cambios devuelve los productos con (updated_at, id) posterior a la marca
+-- que manda el cliente, en ese orden. Para que ningún cambio se pierda, updated_at lo
+-- fija un trigger en cada insert/update (incluida la desactivación de delete_product
+-- y los cambios de stock de ventas y reservas), sin depender de quien escribe.
+
+alter table public.products
+    add column if not exists updated_at timestamptz not null default now();
+
+-- clock_timestamp() y no now(): now() es el inicio de la transacción, y una
+-- transacción larga dejaría la fila con una marca anterior a otras ya sincronizadas
+create or replace function public.set_products_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := clock_timestamp();
+    return new;
+end;
+$$;
+
+drop trigger if exists products_set_updated_at on public.products;
+create trigger products_set_updated_at
+    before insert or update on public.products
+    for each row execute function public.set_products_updated_at();
+
+-- Paginación por cursor: order by updated_at, id
+create index if not exists products_updated_at_id_idx
+    on public.products (updated_at, id);
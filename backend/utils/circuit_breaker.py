@@ -0,0 +1,151 @@
+"""
+Circuit breaker por dependencia externa (PostgREST, Auth, Storage)
+Tras varios fallos seguidos el circuito se abre y las llamadas fallan al instante
+con 503 en lugar de esperar el timeout; pasado un tiempo deja pasar una llamada
+de prueba (half-open) y, si sale bien, se vuelve a cerrar
+"""
+import threading
+import time
+from typing import Dict, Optional
+from backend.config import config
+from backend.utils.metrics import metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Errores de red y timeouts de los clientes HTTP de Supabase (httpx, gotrue).
+# Se comparan por nombre para no importar httpx al cargar este módulo
+_TRANSIENT_ERROR_NAMES = {"TransportError", "TimeoutException", "AuthRetryableError"}
+
+class UpstreamUnavailableError(Exception):
+    """La dependencia no respondió a tiempo o su circuito está abierto (se responde 503)"""
+
+    def __init__(self, dependency: str, message: str, retry_after: Optional[float] = None,
+                 retryable: bool = True):
+        super().__init__(message)
+        self.dependency = dependency
+        self.retry_after = retry_after
+        # False si el circuito está abierto: reintentar solo sumaría carga
+        self.retryable = retryable
+
+def find_upstream_error(error: BaseException) -> Optional[UpstreamUnavailableError]:
+    """
+    Busca un UpstreamUnavailableError en la cadena de excepciones
+    Los servicios y controladores envuelven los errores (Exception -> HTTPException 500)
+    dentro de su except, así que el original queda en __cause__/__context__
+    """
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        if isinstance(current, UpstreamUnavailableError):
+            return current
+        seen.add(id(current))
+        current = current.__cause__ or current.__context__
+    return None
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    True si el error indica una dependencia caída o lenta (cuenta para el circuito)
+    Errores de la petición (4xx, restricciones de la BD) no abren el circuito
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, UpstreamUnavailableError)):
+        return True
+    if any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(error).__mro__):
+        return True
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and status >= 500
+
+class CircuitBreaker:
+    """Estado del circuito de una dependencia (compartido por el worker)"""
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float):
+        """
+        Args:
+            name: Nombre de la dependencia
+            failure_threshold: Fallos seguidos que abren el circuito
+            recovery_timeout: Segundos abierto antes de probar de nuevo
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        metrics.set_gauge("circuit_breaker_state", CLOSED, dependency=name)
+
+    def before_call(self):
+        """
+        Autoriza una llamada o falla al instante
+
+        Raises:
+            UpstreamUnavailableError: Si el circuito está abierto
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                # Una sola llamada de prueba; el resto sigue fallando rápido
+                self._probe_in_flight = True
+                return
+        metrics.increment("circuit_breaker_rejections_total", dependency=self.name)
+        raise UpstreamUnavailableError(
+            self.name,
+            f"{self.name} no disponible (circuito abierto)",
+            retry_after=max(remaining, 1.0),
+            retryable=False
+        )
+
+    def record_success(self):
+        """Registra una llamada exitosa"""
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        """Registra un fallo de la dependencia"""
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                if self.state != OPEN:
+                    self._transition(OPEN)
+
+    def release(self):
+        """Termina una llamada que no dice nada de la salud de la dependencia (error 4xx)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def _transition(self, state: str):
+        self.state = state
+        metrics.set_gauge("circuit_breaker_state", state, dependency=self.name)
+        metrics.increment("circuit_breaker_transitions_total", dependency=self.name, to=state)
+
+    def snapshot(self) -> Dict[str, object]:
+        """Estado para /health/ready"""
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(dependency: str) -> CircuitBreaker:
+    """Circuito de una dependencia (se crea en el primer uso)"""
+    breaker = _breakers.get(dependency)
+    if breaker is None:
+        breaker = _breakers.setdefault(dependency, CircuitBreaker(
+            dependency,
+            failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD,
+            recovery_timeout=config.CIRCUIT_RECOVERY_TIMEOUT
+        ))
+    return breaker
+
+def breaker_states() -> Dict[str, Dict[str, object]]:
+    """Estado de todos los circuitos creados"""
+    return {name: breaker.snapshot() for name, breaker in _breakers.items()}
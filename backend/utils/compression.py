@@ -0,0 +1,175 @@
+"""
+Utilidades de compresión HTTP
+Negociación de Accept-Encoding (brotli/gzip) y caché de respuestas precomprimidas
+"""
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+from starlette.requests import Request
+from starlette.responses import Response
+from backend.config import config
+from backend.utils.circuit_breaker import find_upstream_error
+from backend.utils.metrics import metrics
+
+try:
+    import brotli  # type: ignore[import]
+except ImportError:  # brotli es opcional: sin él solo se negocia gzip
+    brotli = None
+
+def supported_encodings() -> Tuple[str, ...]:
+    """Codificaciones disponibles en orden de preferencia"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Elige la mejor codificación aceptada por el cliente
+
+    Args:
+        accept_encoding: Valor de la cabecera Accept-Encoding
+
+    Returns:
+        "br", "gzip" o None si el cliente no acepta ninguna (identity)
+    """
+    if not accept_encoding:
+        return None
+
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip().lower()] = q
+
+    wildcard = accepted.get("*")
+    for encoding in supported_encodings():
+        q = accepted.get(encoding, wildcard)
+        if q is not None and q > 0:
+            return encoding
+    return None
+
+def compress(body: bytes, encoding: str, precompressed: bool = False) -> bytes:
+    """
+    Comprime un cuerpo de respuesta
+
+    Args:
+        body: Bytes sin comprimir
+        encoding: "br" o "gzip"
+        precompressed: Si es True usa el nivel máximo (el resultado se cachea y se reutiliza)
+
+    Returns:
+        Bytes comprimidos
+    """
+    if encoding == "br" and brotli is not None:
+        quality = 11 if precompressed else config.COMPRESSION_BROTLI_QUALITY
+        return brotli.compress(body, quality=quality)
+    level = 9 if precompressed else config.COMPRESSION_GZIP_LEVEL
+    # mtime=0 para que el mismo contenido produzca siempre los mismos bytes
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+class CompressedResponseCache:
+    """Caché LRU de cuerpos JSON ya serializados y comprimidos por codificación"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: int) -> Optional[Dict[str, Any]]:
+        """Entrada vigente para la clave y versión del catálogo, o None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["version"] != version or entry["expires_at"] < time.monotonic():
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, version: int, body: bytes) -> Dict[str, Any]:
+        """Guarda el cuerpo sin comprimir; las variantes comprimidas se generan al pedirse"""
+        entry = {
+            "version": version,
+            "expires_at": time.monotonic() + self.ttl,
+            "bodies": {"identity": body},
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def body_for(self, entry: Dict[str, Any], encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """
+        Cuerpo en la codificación pedida, comprimiéndolo una sola vez por entrada
+
+        Returns:
+            Tupla (bytes, codificación usada o None si va sin comprimir)
+        """
+        bodies = entry["bodies"]
+        identity = bodies["identity"]
+        if encoding is None or len(identity) < config.COMPRESSION_MIN_SIZE:
+            return identity, None
+        if encoding not in bodies:
+            bodies[encoding] = compress(identity, encoding, precompressed=True)
+        return bodies[encoding], encoding
+
+    def get_stale(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """Última entrada de la clave aunque esté vencida o sea de otra versión"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def clear(self):
+        """Vacía la caché"""
+        with self._lock:
+            self._entries.clear()
+
+response_cache = CompressedResponseCache(
+    max_entries=config.RESPONSE_CACHE_MAX_ENTRIES,
+    ttl=config.RESPONSE_CACHE_TTL,
+)
+
+def serialize_json(data: Any) -> bytes:
+    """Serializa a JSON compacto (mismo resultado que JSONResponse)"""
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=str).encode("utf-8")
+
+async def cached_json_response(request: Request, key: Hashable, version: int,
+                               producer: Callable[[], Awaitable[Any]]) -> Response:
+    """
+    Respuesta JSON servida desde la caché precomprimida
+
+    Args:
+        request: Petición (para negociar Accept-Encoding)
+        key: Clave de la respuesta (ruta + parámetros normalizados)
+        version: Versión del catálogo; un cambio invalida la entrada
+        producer: Corutina que genera los datos si no están en caché
+
+    Returns:
+        Response con el cuerpo ya comprimido según lo que acepte el cliente
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    entry = response_cache.get(key, version)
+    if entry is None:
+        try:
+            entry = response_cache.put(key, version, serialize_json(await producer()))
+        except Exception as e:
+            # Supabase caído o lento: mejor la última respuesta conocida que un 503
+            entry = response_cache.get_stale(key) if find_upstream_error(e) else None
+            if entry is None:
+                raise
+            headers["Warning"] = '110 - "Response is Stale"'
+            metrics.increment("response_cache_stale_served_total")
+
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+    body, used = response_cache.body_for(entry, encoding)
+
+    if used is not None:
+        headers["Content-Encoding"] = used
+    return Response(content=body, media_type="application/json", headers=headers)
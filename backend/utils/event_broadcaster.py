@@ -0,0 +1,149 @@
+"""
+Difusión de eventos a suscriptores Server-Sent Events
+Un solo broadcaster por worker reparte cada evento a todos los suscriptores.
+Cada suscriptor tiene una cola acotada: si no la vacía a tiempo se lo desconecta
+(el navegador reconecta solo y recupera lo perdido desde el buffer circular)
+"""
+import asyncio
+import json
+import secrets
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Optional, Set, Tuple
+from backend.config import config
+from backend.utils.metrics import metrics
+
+# (id, tipo, datos serializados)
+Event = Tuple[str, str, str]
+
+RECONNECT_DELAY_MS = 3000
+
+class Subscriber:
+    """Cola de eventos pendientes de un cliente"""
+
+    def __init__(self, buffer_size: int):
+        self.queue: "asyncio.Queue[Optional[Event]]" = asyncio.Queue(maxsize=buffer_size)
+        self.closed = False
+
+class EventBroadcaster:
+    """Reparte eventos a los suscriptores y guarda los últimos para reconexiones"""
+
+    def __init__(self, history_size: int, buffer_size: int):
+        """
+        Args:
+            history_size: Eventos que se guardan para responder a Last-Event-ID
+            buffer_size: Eventos pendientes por suscriptor antes de desconectarlo
+        """
+        # Los IDs llevan un prefijo por proceso: un Last-Event-ID de otro worker
+        # o de antes de un reinicio no se confunde con uno propio
+        self._epoch = secrets.token_hex(4)
+        self._sequence = 0
+        self._history: Deque[Tuple[int, Event]] = deque(maxlen=history_size)
+        self._buffer_size = buffer_size
+        self._subscribers: Set[Subscriber] = set()
+
+    def publish(self, event: str, data: Any) -> str:
+        """
+        Publica un evento a todos los suscriptores
+
+        Args:
+            event: Tipo de evento (ej. "product.updated")
+            data: Datos serializables a JSON
+
+        Returns:
+            ID del evento
+        """
+        self._sequence += 1
+        event_id = f"{self._epoch}-{self._sequence}"
+        # Se serializa una vez para todos los suscriptores
+        record: Event = (event_id, event, json.dumps(data, default=str, separators=(",", ":")))
+        self._history.append((self._sequence, record))
+        metrics.increment("events_published_total", event=event)
+
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(record)
+            except asyncio.QueueFull:
+                self._disconnect(subscriber)
+                metrics.increment("events_slow_consumer_disconnects_total")
+        return event_id
+
+    def subscribe(self, last_event_id: Optional[str] = None) -> Subscriber:
+        """
+        Registra un suscriptor, con los eventos posteriores a last_event_id ya encolados
+
+        Si last_event_id ya no está en el buffer (o es de otro proceso) se encola un
+        evento "reset": el cliente debe recargar el estado completo.
+
+        Args:
+            last_event_id: Último ID que recibió el cliente (cabecera Last-Event-ID)
+
+        Returns:
+            Suscriptor
+        """
+        subscriber = Subscriber(self._buffer_size)
+        if last_event_id:
+            missed = self._replay(last_event_id)
+            if missed is None or len(missed) >= self._buffer_size:
+                subscriber.queue.put_nowait((f"{self._epoch}-{self._sequence}", "reset", "{}"))
+            else:
+                for record in missed:
+                    subscriber.queue.put_nowait(record)
+        self._subscribers.add(subscriber)
+        metrics.set_gauge("events_subscribers", len(self._subscribers))
+        return subscriber
+
+    def _replay(self, last_event_id: str) -> Optional[list]:
+        """Eventos posteriores a last_event_id, o None si no se pueden reconstruir"""
+        epoch, _, sequence = last_event_id.partition("-")
+        if epoch != self._epoch or not sequence.isdigit():
+            return None
+        last = int(sequence)
+        oldest = self._history[0][0] if self._history else self._sequence + 1
+        if last > self._sequence or last < oldest - 1:
+            return None
+        return [record for seq, record in self._history if seq > last]
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """Quita un suscriptor (al cerrarse la conexión)"""
+        self._subscribers.discard(subscriber)
+        metrics.set_gauge("events_subscribers", len(self._subscribers))
+
+    def _disconnect(self, subscriber: Subscriber):
+        subscriber.closed = True
+        self.unsubscribe(subscriber)
+        try:
+            subscriber.queue.put_nowait(None)  # Despierta al stream si está esperando
+        except asyncio.QueueFull:
+            pass
+
+    async def close(self):
+        """Cierra todas las conexiones (apagado del worker; async para correr en el event loop)"""
+        for subscriber in list(self._subscribers):
+            self._disconnect(subscriber)
+
+    async def stream(self, subscriber: Subscriber, heartbeat: float) -> AsyncIterator[str]:
+        """
+        Genera el cuerpo text/event-stream de un suscriptor
+
+        Args:
+            subscriber: Suscriptor devuelto por subscribe
+            heartbeat: Segundos sin eventos tras los que se envía un comentario
+                       (mantiene viva la conexión a través de proxies)
+        """
+        try:
+            yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+            while not subscriber.closed:
+                try:
+                    record = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if record is None or subscriber.closed:
+                    break
+                event_id, event, data = record
+                yield f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+# Instancia compartida por el worker
+event_broadcaster = EventBroadcaster(config.EVENTS_HISTORY_SIZE, config.EVENTS_SUBSCRIBER_BUFFER)
@@ -0,0 +1,375 @@
+"""
+Índice facetado en memoria del catálogo
+Cada producto activo ocupa una fila; marca, categoría, rango de precio y stock se
+guardan como bitsets (enteros de Python, un bit por fila), así que un filtro
+combinado es un AND de enteros y cada conteo de faceta un popcount
+"""
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+SORTS = ("newest", "price_asc", "price_desc", "name")
+DESCENDING_SORTS = ("newest", "price_desc")
+# Bandas finas de precio (por cuantiles) para filtrar rangos arbitrarios: solo las
+# filas de las dos bandas de los bordes se comparan una por una
+PRICE_BANDS = 64
+
+if hasattr(int, "bit_count"):
+    _popcount = int.bit_count
+else:  # Python < 3.10
+    def _popcount(value: int) -> int:
+        return bin(value).count("1")
+
+def _bits_from_rows(rows: Iterable[int], size: int) -> int:
+    """Construye un bitset de una vez (más barato que un |= por fila en catálogos grandes)"""
+    buf = bytearray((size + 7) // 8)
+    for row in rows:
+        buf[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(buf, "little")
+
+def _rows_from_bits(mask: int) -> List[int]:
+    """Filas encendidas en un bitset, en orden ascendente"""
+    bits = bin(mask)[:1:-1]
+    rows = []
+    row = bits.find("1")
+    while row != -1:
+        rows.append(row)
+        row = bits.find("1", row + 1)
+    return rows
+
+class FacetIndex:
+    """Representación columnar de los productos activos con bitsets por faceta"""
+
+    DIMENSIONS = ("brand", "category", "price")
+
+    def __init__(self, price_buckets: Sequence[float]):
+        """
+        Args:
+            price_buckets: Límites inferiores de los rangos de precio (el último es abierto)
+        """
+        self._bounds: List[float] = sorted(set(float(b) for b in price_buckets)) or [0.0]
+        self._reset()
+
+    def _reset(self, band_bounds: Sequence[float] = (0.0,)):
+        self._band_bounds: List[float] = list(band_bounds)
+        self._bands: Dict[int, int] = {}
+        self._row_band = array("i")
+        self._products: List[Optional[Dict[str, Any]]] = []
+        self._keys: List[Optional[Tuple[Any, Any, int]]] = []  # (marca, categoría, rango) por fila
+        self._price = array("d")
+        self._slots: Dict[str, int] = {}
+        self._skus: Dict[str, str] = {}  # SKU -> ID
+        self._free: List[int] = []
+        self._alive = 0
+        self._in_stock = 0
+        self._bitsets: Dict[str, Dict[Any, int]] = {dim: {} for dim in self.DIMENSIONS}
+        self._orders: Dict[str, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get(self, product_id: Any) -> Optional[Dict[str, Any]]:
+        """Producto indexado con ese ID, o None"""
+        row = self._slots.get(str(product_id))
+        return self._products[row] if row is not None else None
+
+    def get_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
+        """Producto indexado con ese SKU, o None"""
+        product_id = self._skus.get(sku)
+        return self.get(product_id) if product_id is not None else None
+
+    # ---------- Carga y escrituras ----------
+
+    def load(self, products: Iterable[Dict[str, Any]]):
+        """
+        Reemplaza el contenido del índice
+
+        Args:
+            products: Productos formateados (ProductService._format_product)
+        """
+        products = [p for p in products if p.get("is_active", True)]
+        prices = sorted(float(p.get("price") or 0) for p in products)
+        step = max(1, len(prices) // PRICE_BANDS)
+        self._reset(sorted(set(prices[::step])) or (0.0,))
+
+        rows: Dict[str, Dict[Any, List[int]]] = {dim: {} for dim in self.DIMENSIONS}
+        bands: Dict[int, List[int]] = {}
+        in_stock: List[int] = []
+        for row, product in enumerate(products):
+            keys = self._row_keys(product)
+            price = float(product.get("price") or 0)
+            band = self._band(price)
+            self._slots[str(product["id"])] = row
+            if product.get("Sku"):
+                self._skus[product["Sku"]] = str(product["id"])
+            self._products.append(product)
+            self._keys.append(keys)
+            self._price.append(price)
+            self._row_band.append(band)
+            bands.setdefault(band, []).append(row)
+            for dim, value in zip(self.DIMENSIONS, keys):
+                if value is not None:
+                    rows[dim].setdefault(value, []).append(row)
+            if self._stock(product) > 0:
+                in_stock.append(row)
+
+        size = len(self._products)
+        self._alive = (1 << size) - 1
+        self._in_stock = _bits_from_rows(in_stock, size)
+        self._bands = {band: _bits_from_rows(r, size) for band, r in bands.items()}
+        for dim in self.DIMENSIONS:
+            self._bitsets[dim] = {value: _bits_from_rows(r, size) for value, r in rows[dim].items()}
+
+    def upsert(self, product: Dict[str, Any]):
+        """
+        Agrega o actualiza un producto (si quedó inactivo, lo quita)
+
+        Args:
+            product: Producto formateado
+        """
+        if not product.get("is_active", True):
+            self.remove(product["id"])
+            return
+
+        product_id = str(product["id"])
+        row = self._slots.get(product_id)
+        if row is not None:
+            self._clear_row(row)
+            self._forget_sku(self._products[row])
+        elif self._free:
+            row = self._free.pop()
+        else:
+            row = len(self._products)
+            self._products.append(None)
+            self._keys.append(None)
+            self._price.append(0.0)
+            self._row_band.append(0)
+
+        keys = self._row_keys(product)
+        price = float(product.get("price") or 0)
+        band = self._band(price)
+        bit = 1 << row
+        self._slots[product_id] = row
+        if product.get("Sku"):
+            self._skus[product["Sku"]] = product_id
+        self._products[row] = product
+        self._keys[row] = keys
+        self._price[row] = price
+        self._row_band[row] = band
+        self._bands[band] = self._bands.get(band, 0) | bit
+        self._alive |= bit
+        if self._stock(product) > 0:
+            self._in_stock |= bit
+        for dim, value in zip(self.DIMENSIONS, keys):
+            if value is not None:
+                bitsets = self._bitsets[dim]
+                bitsets[value] = bitsets.get(value, 0) | bit
+        self._update_orders(row, insert=True)
+
+    def remove(self, product_id: Any):
+        """
+        Quita un producto del índice (no hace nada si no estaba)
+
+        Args:
+            product_id: ID del producto
+        """
+        row = self._slots.pop(str(product_id), None)
+        if row is None:
+            return
+        self._clear_row(row)
+        self._forget_sku(self._products[row])
+        self._products[row] = None
+        self._keys[row] = None
+        self._free.append(row)
+        self._update_orders(row, insert=False)
+
+    def _clear_row(self, row: int):
+        """Apaga el bit de la fila en todos los bitsets"""
+        keep = ~(1 << row)
+        self._alive &= keep
+        self._in_stock &= keep
+        band = self._row_band[row]
+        if band in self._bands:
+            self._bands[band] &= keep
+        for dim, value in zip(self.DIMENSIONS, self._keys[row] or ()):
+            bitsets = self._bitsets[dim]
+            if value in bitsets:
+                bitsets[value] &= keep
+                if not bitsets[value]:
+                    del bitsets[value]
+
+    def _forget_sku(self, product: Optional[Dict[str, Any]]):
+        """Quita el SKU de un producto del mapa (si sigue apuntando a él)"""
+        sku = product.get("Sku") if product else None
+        if sku and self._skus.get(sku) == str(product["id"]):
+            del self._skus[sku]
+
+    def _row_keys(self, product: Dict[str, Any]) -> Tuple[Any, Any, int]:
+        return (product.get("brand") or None, product.get("category_id"),
+                self._bucket(float(product.get("price") or 0)))
+
+    @staticmethod
+    def _stock(product: Dict[str, Any]) -> int:
+        available = product.get("available_stock")
+        return available if available is not None else product.get("current_stock", 0)
+
+    def _bucket(self, price: float) -> int:
+        return max(bisect_right(self._bounds, price) - 1, 0)
+
+    def _band(self, price: float) -> int:
+        return max(bisect_right(self._band_bounds, price) - 1, 0)
+
+    def _bucket_label(self, bucket: int) -> str:
+        low = self._bounds[bucket]
+        if bucket + 1 < len(self._bounds):
+            return f"{low:g}-{self._bounds[bucket + 1]:g}"
+        return f"{low:g}+"
+
+    # ---------- Consultas ----------
+
+    def _price_mask(self, min_price: Optional[float], max_price: Optional[float]) -> int:
+        """Bandas completas dentro del filtro por bitset; las de los bordes, fila por fila"""
+        low = float("-inf") if min_price is None else min_price
+        high = float("inf") if max_price is None else max_price
+        bounds = self._band_bounds
+        mask = 0
+        for band, bits in self._bands.items():
+            start = bounds[band] if band > 0 else float("-inf")
+            end = bounds[band + 1] if band + 1 < len(bounds) else float("inf")
+            if end <= low or start > high:
+                continue
+            if low <= start and end <= high:
+                mask |= bits
+            else:
+                rows = [r for r in _rows_from_bits(bits) if low <= self._price[r] <= high]
+                mask |= _bits_from_rows(rows, len(self._products))
+        return mask
+
+    def _any_of(self, dim: str, values: Optional[Sequence[Any]]) -> Optional[int]:
+        if not values:
+            return None
+        bitsets = self._bitsets[dim]
+        mask = 0
+        for value in values:
+            mask |= bitsets.get(value, 0)
+        return mask
+
+    def _order(self, sort: str) -> List[int]:
+        """Filas vivas ordenadas; se calcula en la primera consulta y se mantiene en cada escritura"""
+        order = self._orders.get(sort)
+        if order is None:
+            rows = list(self._slots.values())
+            order = sorted(rows, key=self._sort_key(sort), reverse=sort in DESCENDING_SORTS)
+            self._orders[sort] = order
+        return order
+
+    def _update_orders(self, row: int, insert: bool):
+        """Quita la fila de los órdenes calculados y, si sigue viva, la reinserta en su lugar"""
+        for sort, order in self._orders.items():
+            try:
+                order.remove(row)
+            except ValueError:
+                pass
+            if not insert:
+                continue
+            key = self._sort_key(sort)
+            value = key(row)
+            descending = sort in DESCENDING_SORTS
+            lo, hi = 0, len(order)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                other = key(order[mid])
+                if (value > other) if descending else (value < other):
+                    hi = mid
+                else:
+                    lo = mid + 1
+            order.insert(lo, row)
+
+    def _sort_key(self, sort: str):
+        products = self._products
+        if sort in ("price_asc", "price_desc"):
+            return self._price.__getitem__
+        if sort == "name":
+            return lambda row: (products[row].get("name") or "").lower()
+        return lambda row: (products[row].get("created_at") or "", products[row].get("id") or 0)
+
+    def query(self, brands: Optional[Sequence[str]] = None,
+              category_ids: Optional[Sequence[Any]] = None,
+              min_price: Optional[float] = None,
+              max_price: Optional[float] = None,
+              in_stock: Optional[bool] = None,
+              sort: str = "newest",
+              offset: int = 0,
+              limit: int = 24) -> Dict[str, Any]:
+        """
+        Filtra, cuenta facetas y pagina en una pasada
+
+        Los conteos de cada faceta aplican todos los filtros menos el de esa misma
+        faceta, para que el cliente pueda mostrar cuántos resultados daría elegir
+        otra marca, categoría o rango.
+
+        Args:
+            brands: Marcas aceptadas (cualquiera de ellas)
+            category_ids: Categorías aceptadas (cualquiera de ellas)
+            min_price: Precio mínimo
+            max_price: Precio máximo
+            in_stock: Si es True, solo productos con stock disponible
+            sort: newest, price_asc, price_desc o name
+            offset: Resultados a saltar
+            limit: Tamaño de página
+
+        Returns:
+            Diccionario con items, total y facets
+        """
+        if sort not in SORTS:
+            raise ValueError(f"Orden no soportado: {sort}")
+
+        filters: Dict[str, Optional[int]] = {
+            "brand": self._any_of("brand", brands),
+            "category": self._any_of("category", category_ids),
+            "price": self._price_mask(min_price, max_price) if min_price is not None or max_price is not None else None,
+            "in_stock": self._in_stock if in_stock else None,
+        }
+
+        def combined(skip: Optional[str] = None) -> int:
+            mask = self._alive
+            for dim, bits in filters.items():
+                if dim != skip and bits is not None:
+                    mask &= bits
+            return mask
+
+        facets: Dict[str, Any] = {}
+        for dim in self.DIMENSIONS:
+            base = combined(skip=dim)
+            counts = {}
+            for value, bits in self._bitsets[dim].items():
+                count = _popcount(base & bits)
+                if count:
+                    counts[self._bucket_label(value) if dim == "price" else value] = count
+            facets[dim] = counts
+        facets["in_stock"] = _popcount(combined(skip="in_stock") & self._in_stock)
+
+        mask = combined()
+        total = _popcount(mask)
+        wanted = offset + limit
+        if total * 8 < len(self._products):
+            # Pocos resultados: ordenar solo esas filas
+            rows = sorted(_rows_from_bits(mask), key=self._sort_key(sort),
+                          reverse=sort in DESCENDING_SORTS)[offset:wanted]
+        else:
+            # Muchos resultados: recorrer el orden precalculado hasta llenar la página
+            bits = bin(mask)[:1:-1]
+            width = len(bits)
+            rows = []
+            for row in self._order(sort):
+                if row < width and bits[row] == "1":
+                    rows.append(row)
+                    if len(rows) >= wanted:
+                        break
+            rows = rows[offset:]
+
+        return {
+            "items": [self._products[row] for row in rows],
+            "total": total,
+            "facets": facets,
+        }
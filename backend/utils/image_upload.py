@@ -0,0 +1,69 @@
+"""
+Lectura de imágenes subidas
+El archivo se lee por bloques calculando su SHA-256 sobre la marcha (la ruta en
+Storage es el hash del contenido) y el tipo real se detecta por los primeros bytes,
+no por la extensión ni por el Content-Type que manda el navegador
+"""
+import hashlib
+from typing import Optional, Tuple
+from fastapi import UploadFile
+
+CHUNK_SIZE = 64 * 1024
+
+# (prefijo, desplazamiento, tipo MIME, extensión)
+_SIGNATURES = (
+    (b"\xff\xd8\xff", 0, "image/jpeg", "jpg"),
+    (b"\x89PNG\r\n\x1a\n", 0, "image/png", "png"),
+    (b"GIF87a", 0, "image/gif", "gif"),
+    (b"GIF89a", 0, "image/gif", "gif"),
+    (b"WEBP", 8, "image/webp", "webp"),
+    (b"ftypavif", 4, "image/avif", "avif"),
+)
+
+class UploadTooLargeError(Exception):
+    """El archivo supera el tamaño máximo permitido"""
+
+def detect_image_type(header: bytes) -> Optional[Tuple[str, str]]:
+    """
+    Detecta el formato de una imagen por su firma (magic bytes)
+
+    Args:
+        header: Primeros bytes del archivo (con 16 alcanza)
+
+    Returns:
+        (tipo MIME, extensión), o None si no es un formato de imagen aceptado
+    """
+    for signature, offset, mime_type, extension in _SIGNATURES:
+        if header[offset:offset + len(signature)] == signature:
+            if mime_type == "image/webp" and not header.startswith(b"RIFF"):
+                continue
+            return mime_type, extension
+    return None
+
+async def read_upload(file: UploadFile, max_bytes: int) -> Tuple[bytes, str]:
+    """
+    Lee un archivo subido por bloques calculando su SHA-256
+
+    Args:
+        file: Archivo de la petición
+        max_bytes: Tamaño máximo aceptado
+
+    Returns:
+        (contenido, hash SHA-256 en hexadecimal)
+
+    Raises:
+        UploadTooLargeError: Si el archivo supera max_bytes
+    """
+    digest = hashlib.sha256()
+    chunks = []
+    size = 0
+    while True:
+        chunk = await file.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise UploadTooLargeError(f"La imagen supera el máximo de {max_bytes // (1024 * 1024)} MB")
+        digest.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), digest.hexdigest()
@@ -2,11 +2,21 @@
 Utilidades para manejo de JWT
 Generación y verificación de tokens JWT
 """
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 from jose import JWTError, jwt
 from backend.config import config
 
+# Caché de payloads ya verificados: digest del token -> (payload, exp en epoch)
+# El mismo token llega decenas de veces por minuto desde el dashboard; verificar
+# la firma HS256 y parsear los claims solo hace falta la primera vez
+_verified_tokens: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+_verified_lock = threading.Lock()
+
 def create_access_token(data: Dict[str, Any]) -> str:
     """
     Crea un token JWT
@@ -16,12 +26,41 @@ def create_access_token(data: Dict[str, Any]) -> str:
         Token JWT codificado
     """
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(hours=config.JWT_EXPIRATION_HOURS)
+    expire = datetime.utcnow() + timedelta(minutes=config.JWT_EXPIRATION_MINUTES)
     to_encode.update({"exp": expire})
     
     encoded_jwt = jwt.encode(to_encode, config.JWT_SECRET, algorithm=config.JWT_ALGORITHM)
     return encoded_jwt
 
+def create_stream_ticket(user_id: str) -> str:
+    """
+    Crea un ticket para abrir el stream de eventos
+    EventSource no envía cabeceras y el ticket va en la URL (queda en los logs de
+    acceso): dura segundos y solo sirve para ese endpoint, no como access token
+    
+    Args:
+        user_id: ID del usuario autenticado
+    Returns:
+        Ticket JWT
+    """
+    expire = datetime.utcnow() + timedelta(seconds=config.EVENTS_TICKET_SECONDS)
+    payload = {"sub": user_id, "purpose": "events", "exp": expire}
+    return jwt.encode(payload, config.JWT_SECRET, algorithm=config.JWT_ALGORITHM)
+
+def verify_stream_ticket(ticket: str) -> Optional[str]:
+    """
+    Verifica un ticket de create_stream_ticket
+    
+    Args:
+        ticket: Ticket recibido en ?ticket=
+    Returns:
+        ID del usuario o None si es inválido, venció o no es un ticket
+    """
+    payload = verify_token(ticket)
+    if payload is None or payload.get("purpose") != "events":
+        return None
+    return payload.get("sub")
+
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Verifica y decodifica un token JWT.
@@ -32,11 +71,35 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
     Returns:
         Payload del token o None si es inválido
     """
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    now = time.time()
+    
+    with _verified_lock:
+        cached = _verified_tokens.get(digest)
+        if cached is not None:
+            payload, exp = cached
+            if exp > now:
+                _verified_tokens.move_to_end(digest)
+                return dict(payload)
+            del _verified_tokens[digest]
+    
     try:
         payload = jwt.decode(token, config.JWT_SECRET, algorithms=[config.JWT_ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    exp = payload.get("exp")
+    if config.JWT_CACHE_MAX_SIZE > 0 and isinstance(exp, (int, float)):
+        with _verified_lock:
+            _verified_tokens[digest] = (dict(payload), float(exp))
+            while len(_verified_tokens) > config.JWT_CACHE_MAX_SIZE:
+                _verified_tokens.popitem(last=False)
+    return payload
+
+def clear_token_cache():
+    """Vacía la caché de tokens verificados"""
+    with _verified_lock:
+        _verified_tokens.clear()
 
 def decode_token(token: str) -> Optional[Dict[str, Any]]:
     """
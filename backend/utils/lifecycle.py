@@ -0,0 +1,122 @@
+"""
+Ciclo de vida de la aplicación
+Registra los hooks de arranque/apagado y las tareas en segundo plano de cada worker
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Tuple, Union
+from backend.utils.startup_profiler import startup_profiler
+
+logger = logging.getLogger(__name__)
+
+Hook = Callable[[], Union[None, Awaitable[None]]]
+
+class LifecycleManager:
+    """Coordina recursos que viven mientras el worker está activo"""
+
+    def __init__(self):
+        self._startup_hooks: List[Tuple[str, Hook, bool]] = []
+        self._shutdown_hooks: List[Tuple[str, Hook]] = []
+        self._periodic: List[Tuple[str, float, Hook]] = []
+        self._tasks: List[asyncio.Task] = []
+        self.started = False
+
+    def on_startup(self, name: str, hook: Hook, background: bool = False):
+        """
+        Registra un hook que se ejecuta al iniciar el worker (crear clientes, calentar cachés)
+
+        Args:
+            name: Nombre del hook (para logs y el perfilador de arranque)
+            hook: Función (sync o async) a ejecutar; las sync corren en el pool de hilos
+            background: Si es True, se ejecuta después de que el worker empiece a aceptar
+                peticiones, para no retrasar el arranque en frío
+        """
+        self._startup_hooks.append((name, hook, background))
+
+    def on_shutdown(self, name: str, hook: Hook):
+        """
+        Registra un hook que se ejecuta al apagar el worker (vaciar buffers, cerrar clientes)
+        Lo que toque objetos del event loop (colas de asyncio) debe ser async
+        """
+        self._shutdown_hooks.append((name, hook))
+
+    def add_periodic_task(self, name: str, interval: float, hook: Hook):
+        """
+        Registra una tarea que se ejecuta cada `interval` segundos mientras el worker vive
+
+        Args:
+            name: Nombre de la tarea (para logs)
+            interval: Intervalo en segundos entre ejecuciones
+            hook: Función (sync o async) a ejecutar; las sync corren en el pool de hilos
+        """
+        self._periodic.append((name, interval, hook))
+        if self.started:
+            self._tasks.append(asyncio.create_task(self._run_periodic(name, interval, hook)))
+
+    async def startup(self):
+        """Ejecuta los hooks de arranque y lanza las tareas periódicas"""
+        for name, hook, background in self._startup_hooks:
+            if background:
+                self._tasks.append(asyncio.create_task(self._run_startup_hook(name, hook)))
+            else:
+                await self._run_startup_hook(name, hook)
+
+        for name, interval, hook in self._periodic:
+            self._tasks.append(asyncio.create_task(self._run_periodic(name, interval, hook)))
+        self.started = True
+
+    async def shutdown(self, timeout: float = 10.0):
+        """
+        Detiene las tareas en segundo plano y ejecuta los hooks de apagado
+
+        Args:
+            timeout: Tiempo máximo para que cada hook de apagado termine
+        """
+        self.started = False
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Orden inverso: lo último en crearse es lo primero en cerrarse
+        for name, hook in reversed(self._shutdown_hooks):
+            try:
+                await asyncio.wait_for(_call(hook), timeout=timeout)
+            except Exception as e:
+                logger.warning(f"Hook de apagado '{name}' falló: {str(e)}")
+
+    async def _run_startup_hook(self, name: str, hook: Hook):
+        """Ejecuta un hook de arranque midiendo su duración"""
+        try:
+            with startup_profiler.track(name):
+                await _call(hook)
+        except Exception as e:
+            # Un cache que no se pudo calentar no debe impedir servir peticiones
+            logger.warning(f"Hook de arranque '{name}' falló: {str(e)}")
+
+    async def _run_periodic(self, name: str, interval: float, hook: Hook):
+        """Bucle de una tarea periódica; los errores se registran sin detener el bucle"""
+        while True:
+            try:
+                await _call(hook)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Tarea periódica '{name}' falló: {str(e)}")
+            await asyncio.sleep(interval)
+
+async def _call(hook: Hook):
+    """
+    Ejecuta un hook async en el event loop y uno sync en el pool de hilos
+    Un hook sync puede bloquear (importar supabase tarda ~0.4 s) y el worker ya
+    está atendiendo peticiones mientras corren los hooks en segundo plano
+    """
+    if asyncio.iscoroutinefunction(hook):
+        await hook()
+        return
+    result = await asyncio.get_running_loop().run_in_executor(None, hook)
+    if asyncio.iscoroutine(result):
+        await result
+
+lifecycle = LifecycleManager()
@@ -0,0 +1,120 @@
+"""
+Logging estructurado sin bloquear el event loop
+En la ruta de la petición solo se encola el registro (QueueHandler); un hilo en
+segundo plano (QueueListener) lo serializa a JSON y lo escribe en stdout
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from backend.utils.metrics import metrics
+
+# ID de la petición en curso (lo fija RequestIdMiddleware)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Atributos estándar de LogRecord; el resto viene de extra={...} y va al JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por registro"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class SamplingFilter(logging.Filter):
+    """
+    Deja pasar solo una fracción de los registros de loggers de alto volumen
+    Los WARNING o superiores nunca se descartan
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(record.name)
+        if rate is None or rate >= 1 or random.random() < rate:
+            return True
+        metrics.increment("log_records_sampled_out_total", logger=record.name)
+        return False
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que nunca espera: si la cola está llena el registro se descarta
+    (y se cuenta) en lugar de frenar la petición
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Solo lo barato en el hilo de la petición: fijar el mensaje y el request_id.
+        # El formateo (JSON, traceback) lo hace el hilo del listener
+        record.msg = record.getMessage()
+        record.args = None
+        record.request_id = request_id_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment("log_records_dropped_total")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging(level: str = "INFO", json_format: bool = True, queue_size: int = 10000,
+                  sample_rates: Optional[Dict[str, float]] = None):
+    """
+    Configura el logger raíz del worker (idempotente)
+
+    Args:
+        level: Nivel mínimo (DEBUG, INFO, WARNING...)
+        json_format: JSON por línea; si es False, texto legible (desarrollo)
+        queue_size: Registros pendientes antes de empezar a descartar
+        sample_rates: Fracción de registros INFO/DEBUG a conservar por logger
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if json_format:
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(SamplingFilter(sample_rates or {}))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=False)
+    _listener.start()
+
+def shutdown_logging():
+    """Escribe los registros pendientes y detiene el hilo de escritura"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
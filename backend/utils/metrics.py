@@ -0,0 +1,56 @@
+"""
+Métricas internas del proceso
+Contadores y gauges simples expuestos en /metrics (por worker)
+"""
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+class Metrics:
+    """Registro de contadores y gauges con etiquetas"""
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[LabelKey, float]] = defaultdict(lambda: defaultdict(float))
+        self._gauges: Dict[str, Dict[LabelKey, Any]] = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> LabelKey:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def increment(self, name: str, value: float = 1, **labels: Any):
+        """
+        Incrementa un contador
+
+        Args:
+            name: Nombre de la métrica
+            value: Cantidad a sumar
+            **labels: Etiquetas (ruta, dependencia, etc.)
+        """
+        with self._lock:
+            self._counters[name][self._key(labels)] += value
+
+    def set_gauge(self, name: str, value: Any, **labels: Any):
+        """Fija el valor actual de un gauge"""
+        with self._lock:
+            self._gauges[name][self._key(labels)] = value
+
+    def get(self, name: str, **labels: Any) -> float:
+        """Valor actual de un contador (0 si no existe)"""
+        with self._lock:
+            return self._counters.get(name, {}).get(self._key(labels), 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copia de todas las métricas en formato JSON"""
+        def render(series: Dict[LabelKey, Any]):
+            return [{"labels": dict(key), "value": value} for key, value in series.items()]
+
+        with self._lock:
+            return {
+                "counters": {name: render(series) for name, series in self._counters.items()},
+                "gauges": {name: render(series) for name, series in self._gauges.items()},
+            }
+
+metrics = Metrics()
@@ -0,0 +1,80 @@
+"""
+Coalescencia de consultas idénticas concurrentes (single-flight)
+Si llega una consulta igual a otra que aún está en vuelo, espera su resultado
+en lugar de lanzar otra llamada a Supabase
+"""
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from backend.utils.metrics import metrics
+
+class SingleFlight:
+    """Grupo de llamadas en vuelo indexadas por clave"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta `fn` una sola vez por clave mientras esté en vuelo
+
+        Args:
+            key: Clave normalizada de la consulta
+            fn: Corutina que hace la llamada real
+
+        Returns:
+            Resultado compartido por todos los llamadores concurrentes
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            metrics.increment("singleflight_calls_total", group=self.name)
+        else:
+            metrics.increment("singleflight_coalesced_total", group=self.name)
+
+        # shield: si el llamador que inició la consulta se cancela, los demás siguen esperando
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, done: "asyncio.Future[Any]"):
+        if self._inflight.get(key) is done:
+            del self._inflight[key]
+
+def _freeze(value: Any) -> Hashable:
+    """Convierte argumentos (listas, dicts) en una forma hashable y estable"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        items = [_freeze(v) for v in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, set) else tuple(items)
+    return value
+
+def single_flight(name: str):
+    """
+    Decorador para métodos async de solo lectura
+
+    La clave es (nombre, argumentos normalizados): llamadas posicionales o por nombre
+    y valores por defecto explícitos u omitidos coalescen entre sí.
+    El resultado se comparte entre llamadores, por lo que no debe mutarse.
+
+    Args:
+        name: Nombre del grupo (aparece en las métricas)
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        group = SingleFlight(name)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple((arg, _freeze(value)) for arg, value in bound.arguments.items() if arg != "self")
+            return await group.do(key, lambda: func(*args, **kwargs))
+
+        wrapper.single_flight_group = group  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
@@ -0,0 +1,133 @@
+"""
+Perfilador de arranque
+Mide el tiempo de importación por módulo y el de cada paso de inicialización
+Se activa con la variable de entorno STARTUP_PROFILE=true
+"""
+import logging
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class _TimingFinder:
+    """Finder de sys.meta_path que envuelve exec_module de cada loader para medirlo"""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        self.profiler = profiler
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            loader = spec.loader
+            # Solo instancias: los loaders que son clases (builtins, frozen) son compartidos
+            if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+                self.profiler._wrap_loader(fullname, loader)
+            return spec
+        return None
+
+class StartupProfiler:
+    """Acumula tiempos de importación e inicialización del proceso"""
+
+    def __init__(self):
+        self.enabled = False
+        self.process_start = time.perf_counter()
+        self.imports: Dict[str, Dict[str, float]] = {}
+        self.steps: Dict[str, float] = {}
+        self._stack: List[List[float]] = []
+        self._finder: Optional[_TimingFinder] = None
+
+    def install(self):
+        """Empieza a medir las importaciones que ocurran desde ahora"""
+        if self._finder is not None:
+            return
+        self.enabled = True
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)  # type: ignore[arg-type]
+
+    def uninstall(self):
+        """Deja de medir importaciones (los pasos ya medidos se conservan)"""
+        if self._finder is not None and self._finder in sys.meta_path:
+            sys.meta_path.remove(self._finder)  # type: ignore[arg-type]
+        self._finder = None
+
+    def _wrap_loader(self, name: str, loader):
+        """Reemplaza exec_module en la instancia del loader por una versión medida"""
+        original = loader.exec_module
+        if getattr(original, "_startup_profiled", False):
+            return
+
+        def exec_module(module):
+            # Cada nivel acumula el tiempo de sus hijos para calcular el tiempo propio
+            self._stack.append([0.0])
+            start = time.perf_counter()
+            try:
+                original(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = self._stack.pop()[0]
+                if self._stack:
+                    self._stack[-1][0] += elapsed
+                self.imports[name] = {
+                    "cumulative_ms": elapsed * 1000,
+                    "self_ms": (elapsed - children) * 1000,
+                }
+
+        exec_module._startup_profiled = True  # type: ignore[attr-defined]
+        loader.exec_module = exec_module
+
+    @contextmanager
+    def track(self, step: str):
+        """
+        Mide un paso de inicialización (crear clientes, calentar cachés, etc.)
+
+        Args:
+            step: Nombre del paso
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[step] = self.steps.get(step, 0.0) + (time.perf_counter() - start) * 1000
+
+    def report(self, top: int = 25) -> Dict[str, object]:
+        """
+        Resumen de los tiempos de arranque
+
+        Args:
+            top: Cantidad de módulos más lentos a incluir
+
+        Returns:
+            Diccionario con tiempo total, módulos más lentos (tiempo propio) y pasos
+        """
+        slowest = sorted(self.imports.items(), key=lambda item: item[1]["self_ms"], reverse=True)[:top]
+        return {
+            "since_process_start_ms": round((time.perf_counter() - self.process_start) * 1000, 1),
+            "modules_imported": len(self.imports),
+            "slowest_imports": [
+                {"module": name, "self_ms": round(t["self_ms"], 2), "cumulative_ms": round(t["cumulative_ms"], 2)}
+                for name, t in slowest
+            ],
+            "init_steps_ms": {name: round(ms, 2) for name, ms in self.steps.items()},
+        }
+
+    def log_report(self):
+        """Escribe el resumen en el log si el perfilador está activo"""
+        if not self.enabled:
+            return
+        report = self.report()
+        logger.info(f"Arranque: {report['since_process_start_ms']} ms, {report['modules_imported']} módulos importados")
+        for item in report["slowest_imports"]:  # type: ignore[union-attr]
+            logger.info(f"  import {item['module']}: {item['self_ms']} ms (acumulado {item['cumulative_ms']} ms)")
+        for step, ms in report["init_steps_ms"].items():  # type: ignore[union-attr]
+            logger.info(f"  init {step}: {ms} ms")
+
+startup_profiler = StartupProfiler()
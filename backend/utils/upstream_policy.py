@@ -0,0 +1,165 @@
+"""
+Reintentos y hedging para lecturas idempotentes a Supabase
+Un select lento o caído se reintenta con backoff exponencial y jitter; si tarda más
+que el p95 de su operación se lanza una segunda petición idéntica y gana la primera
+que responda. Reintentos y hedges salen de un presupuesto global para no multiplicar
+la carga durante una caída
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+from backend.config import config
+from backend.utils.circuit_breaker import UpstreamUnavailableError
+from backend.utils.metrics import metrics
+
+# Latencias recientes que se guardan por operación para estimar el p95
+LATENCY_WINDOW = 200
+
+class RetryBudget:
+    """
+    Presupuesto de peticiones extra (reintentos y hedges) en una ventana deslizante
+    Se permiten ratio * peticiones + min_per_second * ventana peticiones extra
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, window: float):
+        """
+        Args:
+            ratio: Peticiones extra permitidas por cada petición original
+            min_per_second: Reserva mínima (con poco tráfico el ratio daría cero)
+            window: Segundos de la ventana
+        """
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._requests: Deque[float] = deque()
+        self._extras: Deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        cutoff = now - self.window
+        for timestamps in (self._requests, self._extras):
+            while timestamps and timestamps[0] < cutoff:
+                timestamps.popleft()
+
+    def record_request(self):
+        """Cuenta una petición original"""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        """Reserva una petición extra; False si el presupuesto está agotado"""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            allowed = self.ratio * len(self._requests) + self.min_per_second * self.window
+            if len(self._extras) >= allowed:
+                return False
+            self._extras.append(now)
+            return True
+
+class UpstreamPolicy:
+    """Aplica reintentos y hedging a las llamadas de una operación idempotente"""
+
+    def __init__(self):
+        self.budget = RetryBudget(
+            ratio=config.UPSTREAM_RETRY_BUDGET_RATIO,
+            min_per_second=config.UPSTREAM_RETRY_BUDGET_MIN_PER_SECOND,
+            window=config.UPSTREAM_RETRY_BUDGET_WINDOW
+        )
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def record_latency(self, operation: str, seconds: float):
+        """Registra la duración de una llamada exitosa"""
+        samples = self._latencies.get(operation)
+        if samples is None:
+            samples = self._latencies.setdefault(operation, deque(maxlen=LATENCY_WINDOW))
+        samples.append(seconds)
+
+    def hedge_delay(self, operation: str) -> Optional[float]:
+        """
+        Espera antes de lanzar el hedge: el p95 reciente de la operación
+        None si el hedging está desactivado o aún no hay muestras suficientes
+        """
+        if not config.UPSTREAM_HEDGE_ENABLED:
+            return None
+        samples = self._latencies.get(operation)
+        if samples is None or len(samples) < config.UPSTREAM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return max(p95, config.UPSTREAM_HEDGE_MIN_DELAY)
+
+    async def run(self, operation: str, attempt: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta attempt con reintentos y hedging
+
+        Args:
+            operation: Nombre de la operación ("products.select")
+            attempt: Lanza una llamada (con su plazo y circuit breaker)
+
+        Returns:
+            Resultado del primer intento exitoso
+
+        Raises:
+            UpstreamUnavailableError: Si fallan todos los intentos o el circuito está abierto
+        """
+        self.budget.record_request()
+        retries = 0
+        while True:
+            try:
+                return await self._hedged(operation, attempt)
+            except UpstreamUnavailableError as e:
+                if not e.retryable or retries >= config.UPSTREAM_RETRY_ATTEMPTS:
+                    raise
+                if not self.budget.try_spend():
+                    metrics.increment("upstream_retry_budget_exhausted_total", operation=operation)
+                    raise
+            retries += 1
+            metrics.increment("upstream_retries_total", operation=operation)
+            # Full jitter: los workers no reintentan todos a la vez
+            backoff = min(config.UPSTREAM_RETRY_BACKOFF_MAX, config.UPSTREAM_RETRY_BACKOFF * 2 ** (retries - 1))
+            await asyncio.sleep(random.uniform(0, backoff))
+
+    async def _hedged(self, operation: str, attempt: Callable[[], Awaitable[Any]]) -> Any:
+        """Un intento; si supera el p95 se lanza un segundo y gana el primero que responda"""
+        delay = self.hedge_delay(operation)
+        if delay is None:
+            return await attempt()
+
+        primary = asyncio.ensure_future(attempt())
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+            if not self.budget.try_spend():
+                metrics.increment("upstream_retry_budget_exhausted_total", operation=operation)
+                return await primary
+
+            metrics.increment("upstream_hedges_fired_total", operation=operation)
+            hedge = asyncio.ensure_future(attempt())
+            pending.add(hedge)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            metrics.increment("upstream_hedges_won_total", operation=operation)
+                        return task.result()
+                    # Se prefiere el error del primario (el del hedge suele ser el mismo)
+                    if error is None or task is primary:
+                        error = task.exception()
+            raise error
+        finally:
+            # La petición perdedora se cancela (su hilo termina solo por el timeout HTTP)
+            for task in pending:
+                task.cancel()
+
+# Instancia compartida por el worker
+upstream_policy = UpstreamPolicy()
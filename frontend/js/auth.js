@@ -20,6 +20,61 @@ function getUserRole(user) {
     return role ? parseInt(role) : 4;
 }
 
+// --- RENOVACIÓN DE SESIÓN ---
+// El access token dura pocos minutos: si una petición a la API responde 401 se canjea
+// el refresh token una sola vez (aunque fallen varias peticiones a la vez) y se reintenta
+let refreshInFlight = null;
+
+function refreshSession(expiredToken) {
+    // Otra pestaña ya renovó: usar su token en vez de reenviar un refresh token usado
+    const current = localStorage.getItem('access_token');
+    if (current && current !== expiredToken) {
+        return Promise.resolve(current);
+    }
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (!refreshToken) {
+        return Promise.resolve(null);
+    }
+    if (!refreshInFlight) {
+        refreshInFlight = originalFetch(`${window.APP_CONFIG.API_BASE_URL}/auth/refresh`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ refresh_token: refreshToken }),
+        })
+            .then(async (response) => {
+                if (!response.ok) return null;
+                const data = await response.json();
+                localStorage.setItem('access_token', data.access_token);
+                localStorage.setItem('refresh_token', data.refresh_token);
+                return data.access_token;
+            })
+            .catch(() => null)
+            .finally(() => { refreshInFlight = null; });
+    }
+    return refreshInFlight;
+}
+
+const originalFetch = window.fetch.bind(window);
+
+window.fetch = async (input, init = {}) => {
+    const response = await originalFetch(input, init);
+    const url = typeof input === 'string' ? input : input.url;
+    const headers = new Headers(init.headers || {});
+    const auth = headers.get('Authorization');
+
+    if (response.status !== 401 || !auth || !url.startsWith(window.APP_CONFIG.API_BASE_URL)
+        || url.includes('/auth/refresh')) {
+        return response;
+    }
+
+    const newToken = await refreshSession(auth.replace('Bearer ', ''));
+    if (!newToken) {
+        return response;
+    }
+    headers.set('Authorization', `Bearer ${newToken}`);
+    return originalFetch(input, { ...init, headers });
+};
+
 document.addEventListener('DOMContentLoaded', () => {
     const token = localStorage.getItem('access_token');
     const userStr = localStorage.getItem('user');
@@ -90,6 +145,7 @@ async function login(email, password) {
 
         // Guardar en localStorage
         localStorage.setItem('access_token', data.access_token);
+        localStorage.setItem('refresh_token', data.refresh_token);
         localStorage.setItem('user', JSON.stringify(userToSave)); // Guardamos el corregido
         localStorage.setItem('user_data', JSON.stringify(userToSave));
 
@@ -132,11 +188,14 @@ async function logout() {
         const token = localStorage.getItem('access_token');
         
         if (token) {
+            // Se envía el refresh token para revocarlo en el servidor
             await fetch(`${window.APP_CONFIG.API_BASE_URL}/auth/logout`, {
                 method: 'POST',
                 headers: {
                     'Authorization': `Bearer ${token}`,
+                    'Content-Type': 'application/json',
                 },
+                body: JSON.stringify({ refresh_token: localStorage.getItem('refresh_token') }),
             });
         }
     } catch (error) {
@@ -144,6 +203,7 @@ async function logout() {
     } finally {
         // Limpiar localStorage siempre, falle o no el fetch
         localStorage.removeItem('access_token');
+        localStorage.removeItem('refresh_token');
         localStorage.removeItem('user');
         localStorage.removeItem('user_data');
         window.location.href = 'tienda.html';
@@ -35,8 +35,49 @@ document.addEventListener('DOMContentLoaded', () => {
     
     // Escuchar cambios en el carrito (evento disparado por carrito.js)
     window.addEventListener('cartUpdated', renderCart);
+
+    refreshCartProducts();
 });
 
+/**
+ * Actualizar precio y stock de los items guardados con una sola petición a /productos/lote
+ * Los productos que ya no existen o se desactivaron quedan con stock 0
+ */
+async function refreshCartProducts() {
+    const cart = getCart();
+    if (cart.length === 0 || !window.APP_CONFIG) return;
+
+    try {
+        const response = await fetch(
+            `${window.APP_CONFIG.API_BASE_URL}/productos/lote?fields=name,price,current_stock,image_url`,
+            {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ ids: cart.map(item => Number(item.id)) })
+            }
+        );
+        if (!response.ok) return;
+
+        const data = await response.json();
+        const byId = new Map(data.items.map(result => [String(result.key), result]));
+        cart.forEach(item => {
+            const result = byId.get(String(item.id));
+            if (!result) return;
+            if (!result.found) {
+                item.current_stock = 0;
+                return;
+            }
+            item.name = result.product.name;
+            item.price = Number(result.product.price);
+            item.current_stock = Number(result.product.current_stock || 0);
+            item.image_url = result.product.image_url || null;
+        });
+        saveCart(cart); // Dispara cartUpdated y vuelve a renderizar
+    } catch (error) {
+        console.warn('No se pudo actualizar el carrito:', error);
+    }
+}
+
 /**
  * Renderizar el carrito en la página
  */
@@ -211,19 +252,58 @@ async function proceedToCheckout() {
         return;
     }
 
-    // AQUI IRA TU LÓGICA FUTURA DE PAGO
-    // Por ahora mostramos feedback visual
     const btn = document.querySelector('button[onclick="proceedToCheckout()"]');
     const originalText = btn.innerHTML;
     
     btn.disabled = true;
     btn.innerHTML = '<i class="fas fa-spinner fa-spin mr-2"></i> Procesando...';
     
-    setTimeout(() => {
-        alert('¡Sistema de Checkout en construcción!\n\nPronto podrás procesar tus pagos aquí.');
+    try {
+        const response = await fetch(`${window.APP_CONFIG.API_BASE_URL}/ventas/checkout`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${token}`
+            },
+            body: JSON.stringify({
+                lines: cart.map(item => ({
+                    product_id: item.id,
+                    quantity: Number(item.quantity),
+                    price: Number(item.price)
+                }))
+            })
+        });
+        const data = await response.json();
+
+        if (response.ok) {
+            clearCart();
+            renderCart();
+            alert(`¡Compra registrada! Total: $${Number(data.total).toFixed(2)}`);
+        } else if (response.status === 409 && data.detail && data.detail.lines) {
+            // Mostrar qué líneas impidieron la venta
+            const problems = data.detail.lines
+                .filter(line => line.status !== 'ok')
+                .map(line => {
+                    const item = cart.find(i => String(i.id) === String(line.product_id));
+                    const name = item ? item.name : line.product_id;
+                    if (line.status === 'insufficient_stock') return `${name}: solo quedan ${line.available}`;
+                    if (line.status === 'price_changed') return `${name}: el precio cambió a $${line.unit_price}`;
+                    return `${name}: no disponible`;
+                });
+            alert(`No se pudo completar la compra:\n\n${problems.join('\n')}`);
+        } else if (response.status === 401) {
+            alert("Tu sesión ha expirado. Por favor inicia sesión nuevamente.");
+            window.location.href = 'login.html';
+        } else {
+            alert(`Error al procesar la compra: ${data.detail || response.statusText}`);
+        }
+    } catch (error) {
+        console.error('Error en checkout:', error);
+        alert('Error de conexión al procesar la compra.');
+    } finally {
         btn.disabled = false;
         btn.innerHTML = originalText;
-    }, 1000);
+    }
 }
 
 /**
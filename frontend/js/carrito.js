@@ -14,6 +14,34 @@ function saveCart(cart) {
     window.dispatchEvent(new CustomEvent('cartUpdated', { detail: cart }));
 }
 
+/**
+ * Reserva en el backend la cantidad del producto que hay en el carrito (best-effort).
+ * Solo con sesión iniciada; si falla, el checkout vuelve a validar el stock.
+ */
+function syncReservation(productId, quantity) {
+    const token = localStorage.getItem('access_token');
+    if (!token || !window.APP_CONFIG) return;
+
+    fetch(`${window.APP_CONFIG.API_BASE_URL}/reservas/retener`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Authorization': `Bearer ${token}`
+        },
+        body: JSON.stringify({ product_id: productId, quantity: Number(quantity) })
+    }).catch(error => console.warn('No se pudo reservar stock:', error));
+}
+
+function releaseAllReservations() {
+    const token = localStorage.getItem('access_token');
+    if (!token || !window.APP_CONFIG) return;
+
+    fetch(`${window.APP_CONFIG.API_BASE_URL}/reservas/liberar`, {
+        method: 'DELETE',
+        headers: { 'Authorization': `Bearer ${token}` }
+    }).catch(error => console.warn('No se pudieron liberar las reservas:', error));
+}
+
 function addToCart(product, quantity = 1) {
     if (!product || !product.id) {
         console.error('Producto inválido');
@@ -39,6 +67,7 @@ function addToCart(product, quantity = 1) {
         }
 
         existingItem.quantity = newQuantity;
+        syncReservation(product.id, newQuantity);
     } else {
         cart.push({
             id: product.id,
@@ -48,6 +77,7 @@ function addToCart(product, quantity = 1) {
             current_stock: Number(product.current_stock || 0),
             image_url: product.image_url || null
         });
+        syncReservation(product.id, quantity);
     }
     
     saveCart(cart);
@@ -59,6 +89,7 @@ function removeFromCart(productId) {
     let cart = getCart();
     cart = cart.filter(item => String(item.id) !== String(productId));
     saveCart(cart);
+    syncReservation(productId, 0);
 }
 
 function updateCartItemQuantity(productId, newQuantity) {
@@ -78,6 +109,7 @@ function updateCartItemQuantity(productId, newQuantity) {
     } else {
         item.quantity = newQuantity;
         saveCart(cart);
+        syncReservation(productId, newQuantity);
     }
     
     return true;
@@ -85,6 +117,7 @@ function updateCartItemQuantity(productId, newQuantity) {
 
 function clearCart() {
     localStorage.removeItem(CART_STORAGE_KEY);
+    releaseAllReservations();
     // Enviamos array vacío en el evento
     window.dispatchEvent(new CustomEvent('cartUpdated', { detail: [] }));
 }
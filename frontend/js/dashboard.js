@@ -19,7 +19,7 @@ async function loadDashboardData() {
 
     try {
         // Cargar productos
-        const productsResponse = await fetch(`${API_BASE_URL}/productos/listar`, {
+        const productsResponse = await fetch(`${API_BASE_URL}/productos/listar?fields=name,price,current_stock,min_stock`, {
             headers: {
                 'Authorization': `Bearer ${token}`,
             },
@@ -33,7 +33,7 @@ async function loadDashboardData() {
         const products = await productsResponse.json();
 
         // Cargar productos con stock mínimo
-        const lowStockResponse = await fetch(`${API_BASE_URL}/productos/stock-minimo`, {
+        const lowStockResponse = await fetch(`${API_BASE_URL}/productos/stock-minimo?fields=id`, {
             headers: {
                 'Authorization': `Bearer ${token}`,
             },
@@ -121,11 +121,77 @@ function showError(message) {
     console.error(message);
 }
 
+/**
+ * Escuchar cambios de productos por Server-Sent Events
+ * Cada evento (o un reset tras una reconexión larga) recarga los datos una sola vez,
+ * agrupando las ráfagas. Además se consulta cada 2 minutos por si el stream se corta
+ * sin avisar; sin EventSource se sigue consultando cada 30 s
+ */
+function subscribeToProductEvents() {
+    const token = window.authModule?.getAuthToken() || localStorage.getItem('access_token');
+    if (!token) return;
+
+    if (!window.EventSource) {
+        setInterval(loadDashboardData, 30000);
+        return;
+    }
+    setInterval(loadDashboardData, 120000);
+
+    let reloadTimer = null;
+    const scheduleReload = () => {
+        clearTimeout(reloadTimer);
+        reloadTimer = setTimeout(loadDashboardData, 1000);
+    };
+
+    let source = null;
+    let retryTimer = null;
+    let reconnecting = false;
+
+    const connect = async () => {
+        try {
+            // EventSource no permite cabeceras: en la URL va un ticket de 30 s, no el
+            // access token (auth.js lo renueva si venció)
+            const response = await fetch(`${API_BASE_URL}/productos/eventos/ticket`, {
+                method: 'POST',
+                headers: {
+                    'Authorization': `Bearer ${localStorage.getItem('access_token')}`,
+                },
+            });
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            const { ticket } = await response.json();
+
+            source = new EventSource(`${API_BASE_URL}/productos/eventos?ticket=${encodeURIComponent(ticket)}`);
+            ['product.created', 'product.updated', 'product.deactivated', 'product.stock', 'product.sync', 'reset']
+                .forEach(type => source.addEventListener(type, scheduleReload));
+            // El reintento automático del navegador reusaría el ticket vencido: se cierra
+            // y se vuelve a abrir con uno nuevo (y se recarga lo que se haya perdido)
+            source.onerror = () => {
+                console.warn('Conexión de eventos interrumpida, reconectando...');
+                source.close();
+                reconnect();
+            };
+            source.onopen = () => {
+                if (reconnecting) scheduleReload();
+                reconnecting = false;
+            };
+        } catch (error) {
+            console.warn('No se pudo abrir el stream de eventos:', error);
+            reconnect();
+        }
+    };
+
+    const reconnect = () => {
+        reconnecting = true;
+        clearTimeout(retryTimer);
+        retryTimer = setTimeout(connect, 5000);
+    };
+
+    connect();
+}
+
 // Cargar datos al iniciar
 document.addEventListener('DOMContentLoaded', () => {
     loadDashboardData();
-    
-    // Recargar cada 30 segundos
-    setInterval(loadDashboardData, 30000);
+    subscribeToProductEvents();
 });
 
@@ -129,7 +129,7 @@ function renderProducts(products) {
  */
 async function loadCategories() {
     try {
-        const response = await fetch(`${window.APP_CONFIG.API_BASE_URL}/productos/categorias`);
+        const response = await fetch(`${window.APP_CONFIG.API_BASE_URL}/productos/categorias/resumen`);
         if (!response.ok) return;
         
         const categories = await response.json();
@@ -138,7 +138,7 @@ async function loadCategories() {
         categories.forEach(category => {
             const option = document.createElement('option');
             option.value = category.id;
-            option.textContent = category.name;
+            option.textContent = `${category.name} (${category.product_count})`;
             categoryFilter.appendChild(option);
         });
     } catch (error) {
@@ -13,7 +13,7 @@ let allProducts = [];
  */
 async function loadCategories() {
     try {
-        const response = await fetch(`${API_URL}/productos/categorias`);
+        const response = await fetch(`${API_URL}/productos/categorias/resumen`);
         if (response.ok) {
             categories = await response.json();
             renderCategories();
@@ -36,7 +36,7 @@ function renderCategories() {
     categories.forEach(category => {
         const option = document.createElement('option');
         option.value = category.id;
-        option.textContent = category.name;
+        option.textContent = `${category.name} (${category.product_count})`;
         select.appendChild(option);
     });
 }
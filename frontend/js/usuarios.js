@@ -16,6 +16,11 @@ function getApiBaseUrl() {
 let usuarios = [];
 let roles = [];
 let currentEditingUserId = null;
+// Búsqueda en el servidor: filtros actuales y cursor de la página siguiente
+let nextCursor = null;
+let totalUsuarios = null;
+let searchTimer = null;
+const PAGE_SIZE = 25;
 
 /**
  * Verificar que el usuario actual es administrador
@@ -87,15 +92,37 @@ document.addEventListener('DOMContentLoaded', async () => {
         }
     }
 
+    // Buscar al escribir (agrupando las pulsaciones) y al cambiar el filtro de rol
+    document.getElementById('user-search')?.addEventListener('input', () => {
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(() => loadUsuarios(), 300);
+    });
+    document.getElementById('role-filter')?.addEventListener('change', () => loadUsuarios());
+    document.getElementById('load-more')?.addEventListener('click', () => loadUsuarios(true));
+
     // Cargar usuarios y roles
     await loadUsuarios();
     await loadRoles();
 });
 
 /**
- * Cargar lista de usuarios
+ * URL de búsqueda con los filtros actuales
+ */
+function buildSearchUrl(append) {
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    const query = document.getElementById('user-search')?.value.trim();
+    const roleId = document.getElementById('role-filter')?.value;
+    if (query) params.set('q', query);
+    if (roleId) params.set('role_id', roleId);
+    if (append && nextCursor) params.set('cursor', nextCursor);
+    return `${getApiBaseUrl()}/roles/usuarios/buscar?${params}`;
+}
+
+/**
+ * Cargar lista de usuarios (una página de la búsqueda)
+ * Con append=true agrega la página siguiente a la tabla
  */
-async function loadUsuarios() {
+async function loadUsuarios(append = false) {
     const token = localStorage.getItem('access_token');
     
     if (!token) {
@@ -104,11 +131,13 @@ async function loadUsuarios() {
     }
 
     try {
-        document.getElementById('loading').classList.remove('hidden');
-        document.getElementById('content').classList.add('hidden');
+        if (!append) {
+            document.getElementById('loading').classList.remove('hidden');
+            document.getElementById('content').classList.add('hidden');
+        }
         document.getElementById('error-state').classList.add('hidden');
 
-        const response = await fetch(`${getApiBaseUrl()}/roles/usuarios`, {
+        const response = await fetch(buildSearchUrl(append), {
             headers: {
                 'Authorization': `Bearer ${token}`,
                 'Content-Type': 'application/json'
@@ -124,17 +153,23 @@ async function loadUsuarios() {
             throw new Error(`Error: ${response.status}`);
         }
 
-        usuarios = await response.json();
+        const page = await response.json();
+        usuarios = append ? usuarios.concat(page.users) : page.users;
+        nextCursor = page.next_cursor;
+        if (!append) totalUsuarios = page.total;
 
-        // Mostrar contenido
+        // Mostrar contenido (los filtros están dentro: siempre visible)
         document.getElementById('loading').classList.add('hidden');
-        
-        if (usuarios.length === 0) {
-            document.getElementById('empty-state').classList.remove('hidden');
-        } else {
-            document.getElementById('content').classList.remove('hidden');
-            renderUsuarios();
+        document.getElementById('content').classList.remove('hidden');
+        document.getElementById('empty-state').classList.toggle('hidden', usuarios.length > 0);
+        document.getElementById('load-more')?.classList.toggle('hidden', !nextCursor);
+        const countEl = document.getElementById('user-count');
+        if (countEl) {
+            countEl.textContent = totalUsuarios != null
+                ? `Mostrando ${usuarios.length} de ~${totalUsuarios}`
+                : `Mostrando ${usuarios.length}`;
         }
+        renderUsuarios();
 
     } catch (error) {
         console.error('Error al cargar usuarios:', error);
@@ -164,6 +199,7 @@ async function loadRoles() {
         if (response.ok) {
             roles = await response.json();
             renderRoleSelect();
+            renderRoleFilter();
         }
     } catch (error) {
         console.error('Error al cargar roles:', error);
@@ -222,6 +258,22 @@ function renderRoleSelect() {
     });
 }
 
+/**
+ * Renderizar el filtro de rol de la búsqueda
+ */
+function renderRoleFilter() {
+    const select = document.getElementById('role-filter');
+    if (!select) return;
+    select.innerHTML = '<option value="">Todos los roles</option><option value="none">Sin rol</option>';
+    
+    roles.forEach(role => {
+        const option = document.createElement('option');
+        option.value = role.id;
+        option.textContent = role.name;
+        select.appendChild(option);
+    });
+}
+
 /**
  * Abrir modal para cambiar rol
  */
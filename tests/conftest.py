@@ -0,0 +1,80 @@
+"""
+Fixtures compartidas de los tests
+StubClient reemplaza al cliente de Supabase: imita lo mínimo de los builders de
+postgrest (la ruta y el método que lee SupabaseService.describe) y registra cada
+llamada que llega a execute(), para contar viajes al upstream sin red
+"""
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+import pytest
+from backend.services.supabase_service import SupabaseService
+
+Handler = Callable[["StubQuery"], Any]
+
+class StubQuery:
+    """Builder de postgrest falso: los filtros se registran y devuelven el mismo builder"""
+
+    def __init__(self, client: "StubClient", target: str, method: str, params: Any = None):
+        self.client = client
+        self.request = SimpleNamespace(path=f"/rest/v1/{target}", http_method=method)
+        self.params = params
+        self.filters: List[tuple] = []
+
+    def _set_method(self, method: str, payload: Any = None) -> "StubQuery":
+        self.request.http_method = method
+        self.params = payload
+        return self
+
+    def insert(self, payload: Any, **kwargs) -> "StubQuery":
+        return self._set_method("POST", payload)
+
+    def upsert(self, payload: Any, **kwargs) -> "StubQuery":
+        return self._set_method("POST", payload)
+
+    def update(self, payload: Any, **kwargs) -> "StubQuery":
+        return self._set_method("PATCH", payload)
+
+    def delete(self, **kwargs) -> "StubQuery":
+        return self._set_method("DELETE")
+
+    def __getattr__(self, name: str) -> Callable[..., "StubQuery"]:
+        # select, eq, in_, or_, order, limit...
+        def record(*args, **kwargs):
+            self.filters.append((name, args, kwargs))
+            return self
+        return record
+
+    def execute(self) -> SimpleNamespace:
+        return self.client._handle(self)
+
+class StubClient:
+    """Cliente de Supabase falso; handlers: operación ("products.select", "rpc.x") -> función"""
+
+    def __init__(self, handlers: Optional[Dict[str, Handler]] = None):
+        self.handlers: Dict[str, Handler] = dict(handlers or {})
+        self.calls: List[str] = []
+        self._lock = threading.Lock()
+
+    def table(self, name: str) -> StubQuery:
+        return StubQuery(self, name, "GET")
+
+    def rpc(self, name: str, params: Any = None) -> StubQuery:
+        return StubQuery(self, f"rpc/{name}", "POST", params)
+
+    def _handle(self, query: StubQuery) -> SimpleNamespace:
+        operation = SupabaseService.describe(query)
+        with self._lock:
+            self.calls.append(operation)
+        handler = self.handlers.get(operation)
+        data = handler(query) if handler else []
+        return SimpleNamespace(data=data, count=None)
+
+@pytest.fixture
+def stub_client():
+    """Instala un StubClient como cliente de Supabase (anon y service) durante el test"""
+    client = StubClient()
+    SupabaseService._instance = client
+    SupabaseService._service_instance = client
+    yield client
+    SupabaseService.reset_instances()
@@ -0,0 +1,89 @@
+"""
+Índice facetado del catálogo entre recargas
+La carga completa solo ocurre al arrancar; después el índice se mantiene con las
+escrituras del worker y con los cambios que trae ProductChangeFeed (list_changes)
+"""
+import asyncio
+import pytest
+from backend.services.catalog_search_service import CatalogSearchService
+from backend.services.product_change_feed import ProductChangeFeed
+from backend.services.product_service import ProductService
+from backend.services.sale_service import SaleService
+
+def row(product_id, **changes):
+    base = {
+        "id": product_id,
+        "name": f"Producto {product_id}",
+        "Sku": f"SKU-{product_id}",
+        "brand": "Marca",
+        "price": 10.0,
+        "current_stock": 5,
+        "reserved_stock": 1,
+        "is_active": True,
+        "category_id": 1,
+        "categories": {"name": "General"},
+        "product_images": [],
+        "created_at": "2024-01-01T00:00:00+00:00",
+        "updated_at": "2024-01-01T00:00:00+00:00",
+    }
+    return {**base, **changes}
+
+def products_select(catalog, changes):
+    """Distingue la carga completa (range), la marca del feed y list_changes"""
+    def handler(query):
+        names = [name for name, _, _ in query.filters]
+        if "range" in names:
+            return list(catalog)
+        if query.filters[0][1] == ("id, updated_at",):
+            return [{"id": 0, "updated_at": "2024-01-01T00:00:00+00:00"}]
+        return changes.pop(0) if changes else []
+    return handler
+
+@pytest.fixture
+def catalog_service(stub_client, monkeypatch):
+    """CatalogSearchService con el feed y los listeners de escritura aislados del resto"""
+    monkeypatch.setattr(ProductChangeFeed, "_listeners", [])
+    monkeypatch.setattr(ProductChangeFeed, "_started", False)
+    monkeypatch.setattr(ProductChangeFeed, "_watermark", None)
+    monkeypatch.setattr(ProductService, "_write_listeners", [])
+    return CatalogSearchService()
+
+def lookup(service, product_id):
+    return service.lookup(ids=[product_id])[0]["product"]
+
+def test_feed_updates_index_without_full_reload(stub_client, catalog_service):
+    changes = [[row(1, price=20.0, updated_at="2024-01-02T00:00:00+00:00"),
+                row(2, is_active=False, updated_at="2024-01-02T00:00:01+00:00"),
+                row(3, updated_at="2024-01-02T00:00:02+00:00")]]
+    stub_client.handlers["products.select"] = products_select([row(1), row(2)], changes)
+    product_service = ProductService()
+
+    async def scenario():
+        await catalog_service.reload()
+        await ProductChangeFeed.poll(product_service)  # toma la marca
+        await ProductChangeFeed.poll(product_service)  # trae los cambios
+
+    asyncio.run(scenario())
+
+    assert lookup(catalog_service, 1)["price"] == 20.0
+    assert lookup(catalog_service, 2) is None
+    assert lookup(catalog_service, 3) is not None
+    assert len(catalog_service._index) == 2
+    # Una sola página de carga completa; lo demás es incremental
+    assert stub_client.calls == ["products.select"] * 3
+
+def test_sale_updates_current_and_available_stock(stub_client, catalog_service):
+    stub_client.handlers["products.select"] = products_select([row(1)], [])
+    stub_client.handlers["rpc.checkout_sale"] = lambda query: {
+        "success": True, "sale_id": 1, "total": 20.0,
+        "lines": [{"product_id": 1, "status": "ok", "available": 2, "current_stock": 3}],
+    }
+    asyncio.run(catalog_service.reload())
+    assert (lookup(catalog_service, 1)["current_stock"], lookup(catalog_service, 1)["available_stock"]) == (5, 4)
+
+    asyncio.run(SaleService().checkout("user-1", [{"product_id": 1, "quantity": 2, "price": 10.0}]))
+    assert (lookup(catalog_service, 1)["current_stock"], lookup(catalog_service, 1)["available_stock"]) == (3, 2)
+
+    # Una reserva no toca current_stock: el evento trae solo el disponible
+    ProductService._stock_changed(1, 1)
+    assert (lookup(catalog_service, 1)["current_stock"], lookup(catalog_service, 1)["available_stock"]) == (3, 1)
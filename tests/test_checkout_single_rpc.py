@@ -0,0 +1,50 @@
+"""
+Checkout en un solo viaje a checkout_sale
+La atomicidad (validar y descontar bajo FOR UPDATE) la da la función de BD
+(003_stock_reservations.sql) y no se prueba aquí: hace falta un Postgres con las
+migraciones. Lo que se prueba es que SaleService, con muchos checkouts concurrentes
+del mismo SKU, no agrega una lectura previa ni un descuento propio
+(leer-validar-escribir) y devuelve el resultado de la función tal cual
+"""
+import asyncio
+import threading
+from backend.services.sale_service import SaleService
+
+STOCK = 10
+BUYERS = 50
+
+def checkout_sale_rpc(stock):
+    """Respuesta de checkout_sale; el lock solo imita la fila bloqueada para que el stub sea coherente"""
+    lock = threading.Lock()
+
+    def handler(query):
+        line = query.params["p_lines"][0]
+        with lock:
+            if stock["current"] < line["quantity"]:
+                return {"success": False, "lines": [{"product_id": line["product_id"],
+                                                      "status": "insufficient_stock",
+                                                      "available": stock["current"]}]}
+            stock["current"] -= line["quantity"]
+            return {"success": True, "sale_id": STOCK - stock["current"], "total": 10.0,
+                    "lines": [{"product_id": line["product_id"], "status": "ok",
+                               "available": stock["current"]}]}
+    return handler
+
+def test_concurrent_checkouts_are_one_rpc_each_without_read_validate_write(stub_client):
+    stock = {"current": STOCK}
+    stub_client.handlers["rpc.checkout_sale"] = checkout_sale_rpc(stock)
+    service = SaleService()
+
+    async def buy(buyer):
+        return await service.checkout(f"user-{buyer}", [{"product_id": 1, "quantity": 1, "price": 10.0}])
+
+    async def run():
+        return await asyncio.gather(*(buy(buyer) for buyer in range(BUYERS)))
+
+    results = asyncio.run(run())
+
+    # Una sola llamada por checkout: ni lecturas de products ni descuentos fuera de la función
+    assert stub_client.calls == ["rpc.checkout_sale"] * BUYERS
+    # El servicio no reinterpreta la respuesta: los rechazos de la BD llegan como tales
+    assert sum(1 for r in results if r.get("success")) == STOCK
+    assert all(r["lines"][0]["status"] == "insufficient_stock" for r in results if not r.get("success"))
@@ -0,0 +1,44 @@
+"""
+Hooks de arranque en segundo plano sin bloquear el event loop
+Crear los clientes de Supabase importa el paquete (~0.4 s); un hook sync corre en
+el pool de hilos para que /health y las demás peticiones no esperen
+"""
+import asyncio
+import time
+from backend.utils.lifecycle import LifecycleManager
+
+HOOK_SECONDS = 0.3  # Lo que tarda el hook sync (importar supabase, crear el cliente)
+MAX_LAG_SECONDS = 0.1
+
+def test_sync_background_hook_does_not_block_event_loop():
+    manager = LifecycleManager()
+    done = []
+    manager.on_startup("slow_client", lambda: (time.sleep(HOOK_SECONDS), done.append(True)), background=True)
+
+    async def scenario():
+        await manager.startup()
+        lags = []
+        while not done:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - started - 0.001)
+        await manager.shutdown()
+        return max(lags)
+
+    lag = asyncio.run(scenario())
+    assert done
+    assert lag < MAX_LAG_SECONDS, f"el event loop se retrasó {lag * 1000:.0f} ms"
+
+def test_async_hooks_run_on_the_event_loop():
+    manager = LifecycleManager()
+    loops = []
+
+    async def hook():
+        loops.append(asyncio.get_running_loop())
+
+    async def scenario():
+        manager.on_shutdown("async_hook", hook)
+        await manager.shutdown()
+        return asyncio.get_running_loop()
+
+    assert loops == [asyncio.run(scenario())]
@@ -0,0 +1,69 @@
+"""
+Logging sin bloquear el event loop
+Con un stdout lento, registrar desde los handlers solo encola: la escritura la hace
+el hilo del QueueListener y el event loop no se retrasa
+"""
+import asyncio
+import logging
+import logging.handlers
+import queue
+import time
+from backend.utils.log import NonBlockingQueueHandler
+
+RECORDS = 2000
+WRITE_SECONDS = 0.001  # Costo de escribir una línea en el stdout falso
+MAX_LAG_SECONDS = 0.1  # Escribir en línea tardaría RECORDS * WRITE_SECONDS = 2 s
+
+class SlowHandler(logging.Handler):
+    """Destino lento (pipe lleno, disco, colector de logs)"""
+
+    def __init__(self):
+        super().__init__()
+        self.written = 0
+
+    def emit(self, record):
+        time.sleep(WRITE_SECONDS)
+        self.written += 1
+
+async def _max_loop_lag(work) -> float:
+    """Mayor retraso de un ticker de 1 ms mientras corre `work`"""
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - started - 0.001)
+
+    task = asyncio.ensure_future(ticker())
+    await work()
+    done.set()
+    await task
+    return max(lags)
+
+def test_logging_does_not_block_event_loop():
+    output = SlowHandler()
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=RECORDS * 2))
+    listener = logging.handlers.QueueListener(handler.queue, output)
+    logger = logging.getLogger("tests.logging_lag")
+    logger.propagate = False
+    logger.handlers = [handler]
+    logger.setLevel(logging.INFO)
+    listener.start()
+
+    async def request(i):
+        logger.info("petición %s atendida", i, extra={"status": 200})
+        await asyncio.sleep(0)
+
+    async def work():
+        await asyncio.gather(*(request(i) for i in range(RECORDS)))
+
+    try:
+        lag = asyncio.run(_max_loop_lag(work))
+    finally:
+        listener.stop()  # Espera a que se escriba lo pendiente
+        logger.handlers = []
+
+    assert lag < MAX_LAG_SECONDS, f"el event loop se retrasó {lag * 1000:.0f} ms"
+    assert output.written == RECORDS
@@ -0,0 +1,49 @@
+"""
+Escrituras de productos en un solo viaje al upstream
+create_product y update_product llaman a una función de BD que escribe el producto
+y su imagen y devuelve la fila con sus relaciones (005_product_write_functions.sql)
+"""
+import asyncio
+from backend.services.product_service import ProductService
+
+ROW = {
+    "id": 7,
+    "name": "Teclado",
+    "price": 99.9,
+    "current_stock": 5,
+    "reserved_stock": 1,
+    "min_stock": 2,
+    "is_active": True,
+    "category_id": 3,
+    "categories": {"name": "Periféricos"},
+    "product_images": [{"image_url": "https://cdn/teclado.webp"}],
+}
+
+def test_create_product_is_a_single_rpc(stub_client):
+    stub_client.handlers["rpc.create_product_full"] = lambda query: ROW
+    product = asyncio.run(ProductService().create_product({
+        "name": "Teclado", "price": 99.9, "stock": 5, "category_id": 3,
+        "image_url": "https://cdn/teclado.webp"
+    }))
+
+    assert stub_client.calls == ["rpc.create_product_full"]
+    assert product["category"] == "Periféricos"
+    assert product["images"] == ["https://cdn/teclado.webp"]
+    assert product["available_stock"] == 4
+
+def test_update_product_is_a_single_rpc(stub_client):
+    stub_client.handlers["rpc.update_product_full"] = lambda query: {
+        "product": dict(ROW, price=89.9),
+        "changes": {"price": [99.9, 89.9]},
+    }
+    product = asyncio.run(ProductService().update_product("7", {"price": 89.9, "image_url": "https://cdn/b.webp"}))
+
+    assert stub_client.calls == ["rpc.update_product_full"]
+    assert product["price"] == 89.9
+    assert product["changes"] == {"price": [99.9, 89.9]}
+
+def test_delete_product_is_a_single_update(stub_client):
+    stub_client.handlers["products.update"] = lambda query: [dict(ROW, is_active=False)]
+    asyncio.run(ProductService().delete_product("7"))
+
+    assert stub_client.calls == ["products.update"]
@@ -0,0 +1,41 @@
+"""
+Liberar reservas avisa del stock devuelto
+release y el barrido de vencidas publican el nuevo stock de cada producto e
+invalidan la caché del catálogo, igual que hold
+"""
+import asyncio
+from backend.services.product_service import ProductService
+from backend.services.reservation_service import ReservationService
+
+RELEASED = {
+    "released": 3,
+    "products": [{"product_id": 1, "available": 4, "current_stock": 5},
+                 {"product_id": 2, "available": 7, "current_stock": 7}],
+}
+
+def _record_events(monkeypatch):
+    events = []
+    monkeypatch.setattr(ProductService, "_write_listeners", [])
+    ProductService.on_product_write(lambda action, product_id, data: events.append((action, data)))
+    return events
+
+def test_release_publishes_stock_and_invalidates_catalog(stub_client, monkeypatch):
+    events = _record_events(monkeypatch)
+    stub_client.handlers["rpc.release_holds"] = lambda query: RELEASED
+    version = ProductService.catalog_version
+
+    result = asyncio.run(ReservationService().release("cart-1"))
+
+    assert result == {"released": 3}
+    assert ProductService.catalog_version > version
+    assert events == [
+        ("stock", {"id": 1, "available_stock": 4, "current_stock": 5}),
+        ("stock", {"id": 2, "available_stock": 7, "current_stock": 7}),
+    ]
+
+def test_sweep_publishes_stock_of_expired_holds(stub_client, monkeypatch):
+    events = _record_events(monkeypatch)
+    stub_client.handlers["rpc.release_expired_reservations"] = lambda query: RELEASED
+
+    assert asyncio.run(ReservationService().sweep_expired()) == 3
+    assert [data["id"] for _, data in events] == [1, 2]
@@ -0,0 +1,43 @@
+"""
+Presupuesto de arranque en frío
+Importar la aplicación no debe importar el paquete supabase ni crear clientes: eso
+ocurre en el lifespan, después de que el worker ya acepta peticiones
+"""
+import json
+import os
+import subprocess
+import sys
+
+# Segundos para importar backend.main en un proceso nuevo (~0.6 s medido en desarrollo)
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "2.0"))
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - started
+from backend.services.supabase_service import SupabaseService
+print(json.dumps({
+    "elapsed": elapsed,
+    "supabase_imported": any(name == "supabase" or name.startswith(("supabase.", "postgrest", "gotrue", "storage3"))
+                             for name in sys.modules),
+    "clients_created": SupabaseService._instance is not None or SupabaseService._service_instance is not None,
+}))
+"""
+
+def _probe():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, LOG_LEVEL="WARNING", PYTHONPATH=root)
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=root, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def test_import_does_not_load_supabase_or_create_clients():
+    result = _probe()
+    assert not result["supabase_imported"]
+    assert not result["clients_created"]
+
+def test_import_time_within_budget():
+    # Se toma el mejor de tres para no fallar por ruido de la máquina
+    elapsed = min(_probe()["elapsed"] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET_SECONDS, f"import backend.main tardó {elapsed:.2f}s"